@@ -4,12 +4,29 @@ Endpoints de autenticación
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.database import get_db
-from app.schemas.user import UserLogin, Token, TokenRefresh, TokenResponse, UserCreate, UserResponse
+from typing import Optional
+from app.schemas.user import (
+    UserLogin,
+    Token,
+    TokenRefresh,
+    TokenResponse,
+    UserCreate,
+    UserResponse,
+    LogoutRequest
+)
 from app.schemas.common import MessageResponse
 from app.services.user_service import UserService
-from app.core.security import create_tokens, verify_token
+from app.core.security import (
+    create_access_token,
+    create_tokens,
+    verify_token,
+    get_current_token_payload
+)
+from app.core.revocation import revocation_store
 from app.core.exceptions import UnauthorizedException
 from app.middleware.rate_limit import limiter
+from app.core.rate_limiter import get_remote_address
+from app.tasks import enqueue
 from fastapi import Request
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -39,12 +56,21 @@ async def login(
     """
     Iniciar sesión y obtener tokens JWT
     """
-    user = await UserService.authenticate(db, credentials.email, credentials.password)
+    client_ip = get_remote_address(request)
+    user = await UserService.authenticate(db, credentials.email, credentials.password, client_ip)
     
     if not user:
         raise UnauthorizedException("Email o contraseña incorrectos")
     
+    # `gen` de Redis, no solo del espejo local (puede no estar cargado)
+    await revocation_store.current_generation(user.id)
     tokens = create_tokens(user.id, user.email)
+    enqueue(
+        "users.record_login",
+        user.id,
+        ip=client_ip,
+        user_agent=request.headers.get("user-agent")
+    )
     
     return tokens
 
@@ -69,11 +95,12 @@ async def refresh_token(
         if not user or not user.is_active:
             raise UnauthorizedException("Usuario no válido")
         
-        # Crear nuevo access token
-        tokens = create_tokens(user_id, email)
+        # Crear solo el access token (el refresh token sigue siendo el mismo)
+        await revocation_store.current_generation(user_id)
+        access_token = create_access_token(data={"sub": user_id, "email": email})
         
         return TokenResponse(
-            access_token=tokens["access_token"],
+            access_token=access_token,
             token_type="bearer"
         )
     
@@ -82,11 +109,38 @@ async def refresh_token(
 
 
 @router.post("/logout", response_model=MessageResponse)
-async def logout():
+async def logout(
+    logout_data: Optional[LogoutRequest] = None,
+    payload: dict = Depends(get_current_token_payload)
+):
     """
-    Cerrar sesión (en el cliente debe eliminar los tokens)
+    Cerrar sesión: revoca el access token y, si se envía, el refresh token
     """
-    return MessageResponse(
-        message="Sesión cerrada exitosamente",
-        detail="Elimina los tokens del cliente"
-    )
+    # Tokens emitidos antes de añadir `jti` no se pueden revocar individualmente
+    if payload.get("jti"):
+        await revocation_store.revoke(payload["jti"], payload["exp"])
+    
+    if logout_data and logout_data.refresh_token:
+        try:
+            refresh_payload = verify_token(logout_data.refresh_token, "refresh")
+        except UnauthorizedException:
+            refresh_payload = None
+        # Solo se revocan refresh tokens del mismo usuario
+        if (
+            refresh_payload
+            and refresh_payload.get("jti")
+            and refresh_payload.get("sub") == payload.get("sub")
+        ):
+            await revocation_store.revoke(refresh_payload["jti"], refresh_payload["exp"])
+    
+    return MessageResponse(message="Sesión cerrada exitosamente")
+
+
+@router.post("/logout-all", response_model=MessageResponse)
+async def logout_all(payload: dict = Depends(get_current_token_payload)):
+    """
+    Cerrar todas las sesiones del usuario (invalida todos sus tokens)
+    """
+    await revocation_store.revoke_all(payload["sub"])
+    
+    return MessageResponse(message="Todas las sesiones fueron cerradas")
@@ -1,30 +1,101 @@
 """
 Endpoints de usuarios
 """
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from app.config.database import get_db
-from app.schemas.user import UserResponse, UserUpdate
+import io
+from fastapi import APIRouter, Depends, File, Header, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Optional, Union
+from datetime import datetime
+from app.config.database import get_db, get_read_db, get_session_factory
+from app.config.settings import settings
+from app.schemas.user import UserResponse, UserUpdate, UserPage, UserImportReport
 from app.schemas.common import MessageResponse
 from app.services.user_service import UserService
+from app.services.import_service import UserImportService
 from app.core.security import get_current_user_id
+from app.core.exceptions import BadRequestException, ForbiddenException
 from app.middleware.rate_limit import limiter
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.export import EXPORT_ENCODERS, EXPORT_MEDIA_TYPES
+from app.utils.imports import IMPORT_PARSERS
+from app.utils.responses import ORJSONResponse
+from app.utils.dataloader import DataLoader
+from app.utils.etags import collection_etag, etag_matches, not_modified, set_etag, user_etag
 from fastapi import Request
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
+def parse_ids(value: str) -> List[int]:
+    """IDs separados por comas ("1,2,3"), como máximo PAGINATION_MAX_LIMIT"""
+    try:
+        user_ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise BadRequestException("ids debe ser una lista de IDs separados por comas")
+    if not user_ids:
+        raise BadRequestException("ids no puede estar vacío")
+    if len(user_ids) > settings.PAGINATION_MAX_LIMIT:
+        raise BadRequestException(f"Como máximo {settings.PAGINATION_MAX_LIMIT} IDs por consulta")
+    return user_ids
+
+
+async def get_user_loader(db: AsyncSession = Depends(get_read_db)) -> DataLoader:
+    """
+    DataLoader de usuarios del request (FastAPI lo comparte entre las
+    dependencias del mismo request)
+    """
+    return UserService.loader(db)
+
+
+async def get_current_superuser_id(
+    user_id: int = Depends(get_current_user_id),
+    loader: DataLoader = Depends(get_user_loader)
+) -> int:
+    """Dependency que exige un superusuario activo"""
+    user = await loader.load(user_id)
+    if not user or not user.is_active or not user.is_superuser:
+        raise ForbiddenException("Se requieren permisos de superusuario")
+    return user_id
+
+
+async def get_user_conditional(
+    db: AsyncSession,
+    loader: DataLoader,
+    user_id: int,
+    if_none_match: Optional[str],
+    response: Response
+):
+    """
+    Obtener un usuario con ETag
+    Si If-None-Match coincide se responde 304 consultando solo la versión
+    """
+    if if_none_match:
+        version = await UserService.get_version(db, user_id)
+        if version is not None:
+            etag = user_etag(version["id"], version["updated_at"], version["created_at"])
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+    
+    user = await loader.load(user_id)
+    if user is not None:
+        set_etag(response, user_etag(user.id, user.updated_at, user.created_at))
+    return user
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
+    response: Response,
     user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    loader: DataLoader = Depends(get_user_loader),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Obtener información del usuario actual
+    Con If-None-Match responde 304 si no cambió
     """
-    user = await UserService.get_by_id(db, user_id)
-    return user
+    return await get_user_conditional(db, loader, user_id, if_none_match, response)
 
 
 @router.put("/me", response_model=UserResponse)
@@ -52,30 +123,143 @@ async def delete_current_user(
     return MessageResponse(message="Usuario eliminado exitosamente")
 
 
-@router.get("", response_model=List[UserResponse])
+@router.get("", response_model=Union[UserPage, List[UserResponse]])
 @limiter.limit("30/minute")
 async def get_users(
     request: Request,
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="IDs separados por comas: 1,2,3"),
     user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Obtener lista de usuarios (requiere autenticación)
+    
+    - Sin `cursor`: paginación por offset (`skip`/`limit`), retorna una lista
+    - Con `cursor` (vacío para la primera página): paginación por keyset,
+      retorna `items` y `next_cursor` (null en la última página)
+    - Con `ids`: los usuarios indicados en ese orden, con una sola consulta
+      (los IDs inexistentes se omiten)
+    
+    El ETag cubre la página completa; con If-None-Match responde 304 si
+    ninguna fila de la página cambió
     """
-    users = await UserService.get_all(db, skip=skip, limit=limit)
-    return users
+    if ids is not None:
+        user_ids = parse_ids(ids)
+        if if_none_match:
+            etag = collection_etag(await UserService.get_versions_by_ids(db, user_ids))
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+        
+        rows = await UserService.get_rows_by_ids(db, user_ids)
+        response = ORJSONResponse(rows)
+        set_etag(response, collection_etag(rows))
+        return response
+    
+    after_id = decode_cursor(cursor) if cursor is not None else None
+    
+    if if_none_match:
+        if cursor is not None:
+            versions, last_id = await UserService.get_page_versions(db, limit=limit, after_id=after_id)
+        else:
+            versions, last_id = await UserService.get_rows_versions(db, skip=skip, limit=limit), None
+        etag = collection_etag(versions, last_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    
+    # Filas de columnas públicas serializadas con orjson: al retornar una
+    # Response se omite la validación de `response_model` (solo documenta)
+    if cursor is not None:
+        rows, last_id = await UserService.get_page_rows(db, limit=limit, after_id=after_id)
+        response = ORJSONResponse({
+            "items": rows,
+            "next_cursor": encode_cursor(last_id) if last_id is not None else None
+        })
+    else:
+        rows, last_id = await UserService.get_rows(db, skip=skip, limit=limit), None
+        response = ORJSONResponse(rows)
+    
+    set_etag(response, collection_etag(rows, last_id))
+    return response
+
+
+@router.get("/export", response_class=StreamingResponse)
+@limiter.limit("5/minute")
+async def export_users(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    is_active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: int = Depends(get_current_user_id),
+    session_factory: async_sessionmaker = Depends(get_session_factory)
+):
+    """
+    Exportar usuarios en streaming (NDJSON o CSV)
+    
+    La sesión se abre dentro del generador para que viva mientras dura la
+    respuesta; las filas se leen con un cursor de servidor.
+    """
+    async def generate():
+        async with session_factory() as session:
+            rows = UserService.stream_rows(
+                session,
+                is_active=is_active,
+                created_from=created_from,
+                created_to=created_to
+            )
+            async for chunk in EXPORT_ENCODERS[export_format](rows):
+                yield chunk
+    
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'}
+    )
+
+
+@router.post("/import", response_model=UserImportReport)
+@limiter.limit("5/minute")
+async def import_users(
+    request: Request,
+    file: UploadFile = File(...),
+    import_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    batch_size: Optional[int] = Query(None, ge=1, le=5000),
+    user_id: int = Depends(get_current_superuser_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Importar usuarios desde un archivo NDJSON o CSV (solo superusuarios)
+    
+    Las filas inválidas o duplicadas se reportan por número de línea sin
+    abortar la importación del resto.
+    """
+    # Lectura bloqueante (el archivo puede estar en disco): el servicio la
+    # consume en el threadpool, lote a lote
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return await UserImportService(db, batch_size=batch_size).run(
+            IMPORT_PARSERS[import_format](lines)
+        )
+    finally:
+        lines.detach()
 
 
 @router.get("/{user_id_param}", response_model=UserResponse)
 async def get_user(
     user_id_param: int,
+    response: Response,
     user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    loader: DataLoader = Depends(get_user_loader),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Obtener usuario por ID
+    Con If-None-Match responde 304 si no cambió
+    Para resolver varios IDs usar `GET /users?ids=1,2,3` (una sola consulta)
     """
-    user = await UserService.get_by_id(db, user_id_param)
-    return user
+    return await get_user_conditional(db, loader, user_id_param, if_none_match, response)
@@ -0,0 +1,31 @@
+"""
+Configuración de Cloudinary (opcional)
+
+La librería no se importa al arrancar la app: `get_cloudinary()` la carga y
+configura en el primer uso. Requiere `pip install cloudinary`.
+"""
+from typing import Any, Optional
+from app.config.settings import settings
+
+_configured: Optional[Any] = None
+
+
+def get_cloudinary() -> Any:
+    """Obtener el módulo `cloudinary` configurado con las credenciales de settings"""
+    global _configured
+    if _configured is None:
+        if not settings.CLOUDINARY_CLOUD_NAME:
+            raise RuntimeError("Cloudinary no configurado. Define CLOUDINARY_CLOUD_NAME en .env")
+        try:
+            import cloudinary
+        except ImportError:
+            raise RuntimeError("Cloudinary no instalado. Ejecuta `pip install cloudinary`")
+        
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET,
+            secure=True
+        )
+        _configured = cloudinary
+    return _configured
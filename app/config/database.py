@@ -1,33 +1,244 @@
 """
 Configuración de la base de datos
 """
+import logging
+import math
+import time
+from collections import deque
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config.replicas import ReadOnlySession, Replica, ReplicaRouter, RoutingSession, read_only_bind
 from app.config.settings import settings
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_CONNECTION_HOLD,
+    DB_POOL_WAITING,
+    DB_POOL_SATURATION,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_RECOMMENDED_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+PRE_PING_POLICIES = ("always", "idle", "never")
+
+
+class PoolAdvisor:
+    """
+    Recomienda un pool_size a partir de la concurrencia observada
+    
+    La demanda es el número de conexiones en uso más los checkouts en espera.
+    Al cerrar cada ventana se guarda su pico; la recomendación es el mayor
+    pico de las últimas ventanas con un margen (`headroom`). Solo informa:
+    el pool no cambia de tamaño en caliente.
+    """
+    
+    def __init__(self, pool_size: int, window: float = 60.0, headroom: float = 1.2, windows: int = 10):
+        self.pool_size = pool_size
+        self.window = window
+        self.headroom = headroom
+        self._peaks = deque(maxlen=windows)
+        self._current_peak = 0
+        self._window_start = time.monotonic()
+        self._last_recommendation: Optional[int] = None
+    
+    def observe(self, demand: int) -> None:
+        now = time.monotonic()
+        if now - self._window_start >= self.window:
+            self._close_window(now)
+        if demand > self._current_peak:
+            self._current_peak = demand
+    
+    def _close_window(self, now: float) -> None:
+        self._peaks.append(self._current_peak)
+        self._current_peak = 0
+        self._window_start = now
+        
+        recommended = self.recommended_size()
+        DB_POOL_RECOMMENDED_SIZE.set(recommended)
+        if recommended != self._last_recommendation and recommended != self.pool_size:
+            logger.info(
+                f"Pool de conexiones: pico de concurrencia {max(self._peaks)}, "
+                f"DB_POOL_SIZE recomendado {recommended} (actual {self.pool_size})"
+            )
+        self._last_recommendation = recommended
+    
+    def recommended_size(self) -> int:
+        if not self._peaks:
+            return self.pool_size
+        return max(1, math.ceil(max(self._peaks) * self.headroom))
+
+
+# Se crea junto con el engine si DB_POOL_ADVISOR_ENABLED
+pool_advisor: Optional[PoolAdvisor] = None
 
-# Crear engine asíncrono (solo si DATABASE_URL está configurada)
-engine = None
-if settings.DATABASE_URL:
-    engine = create_async_engine(
-        settings.DATABASE_URL,
-        echo=settings.DB_ECHO,
-        future=True,
-        pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20
-    )
 
-# Session maker
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Pool que mide el tiempo de espera y los checkouts pendientes"""
+    
+    _waiting = 0
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        self._waiting += 1
+        DB_POOL_WAITING.inc()
+        if pool_advisor is not None:
+            pool_advisor.observe(self.checkedout() + self._waiting)
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            self._waiting -= 1
+            DB_POOL_WAITING.dec()
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def _record_pool_usage(pool, returning: int = 0) -> None:
+    checked_out = pool.checkedout() - returning
+    DB_POOL_CHECKED_OUT.set(checked_out)
+    DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    DB_POOL_SATURATION.set(checked_out / capacity if capacity else 0)
+    if pool_advisor is not None and not returning:
+        pool_advisor.observe(checked_out + pool._waiting)
+
+
+def instrument_pool(pool) -> None:
+    """Publicar conexiones en uso, overflow, saturación y tiempo de retención"""
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        _record_pool_usage(pool)
+    
+    # "checkin" se emite antes de devolver la conexión a la cola
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            DB_POOL_CONNECTION_HOLD.observe(time.perf_counter() - checked_out_at)
+        _record_pool_usage(pool, returning=1)
+
+
+def ping_idle_connections(pool, dialect, idle_seconds: float) -> None:
+    """
+    Comprobar la conexión al sacarla del pool solo si estuvo ociosa más de
+    `idle_seconds` (pool_pre_ping hace un round trip en cada checkout)
+    """
+    @event.listens_for(pool, "checkin")
+    def mark_idle(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+    
+    @event.listens_for(pool, "checkout")
+    def ping(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            dialect.do_ping(dbapi_connection)
+        except Exception as exc:
+            # El pool descarta la conexión y abre otra
+            raise DisconnectionError(f"Conexión ociosa no disponible: {exc}") from exc
+
+
+def engine_options(database_url: str) -> dict:
+    """Opciones de create_async_engine a partir de la configuración"""
+    if settings.DB_POOL_PRE_PING not in PRE_PING_POLICIES:
+        raise ValueError(f"DB_POOL_PRE_PING debe ser uno de {', '.join(PRE_PING_POLICIES)}")
+    
+    options = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+    }
+    if "+asyncpg" in database_url.split("://", 1)[0]:
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+# Engine y session maker: se crean en el lifespan de la app (o en el primer
+# uso desde scripts/tests), no al importar el módulo
+engine = None
 AsyncSessionLocal = None
-if engine:
-    AsyncSessionLocal = async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-        autocommit=False,
-        autoflush=False
+ReadSessionLocal = None
+replica_router = None
+
+
+def create_engine() -> Optional[async_sessionmaker]:
+    """
+    Crear el engine asíncrono y el session maker (idempotente)
+    Retorna None si DATABASE_URL no está configurada
+    """
+    global engine, AsyncSessionLocal, ReadSessionLocal, pool_advisor, replica_router
+    if engine is None and settings.DATABASE_URL:
+        engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+        pool = engine.sync_engine.pool
+        instrument_pool(pool)
+        if settings.DB_POOL_PRE_PING == "idle":
+            ping_idle_connections(pool, engine.dialect, settings.DB_POOL_PRE_PING_IDLE_SECONDS)
+        if settings.DB_POOL_ADVISOR_ENABLED:
+            pool_advisor = PoolAdvisor(
+                settings.DB_POOL_SIZE,
+                window=settings.DB_POOL_ADVISOR_WINDOW,
+                headroom=settings.DB_POOL_ADVISOR_HEADROOM
+            )
+        session_options = {}
+        read_info = {"read_only": True}
+        if settings.DATABASE_REPLICA_URLS:
+            replica_router = create_replica_router(settings.DATABASE_REPLICA_URLS)
+            session_options = {"sync_session_class": RoutingSession, "info": {"router": replica_router}}
+            read_info["router"] = replica_router
+        AsyncSessionLocal = async_sessionmaker(
+            engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+            **session_options
+        )
+        ReadSessionLocal = async_sessionmaker(
+            read_only_bind(engine),
+            class_=AsyncSession,
+            sync_session_class=ReadOnlySession,
+            expire_on_commit=False,
+            autoflush=False,
+            info=read_info
+        )
+    return AsyncSessionLocal
+
+
+def create_replica_router(urls: List[str]) -> ReplicaRouter:
+    """Engines de las réplicas (sin métricas de pool: esas son del primario)"""
+    replicas = []
+    for url in urls:
+        options = {**engine_options(url), "poolclass": AsyncAdaptedQueuePool}
+        replicas.append(Replica(
+            make_url(url).render_as_string(hide_password=True),
+            create_async_engine(url, **options)
+        ))
+    return ReplicaRouter(
+        replicas,
+        strategy=settings.DB_REPLICA_STRATEGY,
+        eject_seconds=settings.DB_REPLICA_EJECT_SECONDS
     )
 
+
 # Base para los modelos
 Base = declarative_base()
 
@@ -36,10 +247,9 @@ async def get_db():
     """
     Dependency para obtener la sesión de base de datos
     """
-    if not AsyncSessionLocal:
-        raise RuntimeError("Database no configurada. Define DATABASE_URL en .env")
+    session_factory = get_session_factory()
     
-    async with AsyncSessionLocal() as session:
+    async with session_factory() as session:
         try:
             yield session
             await session.commit()
@@ -50,11 +260,36 @@ async def get_db():
             await session.close()
 
 
+async def get_read_db():
+    """
+    Dependency de solo lectura para endpoints GET
+    
+    Sin transacción ni commit: cada consulta toma una conexión del pool y la
+    devuelve al terminar, en lugar de retenerla hasta el final del request.
+    """
+    get_session_factory()
+    
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+def get_session_factory() -> async_sessionmaker:
+    """
+    Dependency para obtener el session maker
+    Útil cuando la sesión debe vivir más que el request (p. ej. respuestas en streaming)
+    """
+    session_factory = create_engine()
+    if session_factory is None:
+        raise RuntimeError("Database no configurada. Define DATABASE_URL en .env")
+    
+    return session_factory
+
+
 async def init_db():
     """
     Inicializar la base de datos (crear tablas)
     """
-    if not settings.DATABASE_URL:
+    if create_engine() is None:
         return
     
     async with engine.begin() as conn:
@@ -65,5 +300,13 @@ async def close_db():
     """
     Cerrar conexión a la base de datos
     """
+    global engine, AsyncSessionLocal, ReadSessionLocal, pool_advisor, replica_router
     if engine:
         await engine.dispose()
+        engine = None
+        AsyncSessionLocal = None
+        ReadSessionLocal = None
+        pool_advisor = None
+    if replica_router:
+        await replica_router.dispose()
+        replica_router = None
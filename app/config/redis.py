@@ -0,0 +1,44 @@
+"""
+Configuración de Redis
+"""
+from typing import TYPE_CHECKING, Optional
+from app.config.settings import settings
+
+if TYPE_CHECKING:
+    import redis.asyncio as redis
+
+_client: Optional["redis.Redis"] = None
+
+
+def get_redis() -> Optional["redis.Redis"]:
+    """
+    Obtener el cliente Redis compartido
+    Retorna None si REDIS_URL no está configurada
+    La librería se importa en el primer uso para no penalizar el arranque
+    """
+    global _client
+    if _client is None and settings.REDIS_URL:
+        import redis.asyncio as redis
+        
+        _client = redis.from_url(
+            settings.REDIS_URL,
+            password=settings.REDIS_PASSWORD or None,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def set_redis(client: Optional["redis.Redis"]) -> None:
+    """Reemplazar el cliente Redis (útil en tests)"""
+    global _client
+    _client = client
+
+
+async def close_redis() -> None:
+    """Cerrar conexión a Redis"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,191 @@
+"""
+Réplicas de lectura
+
+Las sesiones `RoutingSession` envían los SELECT a una réplica y todo lo
+demás (INSERT/UPDATE/DELETE, flush, SELECT ... FOR UPDATE, SQL textual) al
+primario. En cuanto la sesión escribe, el resto de sus consultas también va
+al primario (read-after-write dentro del request).
+
+Una réplica que falla al conectar o pierde la conexión se expulsa durante
+`eject_seconds` (duplicando el tiempo en fallos seguidos); pasado ese tiempo
+vuelve a recibir consultas y, si responde, se da por recuperada.
+"""
+import logging
+import time
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+ROUTING_STRATEGIES = ("round_robin", "least_connections")
+
+
+def read_only_bind(engine):
+    """
+    Engine para sesiones de solo lectura: en AUTOCOMMIT se evitan el BEGIN
+    y el ROLLBACK de cada checkout. En SQLite no aporta (el driver no abre
+    transacción para los SELECT) y cambiar el nivel de aislamiento en cada
+    checkout cuesta más de lo que ahorra.
+    """
+    if engine.dialect.name == "sqlite":
+        return engine
+    return engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+class Replica:
+    """Engine de una réplica con su estado de salud"""
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.connect_failed = False
+        self.read_engine = read_only_bind(engine.sync_engine)
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def in_use(self) -> int:
+        """Conexiones del pool de la réplica en uso"""
+        return self.engine.sync_engine.pool.checkedout()
+
+
+class ReplicaRouter:
+    """Elige la réplica para cada lectura y lleva la cuenta de las expulsadas"""
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        strategy: str = "round_robin",
+        eject_seconds: float = 30.0,
+        max_eject_seconds: float = 300.0
+    ):
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"DB_REPLICA_STRATEGY debe ser uno de {', '.join(ROUTING_STRATEGIES)}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._counter = 0
+        for replica in replicas:
+            self._watch(replica)
+
+    def choose(self) -> Optional[Replica]:
+        """Réplica para la siguiente lectura (None = usar el primario)"""
+        available = [replica for replica in self.replicas if replica.available]
+        if not available:
+            return None
+        # Rotar también con least_connections: los empates se reparten
+        start = self._counter % len(available)
+        self._counter += 1
+        candidates = available[start:] + available[:start]
+        if self.strategy == "least_connections":
+            return min(candidates, key=Replica.in_use)
+        return candidates[0]
+
+    def eject(self, replica: Replica, exc: BaseException) -> None:
+        replica.failures += 1
+        cooldown = min(self.eject_seconds * 2 ** (replica.failures - 1), self.max_eject_seconds)
+        replica.ejected_until = time.monotonic() + cooldown
+        logger.warning(f"Réplica {replica.name} expulsada durante {cooldown:.0f}s: {exc}")
+
+    def _watch(self, replica: Replica) -> None:
+        sync_engine = replica.engine.sync_engine
+
+        @event.listens_for(sync_engine, "handle_error")
+        def on_error(context):
+            # Sin conexión = falló al conectar
+            replica.connect_failed = context.connection is None
+            if context.is_disconnect or replica.connect_failed:
+                self.eject(replica, context.original_exception)
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def on_success(*args):
+            if replica.failures:
+                logger.info(f"Réplica {replica.name} recuperada")
+                replica.failures = 0
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            replica.name: {"available": replica.available, "in_use": replica.in_use()}
+            for replica in self.replicas
+        }
+
+
+def _is_read(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Session que reparte las lecturas entre las réplicas de `info["router"]`"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router: Optional[ReplicaRouter] = self.info.get("router")
+        if router is None or self.info.get("primary"):
+            return super().get_bind(mapper, clause=clause, **kw)
+
+        if self._flushing or not _is_read(clause):
+            # A partir de aquí la sesión lee sus propias escrituras
+            self.info["primary"] = True
+            return super().get_bind(mapper, clause=clause, **kw)
+
+        replica = router.choose()
+        self.info["replica"] = replica
+        if replica is None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        return replica.read_engine if self.info.get("read_only") else replica.engine.sync_engine
+
+    def execute(self, statement, *args, **kw):
+        self.info.pop("replica", None)
+        try:
+            return super().execute(statement, *args, **kw)
+        except DBAPIError:
+            # Si la réplica elegida no aceptó la conexión, la sesión no llegó
+            # a usarla: se repite la consulta en otra réplica o en el primario
+            replica = self.info.pop("replica", None)
+            if replica is None or not replica.connect_failed or replica.available:
+                raise
+            return super().execute(statement, *args, **kw)
+
+
+class ReadOnlySession(RoutingSession):
+    """
+    Session de solo lectura (`get_read_db`)
+
+    Va ligada a un engine en modo AUTOCOMMIT (sin BEGIN/COMMIT, ver
+    `read_only_bind`) y devuelve la conexión al pool en cuanto termina cada
+    consulta (`prebuffer_rows`: las filas y los objetos ORM se construyen
+    antes de cerrarla). Los objetos se devuelven desasociados, con sus
+    columnas cargadas: no admite escrituras, relaciones ni cargas diferidas.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or not _is_read(clause):
+            raise RuntimeError("Sesión de solo lectura: usar get_db para escribir")
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def execute(self, statement, *args, **kw):
+        options = kw.get("execution_options") or {}
+        if options.get("stream_results"):
+            return super().execute(statement, *args, **kw)
+        # Construir las filas (y los objetos ORM) antes de cerrar la sesión
+        kw["execution_options"] = {**options, "prebuffer_rows": True}
+        try:
+            return super().execute(statement, *args, **kw)
+        finally:
+            self.close()
+
+
+def use_primary(session: AsyncSession) -> None:
+    """Enviar al primario el resto de consultas de la sesión"""
+    session.info["primary"] = True
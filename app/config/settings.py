@@ -17,19 +17,100 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     
+    # Servidor de producción (python -m scripts.serve; 0 workers = número de CPUs)
+    WEB_WORKERS: int = 0
+    WEB_LOOP: str = "auto"
+    WEB_HTTP: str = "auto"
+    WEB_PRELOAD: bool = True
+    WEB_MAX_REQUESTS: int = 0
+    WEB_MAX_REQUESTS_JITTER: int = 0
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    WEB_KEEPALIVE_TIMEOUT: int = 5
+    WEB_BACKLOG: int = 2048
+    WEB_PROXY_HEADERS: bool = True
+    WEB_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    
+    # Logging
+    LOG_JSON: bool = True
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    
+    # Startup (presupuesto de `python -X importtime -c "import main"`, ver tests/test_startup.py)
+    IMPORT_TIME_BUDGET_MS: int = 2000
+    
+    # Metrics (con varios workers definir PROMETHEUS_MULTIPROC_DIR)
+    METRICS_ENABLED: bool = True
+    
     # Database
     DATABASE_URL: str = ""
     DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: str = "idle"
+    DB_POOL_PRE_PING_IDLE_SECONDS: float = 30.0
+    DB_POOL_ADVISOR_ENABLED: bool = False
+    DB_POOL_ADVISOR_WINDOW: float = 60.0
+    DB_POOL_ADVISOR_HEADROOM: float = 1.2
+    
+    # Réplicas de lectura (vacío = todo al primario)
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_STRATEGY: str = "round_robin"
+    DB_REPLICA_EJECT_SECONDS: float = 30.0
+    
+    # asyncpg: caché de sentencias preparadas (0 para PgBouncer en modo transaction)
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_CACHE_SIZE: int = 100
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    JWT_BACKEND: str = "jose"
+    JWT_KEYS_DIR: str = ""
+    JWT_ACTIVE_KID: str = ""
+    JWT_PREVIOUS_SECRET_KEYS: List[str] = []
+    JWKS_CACHE_MAX_AGE: int = 300
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    
+    # Password hashing (0 = número de CPUs)
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_QUEUE: int = 100
+    
+    # Esquemas de contraseñas: el primero para hashes nuevos (ver scripts/calibrate_password_hash.py)
+    PASSWORD_SCHEMES: List[str] = ["bcrypt", "argon2"]
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    PASSWORD_REHASH_ON_LOGIN: bool = True
+    
+    # Pagination
+    PAGINATION_MAX_LIMIT: int = 500
+    
+    # Bulk import
+    IMPORT_BATCH_SIZE: int = 500
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_PASSWORD: str = ""
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    REDIS_FAILURE_BACKOFF: int = 30
+    
+    # User cache (memoria local + Redis)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_LOCAL_TTL: float = 5.0
+    USER_CACHE_LOCAL_MAX_SIZE: int = 1024
+    USER_CACHE_REDIS_TTL: int = 300
+    # Tras una escritura, los rellenos de la caché leen del primario durante
+    # estos segundos: debe cubrir el retraso máximo de las réplicas
+    USER_CACHE_INVALIDATION_WINDOW: int = 5
+    
+    # Singleflight: lecturas concurrentes del mismo usuario comparten una consulta
+    USER_SINGLEFLIGHT_BY_ID: bool = True
+    USER_SINGLEFLIGHT_BY_EMAIL: bool = True
     
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
@@ -40,16 +121,34 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_LEASE_RATIO: float = 0.1
+    
+    # Protección contra fuerza bruta en el login (fallos por ventana, bloqueo exponencial)
+    LOGIN_GUARD_ENABLED: bool = True
+    LOGIN_GUARD_WINDOW: int = 900
+    LOGIN_GUARD_ACCOUNT_MAX_FAILURES: int = 5
+    LOGIN_GUARD_IP_MAX_FAILURES: int = 50
+    LOGIN_GUARD_LOCKOUT_BASE: int = 60
+    LOGIN_GUARD_LOCKOUT_MAX: int = 3600
     
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
     
+    # Tareas en segundo plano ("celery" o "eager" = en este proceso)
+    TASKS_MODE: str = "eager"
+    TASKS_EAGER_WORKERS: int = 4
+    TASKS_MAX_RETRIES: int = 3
+    TASKS_RETRY_BACKOFF: float = 2.0
+    TASKS_RETRY_BACKOFF_MAX: float = 60.0
+    TASKS_SHUTDOWN_TIMEOUT: float = 10.0
+    
     # Email (Optional)
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
+    SMTP_SSL: bool = False
     EMAIL_FROM: str = ""
     
     # Cloudinary (Optional)
@@ -0,0 +1,272 @@
+"""
+Caché de dos niveles: memoria local con TTL + Redis
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.config.redis import get_redis
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Marca escrita en Redis al invalidar: bloquea rellenos con datos leídos antes del cambio
+TOMBSTONE = "__invalidated__"
+
+
+class LocalTTLCache:
+    """LRU en memoria con expiración por entrada"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TwoTierCache:
+    """
+    Caché read-through con un nivel local pequeño y Redis como nivel compartido.
+
+    - Los valores deben ser serializables a JSON.
+    - Si Redis falla, se degrada a solo memoria local durante
+      `REDIS_FAILURE_BACKOFF` segundos en lugar de fallar la petición.
+    - `delete` invalida ambos niveles, deja una marca temporal en Redis y
+      publica la clave para que los demás workers la expulsen de su nivel local.
+    - Durante `tombstone_ttl` segundos tras una invalidación (propia o de otro
+      worker) `recently_invalidated` es True: quien rellena la caché debe
+      leer del primario, no de una réplica que aún no tiene el cambio.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        local_ttl: float = 5.0,
+        local_max_size: int = 1024,
+        redis_ttl: int = 300,
+        tombstone_ttl: int = 5,
+        redis_getter: Callable[[], Any] = get_redis,
+    ):
+        self.namespace = namespace
+        self.channel = f"{namespace}:invalidate"
+        self.redis_ttl = redis_ttl
+        self.tombstone_ttl = tombstone_ttl
+        self.local = LocalTTLCache(max_size=local_max_size, ttl=local_ttl)
+        self._redis_getter = redis_getter
+        self._redis_down_until = 0.0
+        self._invalidated: Dict[str, float] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _redis(self):
+        if time.monotonic() < self._redis_down_until:
+            return None
+        return self._redis_getter()
+
+    def _redis_failed(self, exc: Exception) -> None:
+        logger.warning(f"Redis no disponible para caché '{self.namespace}': {exc}")
+        self._redis_down_until = time.monotonic() + settings.REDIS_FAILURE_BACKOFF
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Obtener un valor (local y luego Redis)"""
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = await client.get(self._key(key))
+            except Exception as exc:
+                self._redis_failed(exc)
+                raw = None
+            if raw == TOMBSTONE:
+                self._saw_tombstone(key)
+            elif raw is not None:
+                value = json.loads(raw)
+                self.local.set(key, value)
+                self.redis_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Como `get` para varias claves: las que faltan en local, con un solo MGET"""
+        values: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is not None:
+                values[key] = value
+            else:
+                missing.append(key)
+        self.hits += len(values)
+
+        client = self._redis() if missing else None
+        if client is not None:
+            try:
+                raws = await client.mget([self._key(key) for key in missing])
+            except Exception as exc:
+                self._redis_failed(exc)
+                raws = [None] * len(missing)
+            for key, raw in zip(missing, raws):
+                if raw == TOMBSTONE:
+                    self._saw_tombstone(key)
+                elif raw is not None:
+                    values[key] = json.loads(raw)
+                    self.local.set(key, values[key])
+                    self.redis_hits += 1
+
+        self.misses += len(keys) - len(values)
+        return values
+
+    async def set(self, key: str, value: Any, read_started: Optional[float] = None) -> None:
+        """
+        Guardar un valor
+        Si se indica `read_started`, no se guarda cuando la clave fue invalidada
+        después de esa lectura (evita repoblar con datos obsoletos)
+        """
+        if read_started is not None and self._invalidated.get(key, 0.0) >= read_started:
+            return
+
+        client = self._redis()
+        if client is not None:
+            try:
+                # NX: no pisar la marca de invalidación ni un valor más reciente
+                stored = await client.set(self._key(key), json.dumps(value), ex=self.redis_ttl, nx=True)
+            except Exception as exc:
+                self._redis_failed(exc)
+            else:
+                if not stored:
+                    # Redis tiene la marca o un valor de otro worker: ese manda
+                    return
+        self.local.set(key, value)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Read-through: obtener de caché o cargar con `loader` y guardar"""
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        read_started = time.monotonic()
+        value = await loader()
+        if value is not None:
+            await self.set(key, value, read_started=read_started)
+        return value
+
+    async def delete(self, *keys: str) -> None:
+        """Invalidar claves en todos los niveles y notificar a otros workers"""
+        now = time.monotonic()
+        for key in keys:
+            self.local.pop(key)
+            self._invalidated[key] = now
+        self._prune_invalidations(now)
+
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(self._key(key), TOMBSTONE, ex=self.tombstone_ttl)
+                    pipe.publish(self.channel, key)
+                await pipe.execute()
+        except Exception as exc:
+            self._redis_failed(exc)
+
+    def recently_invalidated(self, key: str) -> bool:
+        """La clave se invalidó hace menos de `tombstone_ttl` segundos"""
+        invalidated_at = self._invalidated.get(key)
+        return invalidated_at is not None and time.monotonic() - invalidated_at < self.tombstone_ttl
+
+    def _saw_tombstone(self, key: str) -> None:
+        # Invalidada por otro worker hace a lo sumo `tombstone_ttl` segundos
+        if not self.recently_invalidated(key):
+            self._invalidated[key] = time.monotonic()
+
+    def _prune_invalidations(self, now: float) -> None:
+        if len(self._invalidated) < 1024:
+            return
+        horizon = now - self.tombstone_ttl
+        for key in [k for k, at in self._invalidated.items() if at < horizon]:
+            del self._invalidated[key]
+
+    def clear_local(self) -> None:
+        self.local.clear()
+        self._invalidated.clear()
+
+    async def start_listener(self) -> None:
+        """Escuchar invalidaciones publicadas por otros workers"""
+        client = self._redis()
+        if client is None or self._listener is not None:
+            return
+        self._listener = asyncio.create_task(self._listen(client))
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self, client) -> None:
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self.local.pop(message["data"])
+                            self._invalidated[message["data"]] = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._redis_failed(exc)
+                # Sin invalidaciones remotas el nivel local puede quedar obsoleto
+                self.local.clear()
+                await asyncio.sleep(settings.REDIS_FAILURE_BACKOFF)
+
+    def stats(self) -> dict:
+        return {
+            "local_size": len(self.local),
+            "local_hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
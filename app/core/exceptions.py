@@ -38,6 +38,22 @@ class ConflictException(HTTPException):
         super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
 
 
+class TooManyRequestsException(HTTPException):
+    """Excepción para exceso de solicitudes"""
+    def __init__(self, detail: str = "Demasiadas solicitudes", retry_after: int = 60):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class ServiceUnavailableException(HTTPException):
+    """Excepción para servicio temporalmente no disponible"""
+    def __init__(self, detail: str = "Servicio no disponible"):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail)
+
+
 class InternalServerException(HTTPException):
     """Excepción para errores internos del servidor"""
     def __init__(self, detail: str = "Error interno del servidor"):
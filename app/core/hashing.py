@@ -0,0 +1,111 @@
+"""
+Ejecutor de hashing de contraseñas fuera del event loop
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from app.config.settings import settings
+from app.core.exceptions import ServiceUnavailableException
+from app.core.metrics import (
+    PASSWORD_HASH_QUEUE_DEPTH,
+    PASSWORD_HASH_QUEUE_WAIT,
+    PASSWORD_HASH_REJECTED,
+)
+
+
+class PasswordHashExecutor:
+    """
+    Ejecuta operaciones bcrypt en un pool de procesos acotado.
+
+    El número de operaciones simultáneas se limita al tamaño del pool con un
+    semáforo, de modo que la espera ocurre en el event loop (medible) y no en
+    la cola interna del executor. Si hay más de `max_queue` operaciones
+    esperando, se rechaza la petición en lugar de acumular latencia.
+    """
+
+    def __init__(self, workers: int = 0, max_queue: int = 100):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" evita heredar el estado del event loop y locks del proceso padre
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        return self._semaphore
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Ejecutar `func(*args)` en el pool y esperar el resultado"""
+        if self._waiting >= self.max_queue:
+            self._rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise ServiceUnavailableException("Servidor ocupado, intenta de nuevo más tarde")
+
+        semaphore = self._get_semaphore()
+        self._waiting += 1
+        PASSWORD_HASH_QUEUE_DEPTH.set(self._waiting)
+        start = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+            PASSWORD_HASH_QUEUE_DEPTH.set(self._waiting)
+
+        wait = time.perf_counter() - start
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        PASSWORD_HASH_QUEUE_WAIT.observe(wait)
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        """Estadísticas de cola y tiempos de espera"""
+        started = self._completed + self._in_flight
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._waiting,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "wait_seconds_total": self._wait_total,
+            "wait_seconds_max": self._wait_max,
+            "wait_seconds_avg": self._wait_total / started if started else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """Detener el pool de procesos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._semaphore = None
+
+
+password_executor = PasswordHashExecutor(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,258 @@
+"""
+Protección contra fuerza bruta en el login
+
+Se cuentan los intentos fallidos por cuenta (email) y por IP con una ventana
+deslizante aproximada (contador de la ventana actual + contador ponderado de
+la anterior, igual que el rate limiter). Al llegar al máximo de fallos la
+clave queda bloqueada LOGIN_GUARD_LOCKOUT_BASE * 2^(bloqueos previos)
+segundos, hasta LOGIN_GUARD_LOCKOUT_MAX.
+
+La comprobación ocurre antes de consultar la base de datos y de verificar la
+contraseña: un intento bloqueado no cuesta un bcrypt. Cada worker guarda los
+bloqueos que conoce en memoria (sin I/O); con Redis los contadores y los
+bloqueos son compartidos y un worker consulta los bloqueos de los demás con
+un único MGET.
+"""
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config.redis import get_redis
+from app.config.settings import settings
+from app.core.exceptions import TooManyRequestsException
+from app.core.metrics import LOGIN_GUARD_LOCKOUTS, LOGIN_GUARD_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Máximo de claves mantenidas en memoria antes de purgar
+MAX_LOCAL_KEYS = 100_000
+
+# KEYS[1] = ventana actual, KEYS[2] = ventana anterior, KEYS[3] = bloqueo, KEYS[4] = bloqueos previos
+# ARGV = máximo de fallos, duración de la ventana (s), peso de la ventana anterior,
+#        bloqueo base (s), bloqueo máximo (s), ahora (epoch)
+# Retorna "0" o el fin del bloqueo (como texto: Redis trunca los números de Lua)
+RECORD_FAILURE = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+local base = tonumber(ARGV[4])
+local max = tonumber(ARGV[5])
+local now = tonumber(ARGV[6])
+local current = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], window * 2)
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * weight + current < limit then
+    return '0'
+end
+local strikes = redis.call('INCR', KEYS[4])
+redis.call('EXPIRE', KEYS[4], window + max)
+local duration = math.min(base * 2 ^ (strikes - 1), max)
+local locked_until = now + duration
+redis.call('SET', KEYS[3], tostring(locked_until), 'EX', math.ceil(duration))
+redis.call('DEL', KEYS[1], KEYS[2])
+return tostring(locked_until)
+"""
+
+
+class FailureWindow:
+    """Estado local de una clave (cuenta o IP)"""
+    __slots__ = ("index", "current", "previous", "locked_until", "strikes", "strikes_until")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.current = 0
+        self.previous = 0
+        self.locked_until = 0.0
+        self.strikes = 0
+        self.strikes_until = 0.0
+
+
+class LoginGuard:
+    """Contador de intentos fallidos con bloqueo exponencial por cuenta y por IP"""
+
+    def __init__(self, namespace: str = "lg", redis_getter: Callable[[], Any] = get_redis):
+        self.namespace = namespace
+        self._redis_getter = redis_getter
+        self._redis_down_until = 0.0
+        self._script = None
+        self._script_client = None
+        self._entries: Dict[str, FailureWindow] = {}
+
+    @staticmethod
+    def keys(email: str, client_ip: Optional[str]) -> List[Tuple[str, str, int]]:
+        """(scope, clave, máximo de fallos) que se comprueban en un intento"""
+        keys = [("account", f"account:{email.strip().lower()}", settings.LOGIN_GUARD_ACCOUNT_MAX_FAILURES)]
+        if client_ip:
+            keys.append(("ip", f"ip:{client_ip}", settings.LOGIN_GUARD_IP_MAX_FAILURES))
+        return keys
+
+    # Antes de verificar la contraseña
+
+    async def check(self, email: str, client_ip: Optional[str] = None) -> None:
+        """Lanzar 429 si la cuenta o la IP están bloqueadas"""
+        if not settings.LOGIN_GUARD_ENABLED:
+            return
+        now = time.time()
+        keys = self.keys(email, client_ip)
+
+        # Hot path: bloqueos ya conocidos por este worker
+        for scope, key, _ in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry.locked_until > now:
+                self._reject(scope, entry.locked_until, now)
+
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            values = await client.mget([f"{self.namespace}:{key}:lock" for _, key, _ in keys])
+        except Exception as exc:
+            self._redis_failed(exc)
+            return
+
+        for (scope, key, _), value in zip(keys, values):
+            if value is not None and float(value) > now:
+                self._entry(key, now).locked_until = float(value)
+                self._reject(scope, float(value), now)
+
+    @staticmethod
+    def _reject(scope: str, locked_until: float, now: float) -> None:
+        LOGIN_GUARD_REJECTIONS.labels(scope).inc()
+        raise TooManyRequestsException(
+            "Demasiados intentos fallidos, intente más tarde",
+            retry_after=max(1, math.ceil(locked_until - now))
+        )
+
+    # Después de verificar la contraseña
+
+    async def record_failure(self, email: str, client_ip: Optional[str] = None) -> None:
+        """Contar un intento fallido; bloquear las claves que llegan al máximo"""
+        if not settings.LOGIN_GUARD_ENABLED:
+            return
+        now = time.time()
+        window = settings.LOGIN_GUARD_WINDOW
+        index = math.floor(now / window)
+        weight = 1 - (now - index * window) / window
+
+        client = self._get_client()
+        for scope, key, limit in self.keys(email, client_ip):
+            locked_until = None
+            if client is not None:
+                locked_until = await self._record_failure_redis(client, key, limit, index, weight, now)
+            if locked_until is None:
+                locked_until = self._record_failure_local(key, limit, index, weight, now)
+            if locked_until:
+                self._entry(key, now).locked_until = locked_until
+                LOGIN_GUARD_LOCKOUTS.labels(scope).inc()
+                logger.warning(f"Login bloqueado para {key} hasta {locked_until:.0f}")
+
+    async def _record_failure_redis(
+        self, client, key: str, limit: int, index: int, weight: float, now: float
+    ) -> Optional[float]:
+        """Retorna el fin del bloqueo, 0 si no se bloqueó o None si Redis falló"""
+        prefix = f"{self.namespace}:{key}"
+        try:
+            result = await self._get_script(client)(
+                keys=[f"{prefix}:{index}", f"{prefix}:{index - 1}", f"{prefix}:lock", f"{prefix}:strikes"],
+                args=[
+                    limit,
+                    settings.LOGIN_GUARD_WINDOW,
+                    weight,
+                    settings.LOGIN_GUARD_LOCKOUT_BASE,
+                    settings.LOGIN_GUARD_LOCKOUT_MAX,
+                    now,
+                ]
+            )
+        except Exception as exc:
+            self._redis_failed(exc)
+            return None
+        return float(result)
+
+    def _record_failure_local(self, key: str, limit: int, index: int, weight: float, now: float) -> float:
+        """Misma lógica que RECORD_FAILURE sobre el estado en memoria"""
+        entry = self._entry(key, now)
+        if entry.index != index:
+            entry.previous = entry.current if entry.index == index - 1 else 0
+            entry.current = 0
+            entry.index = index
+        entry.current += 1
+        if entry.previous * weight + entry.current < limit:
+            return 0.0
+
+        if entry.strikes_until <= now:
+            entry.strikes = 0
+        entry.strikes += 1
+        entry.strikes_until = now + settings.LOGIN_GUARD_WINDOW + settings.LOGIN_GUARD_LOCKOUT_MAX
+        duration = min(
+            settings.LOGIN_GUARD_LOCKOUT_BASE * 2 ** (entry.strikes - 1),
+            settings.LOGIN_GUARD_LOCKOUT_MAX
+        )
+        entry.current = entry.previous = 0
+        return now + duration
+
+    async def record_success(self, email: str) -> None:
+        """Login correcto: olvidar los fallos de la cuenta (los de la IP se mantienen)"""
+        if not settings.LOGIN_GUARD_ENABLED:
+            return
+        _, key, _ = self.keys(email, None)[0]
+        self._entries.pop(key, None)
+
+        client = self._get_client()
+        if client is None:
+            return
+        index = math.floor(time.time() / settings.LOGIN_GUARD_WINDOW)
+        prefix = f"{self.namespace}:{key}"
+        try:
+            await client.delete(f"{prefix}:{index}", f"{prefix}:{index - 1}", f"{prefix}:strikes")
+        except Exception as exc:
+            self._redis_failed(exc)
+
+    # Estado
+
+    def _entry(self, key: str, now: float) -> FailureWindow:
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= MAX_LOCAL_KEYS:
+                self._prune(now)
+            entry = self._entries[key] = FailureWindow(math.floor(now / settings.LOGIN_GUARD_WINDOW))
+        return entry
+
+    def _prune(self, now: float) -> None:
+        """Descartar claves sin bloqueo vigente ni fallos recientes"""
+        index = math.floor(now / settings.LOGIN_GUARD_WINDOW)
+        self._entries = {
+            key: entry for key, entry in self._entries.items()
+            if entry.locked_until > now or entry.strikes_until > now or entry.index >= index - 1
+        }
+
+    def _get_client(self):
+        client = self._redis_getter()
+        # Con Redis caído se sigue protegiendo con el estado local
+        if client is None or time.monotonic() < self._redis_down_until:
+            return None
+        return client
+
+    def _redis_failed(self, exc: Exception) -> None:
+        logger.warning(f"Redis no disponible para la protección del login: {exc}")
+        self._redis_down_until = time.monotonic() + settings.REDIS_FAILURE_BACKOFF
+
+    def _get_script(self, client):
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(RECORD_FAILURE)
+            self._script_client = client
+        return self._script
+
+    def reset(self) -> None:
+        """Olvidar el estado local"""
+        self._entries.clear()
+        self._redis_down_until = 0.0
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "tracked_keys": len(self._entries),
+            "locked_keys": sum(1 for entry in self._entries.values() if entry.locked_until > now),
+        }
+
+
+login_guard = LoginGuard()
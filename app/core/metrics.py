@@ -0,0 +1,174 @@
+"""
+Métricas en formato Prometheus
+
+Con varios workers de uvicorn, definir la variable de entorno
+PROMETHEUS_MULTIPROC_DIR (directorio vacío y escribible) antes de arrancar:
+cada proceso escribe sus valores en ese directorio y /metrics los agrega.
+"""
+import os
+from typing import Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# HTTP
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Requests HTTP por ruta y código de estado",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de requests HTTP por ruta",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Pool de conexiones
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Conexiones del pool en uso",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Conexiones abiertas por encima de pool_size",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Tiempo de espera para obtener una conexión del pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CONNECTION_HOLD = Histogram(
+    "db_pool_connection_hold_seconds",
+    "Tiempo entre el checkout y el checkin de una conexión del pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+DB_POOL_WAITING = Gauge(
+    "db_pool_waiting_checkouts",
+    "Checkouts esperando una conexión del pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Conexiones en uso sobre la capacidad del pool (pool_size + max_overflow)",
+    multiprocess_mode="livemax",
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts que superaron DB_POOL_TIMEOUT",
+)
+DB_POOL_RECOMMENDED_SIZE = Gauge(
+    "db_pool_recommended_size",
+    "pool_size recomendado según la concurrencia observada (DB_POOL_ADVISOR_ENABLED)",
+    multiprocess_mode="livemax",
+)
+
+# Hashing de contraseñas
+PASSWORD_HASH_OPERATIONS = Counter(
+    "password_hash_operations_total",
+    "Operaciones de hash de contraseñas",
+    ["operation"],
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Tiempo de espera en la cola del pool de hashing",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Operaciones de hash esperando un proceso libre",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Operaciones de hash rechazadas por cola llena",
+)
+
+# Rate limiting
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rechazados por rate limiting",
+    ["route"],
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Decisiones de rate limiting por origen (local, redis, memory, fail_open)",
+    ["source"],
+)
+
+# Protección del login
+LOGIN_GUARD_REJECTIONS = Counter(
+    "login_guard_rejections_total",
+    "Intentos de login rechazados sin verificar la contraseña, por tipo de bloqueo",
+    ["scope"],
+)
+LOGIN_GUARD_LOCKOUTS = Counter(
+    "login_guard_lockouts_total",
+    "Bloqueos por intentos fallidos (account, ip)",
+    ["scope"],
+)
+
+# Singleflight (lecturas idénticas concurrentes)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Llamadas por rol: leader ejecuta la carga, follower espera la de otro",
+    ["group", "role"],
+)
+SINGLEFLIGHT_IN_FLIGHT = Gauge(
+    "singleflight_in_flight_keys",
+    "Claves con una carga en curso",
+    ["group"],
+    multiprocess_mode="livesum",
+)
+SINGLEFLIGHT_WAITERS = Histogram(
+    "singleflight_waiters_per_key",
+    "Llamadas atendidas por cada carga (líder + seguidores)",
+    ["group"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+# Tareas en segundo plano
+TASK_RUNS = Counter(
+    "tasks_total",
+    "Ejecuciones de tareas por resultado (success, retry, failure)",
+    ["task", "status"],
+)
+TASK_DURATION = Histogram(
+    "task_duration_seconds",
+    "Duración de cada intento de una tarea",
+    ["task"],
+    buckets=LATENCY_BUCKETS,
+)
+TASK_QUEUE_LATENCY = Histogram(
+    "task_queue_latency_seconds",
+    "Tiempo entre el encolado y el inicio de una tarea",
+    ["task"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0),
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Generar el texto de exposición Prometheus"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead(pid: int) -> None:
+    """Descartar los gauges de un worker que terminó (modo multiproceso)"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,232 @@
+"""
+Rate limiting compartido entre workers (Redis) con fast path local
+
+Cada límite ("5/minute") se aplica con una ventana deslizante aproximada
+(contador de la ventana actual + contador ponderado de la anterior) que se
+evalúa atómicamente en Redis con un script Lua.
+
+Para evitar un round trip a Redis en cada request, el script puede conceder
+un lote de tokens (lease) cuando el cliente está claramente por debajo del
+límite; el worker los consume localmente hasta el final de la ventana. Los
+tokens concedidos ya cuentan en Redis, por lo que el límite global nunca se
+supera. Cerca del límite el lote es de 1 token y cada hit consulta Redis.
+"""
+import functools
+import logging
+import math
+import re
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+from fastapi import Request
+from app.config.redis import get_redis
+from app.config.settings import settings
+from app.core.exceptions import TooManyRequestsException
+from app.core.metrics import RATE_LIMIT_DECISIONS, RATE_LIMIT_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Máximo de claves (cliente, límite) mantenidas en memoria antes de purgar
+MAX_LOCAL_KEYS = 100_000
+
+# KEYS[1] = ventana actual, KEYS[2] = ventana anterior
+# ARGV = límite, duración de la ventana (s), peso de la ventana anterior, tokens pedidos
+SLIDING_WINDOW_LEASE = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local available = math.floor(limit - (previous * weight + current))
+if available <= 0 then
+    return 0
+end
+local grant = 1
+if available >= requested * 2 then
+    grant = requested
+end
+redis.call('INCRBY', KEYS[1], grant)
+redis.call('EXPIRE', KEYS[1], window * 2)
+return grant
+"""
+
+
+GRANULARITIES = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+LIMIT_PATTERN = re.compile(
+    r"^\s*(?P<amount>\d+)\s*(?:/|per)\s*(?P<multiples>\d+)?\s*"
+    r"(?P<granularity>second|minute|hour|day)s?\s*$"
+)
+
+
+class RateLimitItem(NamedTuple):
+    """Límite `amount` por ventana de `multiples` x `granularity`"""
+    amount: int
+    multiples: int
+    granularity: str
+
+    def get_expiry(self) -> int:
+        """Duración de la ventana en segundos"""
+        return self.multiples * GRANULARITIES[self.granularity]
+
+    def __str__(self) -> str:
+        return f"{self.amount} per {self.multiples} {self.granularity}"
+
+
+def parse_limit(limit_value: str) -> RateLimitItem:
+    """Parsear "10/minute", "100 per 2 hours"... (misma notación que `limits`)"""
+    match = LIMIT_PATTERN.match(limit_value.lower())
+    if match is None:
+        raise ValueError(f"Límite inválido: {limit_value!r}")
+    return RateLimitItem(
+        int(match["amount"]),
+        int(match["multiples"] or 1),
+        match["granularity"],
+    )
+
+
+def get_remote_address(request: Request) -> str:
+    """Clave por defecto: IP del cliente"""
+    return request.client.host if request.client else "127.0.0.1"
+
+
+class RateLimiter:
+    """
+    Limiter asíncrono con la misma API de decorador que slowapi:
+
+        @router.post("/register")
+        @limiter.limit("5/minute")
+        async def register(request: Request, ...):
+    """
+
+    def __init__(
+        self,
+        key_func: Callable[[Request], str] = get_remote_address,
+        enabled: bool = True,
+        lease_ratio: float = 0.1,
+        redis_getter: Callable[[], Any] = get_redis,
+    ):
+        self.key_func = key_func
+        self.enabled = enabled
+        self.lease_ratio = lease_ratio
+        self._redis_getter = redis_getter
+        self._redis_down_until = 0.0
+        self._script = None
+        self._script_client = None
+        # key -> [tokens restantes, fin de la ventana]
+        self._leases: Dict[str, List[float]] = {}
+        # key -> (índice de ventana, contador actual, contador anterior) cuando no hay Redis
+        self._windows: Dict[str, Tuple[int, int, int]] = {}
+
+    def limit(self, limit_value: str):
+        """Decorador que aplica `limit_value` (p. ej. "10/minute") al endpoint"""
+        item = parse_limit(limit_value)
+
+        def decorator(func):
+            scope = f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if self.enabled:
+                    request = kwargs.get("request") or next(
+                        (arg for arg in args if isinstance(arg, Request)), None
+                    )
+                    if request is None:
+                        raise RuntimeError(f"{scope} necesita un parámetro `request: Request`")
+                    await self.hit(request, item, scope)
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    async def hit(self, request: Request, item: RateLimitItem, scope: str) -> None:
+        """Consumir un token o lanzar 429"""
+        key = f"rl:{scope}:{item.amount}/{item.get_expiry()}:{self.key_func(request)}"
+        window = item.get_expiry()
+        now = time.time()
+
+        # Fast path: tokens concedidos previamente por Redis
+        lease = self._leases.get(key)
+        if lease is not None and lease[0] > 0 and now < lease[1]:
+            lease[0] -= 1
+            RATE_LIMIT_DECISIONS.labels("local").inc()
+            return
+
+        granted = await self._acquire(key, item.amount, window, now)
+        if granted > 0:
+            if len(self._leases) >= MAX_LOCAL_KEYS:
+                self._prune(now)
+            window_end = (math.floor(now / window) + 1) * window
+            self._leases[key] = [granted - 1, window_end]
+            return
+
+        self._leases.pop(key, None)
+        route = request.scope.get("route")
+        RATE_LIMIT_REJECTIONS.labels(getattr(route, "path", scope)).inc()
+        retry_after = max(1, math.ceil((math.floor(now / window) + 1) * window - now))
+        raise TooManyRequestsException(
+            f"Límite de solicitudes excedido: {item}",
+            retry_after=retry_after
+        )
+
+    async def _acquire(self, key: str, limit: int, window: int, now: float) -> int:
+        """Pedir tokens a Redis; retorna cuántos se concedieron (0 = rechazar)"""
+        index = math.floor(now / window)
+        weight = 1 - (now - index * window) / window
+        requested = max(1, int(limit * self.lease_ratio))
+
+        client = self._redis_getter()
+        if client is None:
+            RATE_LIMIT_DECISIONS.labels("memory").inc()
+            return self._acquire_local(key, limit, index, weight)
+
+        # Fail open: un Redis caído no debe tumbar la API
+        if time.monotonic() < self._redis_down_until:
+            RATE_LIMIT_DECISIONS.labels("fail_open").inc()
+            return 1
+
+        try:
+            granted = await self._get_script(client)(
+                keys=[f"{key}:{index}", f"{key}:{index - 1}"],
+                args=[limit, window, weight, requested]
+            )
+        except Exception as exc:
+            logger.warning(f"Redis no disponible para rate limiting: {exc}")
+            self._redis_down_until = time.monotonic() + settings.REDIS_FAILURE_BACKOFF
+            RATE_LIMIT_DECISIONS.labels("fail_open").inc()
+            return 1
+
+        RATE_LIMIT_DECISIONS.labels("redis").inc()
+        return int(granted)
+
+    def _acquire_local(self, key: str, limit: int, index: int, weight: float) -> int:
+        """Ventana deslizante en memoria (sin REDIS_URL configurada)"""
+        window_index, current, previous = self._windows.get(key, (index, 0, 0))
+        if window_index != index:
+            previous = current if window_index == index - 1 else 0
+            current = 0
+        if previous * weight + current >= limit:
+            self._windows[key] = (index, current, previous)
+            return 0
+        self._windows[key] = (index, current + 1, previous)
+        return 1
+
+    def _prune(self, now: float) -> None:
+        """Descartar leases vencidos para acotar la memoria"""
+        for key in [key for key, (_, window_end) in self._leases.items() if window_end <= now]:
+            del self._leases[key]
+        if len(self._windows) >= MAX_LOCAL_KEYS:
+            self._windows.clear()
+
+    def _get_script(self, client):
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(SLIDING_WINDOW_LEASE)
+            self._script_client = client
+        return self._script
+
+    def reset(self) -> None:
+        """Olvidar el estado local (tokens concedidos y ventanas en memoria)"""
+        self._leases.clear()
+        self._windows.clear()
+
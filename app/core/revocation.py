@@ -0,0 +1,198 @@
+"""
+Revocación de tokens JWT
+
+- Revocación individual: el `jti` del token se guarda en Redis con un TTL
+  igual a la vida restante del token (más un índice ordenado por `exp` para
+  que los workers puedan cargar el estado al arrancar).
+- Revocar todas las sesiones de un usuario: se incrementa su generación de
+  tokens. Cada token lleva la generación vigente al emitirse (`gen`) y los
+  de generaciones anteriores dejan de ser válidos.
+
+Cada worker mantiene un espejo en memoria (jti -> exp y usuario ->
+generación) actualizado por pub/sub, de modo que `verify_token` comprueba la
+revocación sin ir a Redis. Al emitir tokens (login, refresh) la generación se
+lee de Redis: con el espejo aún sin cargar, un token nuevo con `gen`
+anterior sería rechazado por los demás workers.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+from app.config.redis import get_redis
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationStore:
+    """Denylist de tokens compartida por Redis con espejo local por worker"""
+
+    def __init__(self, namespace: str = "revoke", redis_getter: Callable[[], Any] = get_redis):
+        self.namespace = namespace
+        self.channel = f"{namespace}:events"
+        self._index_key = f"{namespace}:jtis"
+        self._generations_key = f"{namespace}:generations"
+        self._redis_getter = redis_getter
+        self._revoked: Dict[str, float] = {}
+        self._generations: Dict[int, int] = {}
+        self._prune_at = 1024
+        self._listener: Optional[asyncio.Task] = None
+        self._loaded = asyncio.Event()
+
+    # Hot path (sin I/O)
+
+    def is_revoked(self, payload: dict) -> bool:
+        """Comprobar un payload ya verificado contra el espejo local"""
+        jti = payload.get("jti")
+        if jti is not None:
+            exp = self._revoked.get(jti)
+            if exp is not None and exp > time.time():
+                return True
+        generation = self._generations.get(payload.get("sub"))
+        return generation is not None and payload.get("gen", 0) < generation
+
+    def generation(self, user_id: int) -> int:
+        """Generación vigente de tokens del usuario (para emitir tokens nuevos)"""
+        return self._generations.get(user_id, 0)
+
+    async def current_generation(self, user_id: int) -> int:
+        """
+        Generación vigente leída de Redis (HGET), para emitir tokens
+        Actualiza el espejo; si Redis no responde, retorna la del espejo
+        """
+        client = self._redis_getter()
+        if client is not None:
+            try:
+                generation = await client.hget(self._generations_key, user_id)
+            except Exception as exc:
+                logger.warning(f"Redis no disponible, generación del espejo local: {exc}")
+            else:
+                if generation is not None:
+                    self._apply_generation(user_id, int(generation))
+        return self.generation(user_id)
+
+    # Escrituras
+
+    def _apply_revoked(self, jti: str, exp: float) -> None:
+        self._revoked[jti] = exp
+        if len(self._revoked) >= self._prune_at:
+            now = time.time()
+            self._revoked = {key: value for key, value in self._revoked.items() if value > now}
+            self._prune_at = max(1024, len(self._revoked) * 2)
+
+    def _apply_generation(self, user_id: int, generation: int) -> None:
+        if generation > self._generations.get(user_id, 0):
+            self._generations[user_id] = generation
+
+    async def revoke(self, jti: str, exp: float) -> None:
+        """Revocar un token hasta su expiración"""
+        ttl = int(exp - time.time()) + 1
+        if ttl <= 0:
+            return
+        self._apply_revoked(jti, exp)
+
+        client = self._redis_getter()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(f"{self.namespace}:jti:{jti}", 1, ex=ttl)
+                pipe.zadd(self._index_key, {jti: exp})
+                pipe.zremrangebyscore(self._index_key, "-inf", time.time())
+                pipe.publish(self.channel, json.dumps({"jti": jti, "exp": exp}))
+                await pipe.execute()
+        except Exception as exc:
+            logger.warning(f"Redis no disponible, revocación solo local: {exc}")
+
+    async def revoke_all(self, user_id: int) -> int:
+        """Invalidar todos los tokens emitidos hasta ahora para el usuario"""
+        client = self._redis_getter()
+        generation = self.generation(user_id) + 1
+        if client is not None:
+            try:
+                generation = max(generation, await client.hincrby(self._generations_key, user_id, 1))
+                await client.publish(self.channel, json.dumps({"sub": user_id, "gen": generation}))
+            except Exception as exc:
+                logger.warning(f"Redis no disponible, revocación solo local: {exc}")
+        self._apply_generation(user_id, generation)
+        return generation
+
+    # Sincronización entre workers
+
+    async def load(self, client=None) -> None:
+        """Cargar desde Redis las revocaciones vigentes"""
+        client = client or self._redis_getter()
+        if client is None:
+            return
+        now = time.time()
+        revoked = await client.zrangebyscore(self._index_key, now, "+inf", withscores=True)
+        for jti, exp in revoked:
+            self._apply_revoked(jti, exp)
+        generations = await client.hgetall(self._generations_key)
+        for user_id, generation in generations.items():
+            self._apply_generation(int(user_id), int(generation))
+
+    def _handle(self, data: str) -> None:
+        event = json.loads(data)
+        if "jti" in event:
+            self._apply_revoked(event["jti"], event["exp"])
+        else:
+            self._apply_generation(int(event["sub"]), int(event["gen"]))
+
+    async def start_listener(self, load_timeout: float = 5.0) -> None:
+        """
+        Suscribirse a las revocaciones del resto de workers
+        Espera la carga inicial (hasta `load_timeout` segundos) para no
+        aceptar tráfico con el espejo vacío
+        """
+        client = self._redis_getter()
+        if client is None or self._listener is not None:
+            return
+        self._loaded.clear()
+        self._listener = asyncio.create_task(self._listen(client))
+        try:
+            await asyncio.wait_for(self._loaded.wait(), load_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Revocaciones no cargadas al arrancar: se cargarán al reconectar con Redis")
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self, client) -> None:
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Cargar después de suscribirse: no se pierde ningún evento intermedio
+                    await self.load(client)
+                    self._loaded.set()
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self._handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Redis no disponible para revocaciones: {exc}")
+                await asyncio.sleep(settings.REDIS_FAILURE_BACKOFF)
+
+    def clear_local(self) -> None:
+        self._revoked.clear()
+        self._generations.clear()
+        self._prune_at = 1024
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._revoked),
+            "users_with_generation": len(self._generations),
+        }
+
+
+revocation_store = RevocationStore()
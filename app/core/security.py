@@ -1,20 +1,85 @@
 """
 Seguridad y autenticación JWT
 """
+import asyncio
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+from typing import List, Optional, Tuple
 from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config.settings import settings
+from app.core.hashing import password_executor
+from app.core.token_cache import TokenCache
+from app.core.revocation import revocation_store
+from app.core.tokens import TokenCodec, TokenError, build_token_codec, load_key_set
+from app.core.exceptions import UnauthorizedException
+from app.core.metrics import PASSWORD_HASH_OPERATIONS
+
+PASSWORD_SCHEMES = ("argon2", "bcrypt")
+
+
+def build_password_context(schemes: Optional[List[str]] = None, **costs) -> CryptContext:
+    """
+    Contexto de hashing de contraseñas según Settings
+    
+    El primer esquema se usa para los hashes nuevos; el resto solo verifica.
+    Un hash de otro esquema o con un costo distinto al configurado queda
+    desactualizado y se rehashea en el siguiente login (verify_and_update).
+    `costs` permite sobrescribir parámetros (p. ej. bcrypt__rounds=10).
+    """
+    schemes = list(schemes or settings.PASSWORD_SCHEMES)
+    unknown = [scheme for scheme in schemes if scheme not in PASSWORD_SCHEMES]
+    if not schemes or unknown:
+        raise ValueError(f"PASSWORD_SCHEMES debe contener solo {', '.join(PASSWORD_SCHEMES)}")
+    
+    options = {
+        "bcrypt__rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+        "argon2__type": "ID",
+        "argon2__time_cost": settings.PASSWORD_ARGON2_TIME_COST,
+        "argon2__memory_cost": settings.PASSWORD_ARGON2_MEMORY_COST,
+        "argon2__parallelism": settings.PASSWORD_ARGON2_PARALLELISM,
+    }
+    options.update(costs)
+    options = {
+        key: value for key, value in options.items() if key.split("__", 1)[0] in schemes
+    }
+    return CryptContext(schemes=schemes, default=schemes[0], deprecated="auto", **options)
+
 
 # Configuración para hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context()
 
 # Bearer token scheme
 security = HTTPBearer()
 
+# Caché de tokens verificados
+token_cache = TokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
+
+_token_codec: Optional[TokenCodec] = None
+
+
+def get_token_codec() -> TokenCodec:
+    """Codec JWT configurado (las claves se cargan en el primer uso)"""
+    global _token_codec
+    if _token_codec is None:
+        key_set = load_key_set(
+            settings.ALGORITHM,
+            settings.SECRET_KEY,
+            previous_secret_keys=settings.JWT_PREVIOUS_SECRET_KEYS,
+            keys_dir=settings.JWT_KEYS_DIR,
+            active_kid=settings.JWT_ACTIVE_KID,
+        )
+        _token_codec = build_token_codec(settings.JWT_BACKEND, key_set)
+    return _token_codec
+
+
+def set_token_codec(codec: Optional[TokenCodec]) -> None:
+    """Reemplazar el codec (tests / recarga de claves); vacía la caché de tokens"""
+    global _token_codec
+    _token_codec = codec
+    token_cache.clear()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar contraseña"""
@@ -26,6 +91,57 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verificar contraseña y, si el hash está desactualizado (esquema o costo),
+    retornar también el hash nuevo
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password en el pool de hashing"""
+    PASSWORD_HASH_OPERATIONS.labels("verify").inc()
+    valid, new_hash = await password_executor.run(verify_and_update_password, plain_password, hashed_password)
+    if new_hash is not None:
+        PASSWORD_HASH_OPERATIONS.labels("rehash").inc()
+    return valid, new_hash
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hashear contraseña en el pool de hashing sin bloquear el event loop"""
+    PASSWORD_HASH_OPERATIONS.labels("hash").inc()
+    return await password_executor.run(get_password_hash, password)
+
+
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    """Hashear varias contraseñas (una sola tarea en el pool)"""
+    return [pwd_context.hash(password) for password in passwords]
+
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    """Hashear un lote de contraseñas repartido entre todos los procesos del pool"""
+    if not passwords:
+        return []
+    
+    PASSWORD_HASH_OPERATIONS.labels("hash").inc(len(passwords))
+    chunk_size = -(-len(passwords) // password_executor.workers)
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    results = await asyncio.gather(
+        *(password_executor.run(get_password_hashes, chunk) for chunk in chunks)
+    )
+    return [hashed for chunk in results for hashed in chunk]
+
+
+def _set_generation(claims: dict) -> None:
+    """Añadir la generación de tokens vigente del usuario (`gen`)"""
+    if "sub" in claims and "gen" not in claims:
+        claims["gen"] = revocation_store.generation(claims["sub"])
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Crear token de acceso JWT
@@ -40,11 +156,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({
         "exp": expire,
         "iat": datetime.utcnow(),
-        "type": "access"
+        "type": "access",
+        "jti": uuid.uuid4().hex
     })
+    _set_generation(to_encode)
     
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    return get_token_codec().encode(to_encode)
 
 
 def create_refresh_token(data: dict) -> str:
@@ -57,59 +174,56 @@ def create_refresh_token(data: dict) -> str:
     to_encode.update({
         "exp": expire,
         "iat": datetime.utcnow(),
-        "type": "refresh"
+        "type": "refresh",
+        "jti": uuid.uuid4().hex
     })
+    _set_generation(to_encode)
     
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    return get_token_codec().encode(to_encode)
 
 
 def verify_token(token: str, token_type: str = "access") -> dict:
     """
     Verificar y decodificar token JWT
+    Los payloads verificados se guardan en caché hasta su `exp`
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="No se pudo validar las credenciales",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    payload = token_cache.get(token) if settings.TOKEN_CACHE_ENABLED else None
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        
-        # Verificar tipo de token
-        if payload.get("type") != token_type:
-            raise credentials_exception
+    if payload is None:
+        try:
+            # El codec verifica firma, `kid` y expiración (exp obligatorio)
+            payload = get_token_codec().decode(token)
+        except TokenError:
+            raise UnauthorizedException("No se pudo validar las credenciales")
         
-        # Verificar expiración
-        exp = payload.get("exp")
-        if exp is None or datetime.fromtimestamp(exp) < datetime.utcnow():
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token expirado",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return payload
-        
-    except JWTError:
-        raise credentials_exception
+        if settings.TOKEN_CACHE_ENABLED:
+            token_cache.set(token, payload)
+    
+    # Revocación: consulta solo el espejo en memoria, sin ir a Redis
+    if revocation_store.is_revoked(payload):
+        raise UnauthorizedException("Token revocado")
+    
+    # Verificar tipo de token
+    if payload.get("type") != token_type:
+        raise UnauthorizedException("No se pudo validar las credenciales")
+    
+    return payload
 
 
-async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
+async def get_current_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    Dependency para obtener el payload verificado del access token
+    """
+    return verify_token(credentials.credentials, "access")
+
+
+async def get_current_user_id(payload: dict = Depends(get_current_token_payload)) -> int:
     """
     Dependency para obtener el ID del usuario actual desde el token
     """
-    token = credentials.credentials
-    payload = verify_token(token, "access")
-    
     user_id: int = payload.get("sub")
     if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="No se pudo validar las credenciales",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise UnauthorizedException("No se pudo validar las credenciales")
     
     return user_id
 
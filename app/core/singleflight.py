@@ -0,0 +1,95 @@
+"""
+Singleflight: lecturas idénticas concurrentes comparten una sola consulta
+
+La primera llamada con una clave (líder) ejecuta la carga en su propia
+corrutina, con su propia sesión; las que llegan mientras está en curso
+(seguidores) esperan ese resultado en lugar de lanzar otra consulta.
+
+- Cancelar a un seguidor no afecta a nadie (espera con `asyncio.shield`).
+- Si se cancela al líder, la carga no se comparte: los seguidores reintentan
+  y uno de ellos pasa a ser el nuevo líder.
+- Un error del líder se propaga a los seguidores de esa carga.
+- `forget(clave)` tras una escritura: las llamadas siguientes inician una
+  carga nueva en lugar de unirse a una que empezó antes del cambio.
+
+Es por proceso y por event loop: no coordina workers.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from app.core.metrics import SINGLEFLIGHT_CALLS, SINGLEFLIGHT_IN_FLIGHT, SINGLEFLIGHT_WAITERS
+
+T = TypeVar("T")
+
+
+class LeaderCancelled(Exception):
+    """El líder de una carga fue cancelado antes de terminar"""
+
+
+class Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 1
+
+
+class SingleFlight:
+    """Grupo de cargas en curso por clave"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, Flight] = {}
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """Ejecutar `load()` o esperar la carga en curso con la misma clave"""
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            flight.waiters += 1
+            SINGLEFLIGHT_CALLS.labels(self.name, "follower").inc()
+            try:
+                return await asyncio.shield(flight.future)
+            except LeaderCancelled:
+                continue
+
+        flight = self._flights[key] = Flight(asyncio.get_running_loop().create_future())
+        SINGLEFLIGHT_CALLS.labels(self.name, "leader").inc()
+        SINGLEFLIGHT_IN_FLIGHT.labels(self.name).inc()
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            self._finish(key, flight, exception=LeaderCancelled())
+            raise
+        except Exception as exc:
+            self._finish(key, flight, exception=exc)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+
+    def _finish(self, key: Hashable, flight: Flight, result: Any = None, exception: BaseException = None) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        SINGLEFLIGHT_IN_FLIGHT.labels(self.name).dec()
+        SINGLEFLIGHT_WAITERS.labels(self.name).observe(flight.waiters)
+        if exception is not None:
+            flight.future.set_exception(exception)
+            # Los seguidores, si los hay, ya la reciben; evita el aviso si no hay ninguno
+            flight.future.exception()
+        else:
+            flight.future.set_result(result)
+
+    def forget(self, *keys: Hashable) -> None:
+        """Que las próximas llamadas con estas claves no se unan a la carga en curso"""
+        for key in keys:
+            self._flights.pop(key, None)
+
+    def forget_all(self) -> None:
+        self._flights.clear()
+
+    def stats(self) -> dict:
+        """Claves en curso y cuántas llamadas espera cada una"""
+        return {
+            "in_flight": len(self._flights),
+            "waiters": {str(key): flight.waiters for key, flight in self._flights.items()},
+        }
@@ -0,0 +1,72 @@
+"""
+Caché en memoria de tokens JWT ya verificados
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class TokenCache:
+    """
+    LRU acotada de payloads verificados, indexada por el SHA-256 del token.
+
+    Cada entrada expira en el `exp` del propio token: nunca se devuelve un
+    payload vencido aunque siga en la caché.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Obtener una copia del payload si está en caché y no ha expirado"""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        payload, exp = entry
+        if exp <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(payload)
+
+    def set(self, token: str, payload: dict) -> None:
+        """Guardar un payload verificado (se ignora si no tiene `exp`)"""
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+
+        key = self._key(token)
+        self._entries[key] = (dict(payload), float(exp))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def purge(self, token: str) -> bool:
+        """Eliminar un token (p. ej. al revocarlo)"""
+        return self._entries.pop(self._key(token), None) is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Contadores de aciertos y fallos"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
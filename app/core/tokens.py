@@ -0,0 +1,375 @@
+"""
+Codificación de tokens JWT con backends intercambiables y rotación de claves
+
+- HS256: firma con SECRET_KEY; JWT_PREVIOUS_SECRET_KEYS se aceptan al verificar.
+- ES256 / EdDSA: un archivo PEM por clave en JWT_KEYS_DIR (el nombre del
+  archivo es el `kid`). La clave activa firma; el resto, incluidas claves
+  retiradas guardadas solo como clave pública, siguen verificando hasta que
+  se eliminan. Las claves públicas se publican en /.well-known/jwks.json.
+
+Backends:
+- "jose": python-jose (HS256 y ES256), el backend por defecto
+- "cryptography": JWS compacto implementado sobre hmac/cryptography (todos,
+  incluido EdDSA). Opcional: se verifica contra los vectores de prueba de
+  RFC 7515 y RFC 8037 en tests/test_tokens.py
+"""
+import abc
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
+
+ALGORITHMS = ("HS256", "ES256", "EdDSA")
+
+
+class TokenError(Exception):
+    """Token inválido, expirado o firmado con una clave desconocida"""
+
+
+def b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _json_dumps(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """Clave de firma identificada por `kid`"""
+    kid: str
+    algorithm: str
+    # bytes para HS256; objeto de cryptography (privado o público) para el resto
+    key: Any
+
+    @property
+    def can_sign(self) -> bool:
+        return isinstance(self.key, (bytes, ed25519.Ed25519PrivateKey, ec.EllipticCurvePrivateKey))
+
+    @property
+    def public_key(self) -> Any:
+        return self.key.public_key() if hasattr(self.key, "public_key") else self.key
+
+    def public_jwk(self) -> Optional[dict]:
+        """JWK público (None para claves simétricas, que nunca se publican)"""
+        if self.algorithm == "EdDSA":
+            raw = self.public_key.public_bytes(
+                serialization.Encoding.Raw, serialization.PublicFormat.Raw
+            )
+            jwk = {"kty": "OKP", "crv": "Ed25519", "x": b64url_encode(raw).decode()}
+        elif self.algorithm == "ES256":
+            numbers = self.public_key.public_numbers()
+            jwk = {
+                "kty": "EC",
+                "crv": "P-256",
+                "x": b64url_encode(numbers.x.to_bytes(32, "big")).decode(),
+                "y": b64url_encode(numbers.y.to_bytes(32, "big")).decode(),
+            }
+        else:
+            return None
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+class KeySet:
+    """Claves vigentes: una activa para firmar y todas para verificar"""
+
+    def __init__(self, keys: Iterable[SigningKey], active_kid: str):
+        self.keys: Dict[str, SigningKey] = {key.kid: key for key in keys}
+        if active_kid not in self.keys or not self.keys[active_kid].can_sign:
+            raise ValueError(f"No hay clave privada para el kid activo '{active_kid}'")
+        self.active = self.keys[active_kid]
+        self._jwks: Optional[bytes] = None
+
+    def get(self, kid: Optional[str]) -> SigningKey:
+        # Tokens emitidos antes de usar `kid` se verifican con la clave activa
+        if kid is None:
+            return self.active
+        try:
+            return self.keys[kid]
+        except KeyError:
+            raise TokenError(f"kid desconocido: {kid}")
+
+    def jwks(self) -> bytes:
+        """Documento JWKS serializado (se calcula una sola vez)"""
+        if self._jwks is None:
+            jwks = [key.public_jwk() for key in self.keys.values()]
+            self._jwks = _json_dumps({"keys": [jwk for jwk in jwks if jwk]})
+        return self._jwks
+
+
+def secret_kid(secret: str) -> str:
+    """`kid` estable derivado del secreto (no permite recuperarlo)"""
+    return "hs-" + hashlib.sha256(secret.encode()).hexdigest()[:12]
+
+
+def _key_algorithm(key: Any) -> str:
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "EdDSA"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        if key.curve.name != "secp256r1":
+            raise ValueError(f"Curva no soportada: {key.curve.name}")
+        return "ES256"
+    raise ValueError(f"Tipo de clave no soportado: {type(key).__name__}")
+
+
+def load_pem_key(data: bytes) -> Any:
+    """Cargar una clave privada o pública en formato PEM"""
+    if b"PRIVATE KEY" in data:
+        return serialization.load_pem_private_key(data, password=None)
+    return serialization.load_pem_public_key(data)
+
+
+def load_key_set(
+    algorithm: str,
+    secret_key: str,
+    previous_secret_keys: List[str] = (),
+    keys_dir: str = "",
+    active_kid: str = "",
+) -> KeySet:
+    """Construir el KeySet a partir de la configuración"""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Algoritmo JWT no soportado: {algorithm}")
+
+    if algorithm == "HS256":
+        keys = [
+            SigningKey(secret_kid(secret), "HS256", secret.encode())
+            for secret in [secret_key, *previous_secret_keys]
+        ]
+        return KeySet(keys, active_kid or keys[0].kid)
+
+    if not keys_dir:
+        raise ValueError(f"{algorithm} requiere JWT_KEYS_DIR con las claves PEM")
+
+    keys = []
+    for filename in sorted(os.listdir(keys_dir)):
+        kid, extension = os.path.splitext(filename)
+        if extension != ".pem":
+            continue
+        with open(os.path.join(keys_dir, filename), "rb") as pem:
+            key = load_pem_key(pem.read())
+        keys.append(SigningKey(kid, _key_algorithm(key), key))
+
+    if not active_kid:
+        signing = [key.kid for key in keys if key.can_sign and key.algorithm == algorithm]
+        if not signing:
+            raise ValueError(f"No hay claves privadas {algorithm} en {keys_dir}")
+        # Los kid generados empiezan por la fecha: el último es el más reciente
+        active_kid = signing[-1]
+
+    key_set = KeySet(keys, active_kid)
+    if key_set.active.algorithm != algorithm:
+        raise ValueError(f"La clave activa '{active_kid}' no es {algorithm}")
+    return key_set
+
+
+def _timestamp(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return value
+
+
+class TokenCodec(abc.ABC):
+    """Firma y verificación de JWT con el KeySet configurado"""
+
+    name = ""
+    algorithms: Tuple[str, ...] = ()
+
+    def __init__(self, key_set: KeySet):
+        unsupported = {key.algorithm for key in key_set.keys.values()} - set(self.algorithms)
+        if unsupported:
+            raise ValueError(f"El backend '{self.name}' no soporta {', '.join(sorted(unsupported))}")
+        self.key_set = key_set
+
+    def encode(self, claims: dict) -> str:
+        """Firmar `claims` con la clave activa (exp/iat/nbf pueden ser datetime)"""
+        claims = {name: _timestamp(value) for name, value in claims.items()}
+        return self._encode(claims, self.key_set.active)
+
+    def decode(self, token: str) -> dict:
+        """Verificar firma y expiración; lanza TokenError"""
+        try:
+            header = json.loads(b64url_decode(token.split(".", 1)[0].encode()))
+        except (ValueError, UnicodeError):
+            raise TokenError("Cabecera de token inválida")
+        if not isinstance(header, dict):
+            raise TokenError("Cabecera de token inválida")
+
+        key = self.key_set.get(header.get("kid"))
+        # El algoritmo lo fija la clave, nunca la cabecera del token
+        if header.get("alg") != key.algorithm:
+            raise TokenError("Algoritmo no permitido")
+
+        payload = self._decode(token, key)
+
+        now = time.time()
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or exp <= now:
+            raise TokenError("Token expirado")
+        nbf = payload.get("nbf")
+        if isinstance(nbf, (int, float)) and nbf > now:
+            raise TokenError("Token aún no válido")
+        return payload
+
+    @abc.abstractmethod
+    def _encode(self, claims: dict, key: SigningKey) -> str:
+        """Token firmado con `key`"""
+
+    @abc.abstractmethod
+    def _decode(self, token: str, key: SigningKey) -> dict:
+        """Payload de `token` si la firma de `key` es válida; lanza TokenError"""
+
+
+class JoseTokenCodec(TokenCodec):
+    """Backend python-jose"""
+
+    name = "jose"
+    algorithms = ("HS256", "ES256")
+
+    def __init__(self, key_set: KeySet):
+        # Import diferido: solo se carga si se elige este backend
+        from jose import JWTError, jwt
+        self._jwt = jwt
+        self._error = JWTError
+        super().__init__(key_set)
+        # jose recibe las claves como PEM: se serializan una sola vez
+        self._keys = {kid: self._jose_keys(key) for kid, key in key_set.keys.items()}
+
+    @staticmethod
+    def _jose_keys(key: SigningKey) -> Tuple[Optional[str], str]:
+        """(clave de firma, clave de verificación) en el formato de jose"""
+        if key.algorithm == "HS256":
+            return key.key.decode(), key.key.decode()
+        private = None
+        if key.can_sign:
+            private = key.key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ).decode()
+        public = key.public_key.public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        return private, public
+
+    def _encode(self, claims: dict, key: SigningKey) -> str:
+        return self._jwt.encode(
+            claims,
+            self._keys[key.kid][0],
+            algorithm=key.algorithm,
+            headers={"kid": key.kid},
+        )
+
+    def _decode(self, token: str, key: SigningKey) -> dict:
+        try:
+            # `sub` se emite como entero, jose por defecto exige string
+            return self._jwt.decode(
+                token,
+                self._keys[key.kid][1],
+                algorithms=[key.algorithm],
+                options={"verify_sub": False},
+            )
+        except self._error as exc:
+            raise TokenError(str(exc))
+
+
+class CryptographyTokenCodec(TokenCodec):
+    """Backend JWS compacto sobre hmac (HS256) y cryptography (ES256, EdDSA)"""
+
+    name = "cryptography"
+    algorithms = ALGORITHMS
+
+    def __init__(self, key_set: KeySet):
+        super().__init__(key_set)
+        self._headers = {
+            kid: b64url_encode(_json_dumps({"alg": key.algorithm, "typ": "JWT", "kid": kid}))
+            for kid, key in key_set.keys.items()
+        }
+
+    def _encode(self, claims: dict, key: SigningKey) -> str:
+        signing_input = self._headers[key.kid] + b"." + b64url_encode(_json_dumps(claims))
+        return (signing_input + b"." + b64url_encode(self._sign(signing_input, key))).decode()
+
+    @staticmethod
+    def _sign(signing_input: bytes, key: SigningKey) -> bytes:
+        """Firma JWS (RFC 7518 sec. 3; RFC 8037 para EdDSA)"""
+        if key.algorithm == "HS256":
+            return hmac.new(key.key, signing_input, hashlib.sha256).digest()
+        if key.algorithm == "ES256":
+            # DER -> R || S de 32 bytes cada uno
+            r, s = decode_dss_signature(key.key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+            return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return key.key.sign(signing_input)
+
+    @staticmethod
+    def _verify(signing_input: bytes, signature: bytes, key: SigningKey) -> None:
+        """Lanza TokenError si `signature` no es la firma de `signing_input`"""
+        if key.algorithm == "HS256":
+            expected = hmac.new(key.key, signing_input, hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, signature):
+                raise TokenError("Firma inválida")
+            return
+        try:
+            if key.algorithm == "ES256":
+                if len(signature) != 64:
+                    raise TokenError("Firma inválida")
+                der = encode_dss_signature(
+                    int.from_bytes(signature[:32], "big"),
+                    int.from_bytes(signature[32:], "big"),
+                )
+                key.public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+            else:
+                key.public_key.verify(signature, signing_input)
+        except InvalidSignature:
+            raise TokenError("Firma inválida")
+
+    def _decode(self, token: str, key: SigningKey) -> dict:
+        try:
+            signing_input, signature = token.encode().rsplit(b".", 1)
+            signature = b64url_decode(signature)
+            payload_segment = signing_input.split(b".", 1)[1]
+        except (ValueError, IndexError, UnicodeError):
+            raise TokenError("Token mal formado")
+
+        self._verify(signing_input, signature, key)
+
+        try:
+            payload = json.loads(b64url_decode(payload_segment))
+        except (ValueError, UnicodeError):
+            raise TokenError("Payload inválido")
+        if not isinstance(payload, dict):
+            raise TokenError("Payload inválido")
+        return payload
+
+
+TOKEN_CODECS = {
+    "jose": JoseTokenCodec,
+    "cryptography": CryptographyTokenCodec,
+}
+
+
+def build_token_codec(backend: str, key_set: KeySet) -> TokenCodec:
+    """Instanciar el backend configurado"""
+    try:
+        codec_class = TOKEN_CODECS[backend]
+    except KeyError:
+        raise ValueError(f"Backend JWT desconocido: {backend}")
+    return codec_class(key_set)
@@ -1,38 +1,62 @@
 """
 Middleware logging
 """
-import time
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+import random
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config.settings import settings
 
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("app.access")
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """
-    Middleware para logging de requests
+    Middleware ASGI para logging de requests
+
+    Implementado como ASGI puro (sin BaseHTTPMiddleware) para no envolver el
+    stream de la respuesta: funciona con StreamingResponse y evita crear
+    tareas extra por request. Las respuestas 5xx se registran siempre; el
+    resto según ACCESS_LOG_SAMPLE_RATE.
     """
-    
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log de request
-        logger.info(f"Request: {request.method} {request.url.path}")
-        
-        # Procesar request
-        response = await call_next(request)
-        
-        # Calcular tiempo de procesamiento
-        process_time = time.time() - start_time
-        
-        # Log de response
-        logger.info(
-            f"Response: {request.method} {request.url.path} "
-            f"Status: {response.status_code} Time: {process_time:.3f}s"
-        )
-        
-        # Agregar header de tiempo de procesamiento
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
+
+    def __init__(self, app: ASGIApp, sample_rate: float = settings.ACCESS_LOG_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Agregar header de tiempo de procesamiento
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", f"{time.perf_counter() - start_time:.6f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status_code >= 500 or self.sample_rate >= 1 or random.random() < self.sample_rate:
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                logger.info(
+                    "%s %s %d %.2fms",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    duration_ms,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status_code": status_code,
+                        "duration_ms": round(duration_ms, 3),
+                    },
+                )
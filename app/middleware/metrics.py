@@ -0,0 +1,41 @@
+"""
+Middleware de métricas
+"""
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra requests y latencia por ruta
+
+    Se etiqueta con la plantilla de la ruta (`/users/{user_id_param}`) y no
+    con el path real, para que la cardinalidad de las series sea acotada.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route_path).observe(time.perf_counter() - start_time)
@@ -1,21 +1,22 @@
 """
 Middleware de rate limiting
 """
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from app.config.settings import settings
+from app.core.rate_limiter import RateLimiter, get_remote_address
 
 
-# Crear limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=[])
+# Crear limiter (estado compartido en Redis vía REDIS_URL)
+limiter = RateLimiter(
+    key_func=get_remote_address,
+    enabled=settings.RATE_LIMIT_ENABLED,
+    lease_ratio=settings.RATE_LIMIT_LEASE_RATIO
+)
 
 
 def setup_rate_limiting(app: FastAPI) -> None:
     """
     Configurar rate limiting
     """
-    if settings.RATE_LIMIT_ENABLED:
-        app.state.limiter = limiter
-        app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    limiter.enabled = settings.RATE_LIMIT_ENABLED
+    app.state.limiter = limiter
@@ -1,6 +1,7 @@
 """
 Modelo de Usuario
 """
+from datetime import datetime, timezone
 from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from sqlalchemy.sql import func
 from app.config.database import Base
@@ -17,7 +18,10 @@ class User(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     is_superuser = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
+    # Calculado en Python: func.now() en SQLite tiene resolución de segundos y
+    # updated_at es la versión de los ETags (dos cambios en el mismo segundo
+    # deben dar ETags distintos)
+    updated_at = Column(DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc), nullable=True)
     
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, username={self.username})>"
@@ -6,9 +6,13 @@ from app.schemas.user import (
     UserCreate,
     UserUpdate,
     UserResponse,
+    UserPage,
+    UserImportError,
+    UserImportReport,
     UserLogin,
     Token,
     TokenRefresh,
+    LogoutRequest,
     TokenResponse
 )
 from app.schemas.common import MessageResponse, ErrorResponse, SuccessResponse
@@ -18,9 +22,13 @@ __all__ = [
     "UserCreate",
     "UserUpdate",
     "UserResponse",
+    "UserPage",
+    "UserImportError",
+    "UserImportReport",
     "UserLogin",
     "Token",
     "TokenRefresh",
+    "LogoutRequest",
     "TokenResponse",
     "MessageResponse",
     "ErrorResponse",
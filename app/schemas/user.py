@@ -2,7 +2,7 @@
 Schemas de Usuario
 """
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -37,6 +37,30 @@ class UserResponse(UserBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserPage(BaseModel):
+    """Schema de página de usuarios paginada por cursor"""
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+
+class UserImportError(BaseModel):
+    """Fila rechazada durante una importación masiva"""
+    line: int
+    email: Optional[str] = None
+    detail: str
+
+
+class UserImportReport(BaseModel):
+    """Resultado de una importación masiva de usuarios"""
+    total: int = 0
+    created: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: List[UserImportError] = []
+
+
 class UserLogin(BaseModel):
     """Schema para login"""
     email: EmailStr
@@ -55,6 +79,11 @@ class TokenRefresh(BaseModel):
     refresh_token: str
 
 
+class LogoutRequest(BaseModel):
+    """Schema para cerrar sesión (el refresh token también se revoca)"""
+    refresh_token: Optional[str] = None
+
+
 class TokenResponse(BaseModel):
     """Schema de respuesta de token"""
     access_token: str
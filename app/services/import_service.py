@@ -0,0 +1,179 @@
+"""
+Servicio de importación masiva de usuarios
+"""
+import asyncio
+import importlib
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.config.settings import settings
+from app.core.security import get_password_hashes_async
+from app.models.user import User
+from app.schemas.user import UserCreate, UserImportError, UserImportReport
+from app.utils.imports import ParsedRow
+
+# Máximo de errores detallados en el reporte (los contadores siguen siendo exactos)
+MAX_REPORTED_ERRORS = 1000
+
+# Dialectos con INSERT ... ON CONFLICT DO NOTHING (se importan al usarlos)
+INSERT_IGNORE_DIALECTS = ("postgresql", "sqlite")
+
+Batch = List[Tuple[int, UserCreate]]
+
+
+def _validation_message(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    field = ".".join(str(part) for part in error["loc"])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+class UserImportService:
+    """
+    Importación de usuarios por lotes
+
+    Las filas se leen en streaming y se agrupan en lotes de `batch_size`.
+    La lectura y validación de cada lote ocurre en el threadpool (el archivo
+    subido puede estar en disco: leerlo bloquearía el event loop). Mientras
+    un lote se inserta, el siguiente se hashea en el pool de procesos. Cada lote es un único INSERT multi-fila con ON CONFLICT DO
+    NOTHING: las filas duplicadas se reportan sin abortar el resto del lote.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: Optional[int] = None):
+        self.db = db
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.report = UserImportReport()
+
+    def _reject(self, line: int, email: Optional[str], detail: str, conflict: bool = False) -> None:
+        if conflict:
+            self.report.conflicts += 1
+        else:
+            self.report.invalid += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(UserImportError(line=line, email=email, detail=detail))
+
+    def _batches(self, rows: Iterable[ParsedRow]) -> Iterable[Batch]:
+        """Validar filas y agruparlas; los duplicados dentro del lote se rechazan aquí"""
+        batch: Batch = []
+        emails: Set[str] = set()
+        usernames: Set[str] = set()
+        for line, data in rows:
+            self.report.total += 1
+            if isinstance(data, str):
+                self._reject(line, None, data)
+                continue
+            try:
+                user = UserCreate.model_validate(data)
+            except ValidationError as exc:
+                self._reject(line, data.get("email"), _validation_message(exc))
+                continue
+
+            if user.email in emails:
+                self._reject(line, user.email, "El email ya está registrado", conflict=True)
+                continue
+            if user.username in usernames:
+                self._reject(line, user.email, "El username ya está en uso", conflict=True)
+                continue
+
+            emails.add(user.email)
+            usernames.add(user.username)
+            batch.append((line, user))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch, emails, usernames = [], set(), set()
+        if batch:
+            yield batch
+
+    async def run(self, rows: Iterable[ParsedRow]) -> UserImportReport:
+        """Importar todas las filas y retornar el reporte"""
+        start = time.perf_counter()
+        pending: Optional[Tuple[Batch, asyncio.Task]] = None
+        batches = self._batches(rows)
+        try:
+            while True:
+                batch = await run_in_threadpool(next, batches, None)
+                if batch is None:
+                    break
+                hashing = asyncio.create_task(
+                    get_password_hashes_async([user.password for _, user in batch])
+                )
+                if pending is not None:
+                    await self._insert(pending[0], await pending[1])
+                pending = (batch, hashing)
+            if pending is not None:
+                await self._insert(pending[0], await pending[1])
+                pending = None
+        finally:
+            if pending is not None:
+                pending[1].cancel()
+
+        elapsed = time.perf_counter() - start
+        self.report.elapsed_seconds = round(elapsed, 3)
+        self.report.rows_per_second = round(self.report.total / elapsed, 1) if elapsed > 0 else 0.0
+        return self.report
+
+    async def _insert(self, batch: Batch, hashed_passwords: List[str]) -> None:
+        """Insertar un lote y reportar las filas que chocaron con usuarios existentes"""
+        values = [
+            {
+                "email": user.email,
+                "username": user.username,
+                "full_name": user.full_name,
+                "hashed_password": hashed_password,
+            }
+            for (_, user), hashed_password in zip(batch, hashed_passwords)
+        ]
+
+        dialect = self.db.bind.dialect.name
+        if dialect not in INSERT_IGNORE_DIALECTS:
+            created = await self._insert_one_by_one(values)
+        else:
+            dialect_module = importlib.import_module(f"sqlalchemy.dialects.{dialect}")
+            statement = dialect_module.insert(User).on_conflict_do_nothing().returning(User.email)
+            result = await self.db.execute(statement, values)
+            created = set(result.scalars().all())
+        await self.db.commit()
+
+        self.report.created += len(created)
+        rejected = [(line, user) for line, user in batch if user.email not in created]
+        if rejected:
+            await self._report_conflicts(rejected)
+
+    async def _insert_one_by_one(self, values: List[dict]) -> Set[str]:
+        """Fallback para dialectos sin ON CONFLICT: un SAVEPOINT por fila"""
+        created: Set[str] = set()
+        for row in values:
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(insert(User).values(**row))
+            except IntegrityError:
+                continue
+            created.add(row["email"])
+        return created
+
+    async def _report_conflicts(self, rejected: Batch) -> None:
+        """Una sola consulta para saber si cada conflicto fue por email o por username"""
+        result = await self.db.execute(
+            select(User.email, User.username).where(
+                or_(
+                    User.email.in_([user.email for _, user in rejected]),
+                    User.username.in_([user.username for _, user in rejected]),
+                )
+            )
+        )
+        existing: Dict[str, Set[str]] = {"email": set(), "username": set()}
+        for email, username in result.all():
+            existing["email"].add(email)
+            existing["username"].add(username)
+
+        for line, user in rejected:
+            if user.email in existing["email"]:
+                detail = "El email ya está registrado"
+            elif user.username in existing["username"]:
+                detail = "El username ya está en uso"
+            else:
+                detail = "Conflicto con el estado actual"
+            self._reject(line, user.email, detail, conflict=True)
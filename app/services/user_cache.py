@@ -0,0 +1,77 @@
+"""
+Caché de lecturas de usuario
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.replicas import use_primary
+from app.config.settings import settings
+from app.core.cache import TwoTierCache
+from app.core.singleflight import SingleFlight
+from app.models.user import User
+
+# Columnas cacheadas (el hash de la contraseña nunca sale de la base de datos)
+USER_CACHE_FIELDS = [column.name for column in User.__table__.columns if column.name != "hashed_password"]
+_DATETIME_FIELDS = {
+    column.name for column in User.__table__.columns if isinstance(column.type, DateTime)
+}
+
+user_cache = TwoTierCache(
+    "user",
+    local_ttl=settings.USER_CACHE_LOCAL_TTL,
+    local_max_size=settings.USER_CACHE_LOCAL_MAX_SIZE,
+    redis_ttl=settings.USER_CACHE_REDIS_TTL,
+    tombstone_ttl=settings.USER_CACHE_INVALIDATION_WINDOW,
+)
+
+# Lecturas de usuario en curso (mismas claves que la caché)
+user_flights = SingleFlight("user")
+
+
+def id_key(user_id: int) -> str:
+    return f"id:{user_id}"
+
+
+def email_key(email: str) -> str:
+    return f"email:{email}"
+
+
+def fill_from_primary(db: AsyncSession, *keys: str) -> None:
+    """
+    Leer del primario si alguna clave se invalidó hace poco: una réplica con
+    retraso devolvería la fila anterior a la escritura y quedaría en la caché
+    """
+    if any(user_cache.recently_invalidated(key) for key in keys):
+        use_primary(db)
+
+
+def user_to_cache(user: User) -> dict:
+    """Serializar usuario a un dict apto para JSON"""
+    data = {}
+    for field in USER_CACHE_FIELDS:
+        value = getattr(user, field)
+        data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def user_from_cache(data: dict) -> User:
+    """
+    Reconstruir un usuario desde la caché
+    El objeto no pertenece a ninguna sesión: es de solo lectura
+    """
+    values = {
+        field: datetime.fromisoformat(value) if field in _DATETIME_FIELDS and value else value
+        for field, value in data.items()
+    }
+    return User(**values)
+
+
+async def invalidate_user(user_id: int, email: Optional[str] = None) -> None:
+    """Invalidar las entradas de un usuario tras una escritura"""
+    keys = [id_key(user_id)]
+    if email:
+        keys.append(email_key(email))
+    # Solo las cargas en curso de este usuario; las de otros siguen compartidas
+    user_flights.forget(*keys)
+    await user_cache.delete(*keys)
@@ -2,29 +2,232 @@
 Servicio de Usuario
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List, Tuple, AsyncIterator, Awaitable, Callable, Mapping, Dict, Set
+from datetime import datetime
+import asyncio
+import logging
+import re
+import time
+from app.config.database import get_session_factory
+from app.config.replicas import use_primary
+from app.config.settings import settings
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_and_update_password_async
 from app.core.exceptions import NotFoundException, ConflictException
+from app.core.login_guard import login_guard
+from app.utils.dataloader import DataLoader
+from app.utils.export import EXPORT_FIELDS
+from app.tasks import enqueue
+from app.services.user_cache import (
+    user_cache,
+    id_key,
+    email_key,
+    user_to_cache,
+    user_from_cache,
+    user_flights,
+    fill_from_primary,
+    invalidate_user
+)
+
+logger = logging.getLogger(__name__)
+
+# Rehashes pendientes tras un login (tareas del event loop: el hash no sale del proceso)
+_rehash_tasks: Set[asyncio.Task] = set()
+
+# Columnas expuestas por la API (todas menos hashed_password)
+PUBLIC_COLUMNS = [getattr(User, field) for field in EXPORT_FIELDS]
+# Columnas que determinan la versión de un usuario (ETags)
+VERSION_COLUMNS = [User.id, User.created_at, User.updated_at]
+
+
+# Mensaje de conflicto por columna UNIQUE
+CONFLICT_MESSAGES = {
+    "email": "El email ya está registrado",
+    "username": "El username ya está en uso",
+}
+# Nombre de restricción/índice UNIQUE -> columna (ix_users_email, users_email_key)
+UNIQUE_CONSTRAINTS = {
+    **{
+        index.name: next(iter(index.columns)).name
+        for index in User.__table__.indexes
+        if index.unique and len(index.columns) == 1
+    },
+    **{f"{User.__tablename__}_{column}_key": column for column in CONFLICT_MESSAGES},
+}
+# SQLite: "UNIQUE constraint failed: users.email"
+_SQLITE_UNIQUE_COLUMN = re.compile(rf"unique constraint failed: {User.__tablename__}\.(\w+)", re.IGNORECASE)
+
+
+def _conflicting_column(exc: IntegrityError) -> Optional[str]:
+    """
+    Columna de la restricción violada según el driver, sin mirar el texto
+    del detalle (en Postgres incluye el valor duplicado)
+    """
+    # asyncpg: la excepción original trae el nombre de la restricción
+    constraint = getattr(exc.orig.__cause__, "constraint_name", None)
+    if constraint:
+        return UNIQUE_CONSTRAINTS.get(constraint)
+    match = _SQLITE_UNIQUE_COLUMN.search(str(exc.orig))
+    return match.group(1) if match else None
+
+
+def _conflict_from_integrity_error(exc: IntegrityError) -> ConflictException:
+    """Traducir una violación de UNIQUE al mensaje de conflicto correspondiente"""
+    message = CONFLICT_MESSAGES.get(_conflicting_column(exc))
+    return ConflictException(message) if message else ConflictException()
+
+
+def _split_page(rows: List[RowMapping], limit: int) -> Tuple[List[RowMapping], Optional[int]]:
+    """Separar la fila extra de una consulta con limit + 1 (indica que hay más páginas)"""
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, rows[-1]["id"]
 
 
 class UserService:
     """Servicio para operaciones de usuario"""
     
     @staticmethod
-    async def get_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-        """Obtener usuario por ID"""
+    async def _fetch_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        """Obtener usuario por ID directamente de la base de datos"""
         result = await db.execute(select(User).where(User.id == user_id))
         return result.scalar_one_or_none()
     
     @staticmethod
-    async def get_by_email(db: AsyncSession, email: str) -> Optional[User]:
-        """Obtener usuario por email"""
+    async def _fetch_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        """Obtener usuario por email directamente de la base de datos"""
         result = await db.execute(select(User).where(User.email == email))
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def _load_by_id(db: AsyncSession, user_id: int) -> Tuple[Optional[dict], Optional[User]]:
+        """
+        Usuario por ID como (dict de caché, objeto ORM)
+        Con USER_SINGLEFLIGHT_BY_ID las llamadas concurrentes comparten la
+        consulta: el objeto ORM solo lo recibe quien la ejecutó (es de su
+        sesión), el resto recibe None y usa el dict
+        """
+        return await UserService._load(
+            settings.USER_SINGLEFLIGHT_BY_ID, id_key(user_id),
+            lambda: UserService._fetch_by_id(db, user_id)
+        )
+    
+    @staticmethod
+    async def _load_by_email(db: AsyncSession, email: str) -> Tuple[Optional[dict], Optional[User]]:
+        """Como `_load_by_id`, por email (USER_SINGLEFLIGHT_BY_EMAIL)"""
+        return await UserService._load(
+            settings.USER_SINGLEFLIGHT_BY_EMAIL, email_key(email),
+            lambda: UserService._fetch_by_email(db, email)
+        )
+    
+    @staticmethod
+    async def _load(
+        singleflight: bool,
+        key: str,
+        fetch: Callable[[], Awaitable[Optional[User]]]
+    ) -> Tuple[Optional[dict], Optional[User]]:
+        own: List[User] = []
+        
+        async def load() -> Optional[dict]:
+            user = await fetch()
+            if user is None:
+                return None
+            own.append(user)
+            return user_to_cache(user)
+        
+        data = await user_flights.do(key, load) if singleflight else await load()
+        return data, own[0] if own else None
+    
+    @staticmethod
+    async def get_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        """
+        Obtener usuario por ID (read-through cache)
+        El usuario retornado es de solo lectura: para modificarlo usar `update`
+        """
+        if not settings.USER_CACHE_ENABLED:
+            data, user = await UserService._load_by_id(db, user_id)
+            return user or (user_from_cache(data) if data else None)
+        
+        async def load() -> Optional[dict]:
+            fill_from_primary(db, id_key(user_id))
+            data, _ = await UserService._load_by_id(db, user_id)
+            return data
+        
+        data = await user_cache.get_or_load(id_key(user_id), load)
+        return user_from_cache(data) if data else None
+    
+    @staticmethod
+    async def get_by_ids(db: AsyncSession, user_ids: List[int]) -> Dict[int, User]:
+        """
+        Obtener varios usuarios por ID: los que no están en caché, con una
+        sola consulta IN. Los IDs inexistentes no aparecen en el resultado
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        users: Dict[int, User] = {}
+        if settings.USER_CACHE_ENABLED:
+            cached = await user_cache.get_many([id_key(user_id) for user_id in user_ids])
+            users = {data["id"]: user_from_cache(data) for data in cached.values()}
+        
+        missing = [user_id for user_id in user_ids if user_id not in users]
+        if not missing:
+            return users
+        
+        read_started = time.monotonic()
+        if settings.USER_CACHE_ENABLED:
+            fill_from_primary(db, *(id_key(user_id) for user_id in missing))
+        result = await db.execute(select(User).where(User.id.in_(missing)))
+        for user in result.scalars().all():
+            users[user.id] = user
+            if settings.USER_CACHE_ENABLED:
+                await user_cache.set(id_key(user.id), user_to_cache(user), read_started=read_started)
+        return users
+    
+    @staticmethod
+    def loader(db: AsyncSession) -> DataLoader:
+        """
+        DataLoader de usuarios por ID para un request: las llamadas a
+        `load(user_id)` de la misma vuelta del event loop se resuelven con un
+        solo `get_by_ids`
+        """
+        async def batch_load(user_ids: List[int]) -> Dict[int, User]:
+            return await UserService.get_by_ids(db, user_ids)
+        
+        return DataLoader(batch_load, max_batch_size=settings.PAGINATION_MAX_LIMIT)
+    
+    @staticmethod
+    async def get_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        """
+        Obtener usuario por email (read-through cache)
+        La caché guarda email -> id y resuelve el usuario por ID
+        """
+        if not settings.USER_CACHE_ENABLED:
+            data, user = await UserService._load_by_email(db, email)
+            return user or (user_from_cache(data) if data else None)
+        
+        cached_id = await user_cache.get(email_key(email))
+        if cached_id is not None:
+            user = await UserService.get_by_id(db, cached_id)
+            # El email pudo cambiar desde que se guardó el índice
+            if user and user.email == email:
+                return user
+        
+        read_started = time.monotonic()
+        data, user = await UserService._load_by_email(db, email)
+        if not data:
+            return None
+        if user_cache.recently_invalidated(id_key(data["id"])):
+            # Sin el ID no se sabía que había que leer del primario: no se cachea
+            return user or user_from_cache(data)
+        await user_cache.set(id_key(data["id"]), data, read_started=read_started)
+        await user_cache.set(email_key(email), data["id"], read_started=read_started)
+        return user or user_from_cache(data)
+    
     @staticmethod
     async def get_by_username(db: AsyncSession, username: str) -> Optional[User]:
         """Obtener usuario por username"""
@@ -32,98 +235,269 @@ class UserService:
         return result.scalar_one_or_none()
     
     @staticmethod
-    async def get_all(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
-        """Obtener todos los usuarios"""
-        result = await db.execute(select(User).offset(skip).limit(limit))
-        return result.scalars().all()
+    async def get_rows(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[RowMapping]:
+        """
+        Obtener usuarios como filas de solo lectura con las columnas públicas
+        Se serializan directamente, sin objetos ORM ni validación Pydantic
+        """
+        result = await db.execute(UserService._rows_query(PUBLIC_COLUMNS, skip, limit, after_id))
+        return result.mappings().all()
+    
+    @staticmethod
+    async def get_version(db: AsyncSession, user_id: int) -> Optional[Mapping]:
+        """
+        Columnas de versión (id, created_at, updated_at) de un usuario
+        Sale de la caché si el usuario está en ella; si no, de una consulta
+        que no carga la fila completa
+        """
+        if settings.USER_CACHE_ENABLED:
+            data = await user_cache.get(id_key(user_id))
+            if data is not None:
+                user = user_from_cache(data)
+                return {"id": user.id, "created_at": user.created_at, "updated_at": user.updated_at}
+        
+        result = await db.execute(select(*VERSION_COLUMNS).where(User.id == user_id))
+        return result.mappings().one_or_none()
+    
+    @staticmethod
+    async def get_rows_versions(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[RowMapping]:
+        """Como `get_rows`, pero solo con las columnas de versión"""
+        result = await db.execute(UserService._rows_query(VERSION_COLUMNS, skip, limit, after_id))
+        return result.mappings().all()
+    
+    @staticmethod
+    async def get_rows_by_ids(db: AsyncSession, user_ids: List[int]) -> List[RowMapping]:
+        """
+        Filas públicas de varios usuarios con una sola consulta IN, en el
+        orden de `user_ids` (sin repetidos; los inexistentes se omiten)
+        """
+        return await UserService._rows_by_ids(db, PUBLIC_COLUMNS, user_ids)
+    
+    @staticmethod
+    async def get_versions_by_ids(db: AsyncSession, user_ids: List[int]) -> List[RowMapping]:
+        """Como `get_rows_by_ids`, pero solo con las columnas de versión"""
+        return await UserService._rows_by_ids(db, VERSION_COLUMNS, user_ids)
+    
+    @staticmethod
+    async def _rows_by_ids(db: AsyncSession, columns: list, user_ids: List[int]) -> List[RowMapping]:
+        user_ids = list(dict.fromkeys(user_ids))
+        result = await db.execute(select(*columns).where(User.id.in_(user_ids)))
+        rows = {row["id"]: row for row in result.mappings().all()}
+        return [rows[user_id] for user_id in user_ids if user_id in rows]
+    
+    @staticmethod
+    def _rows_query(columns: list, skip: int, limit: int, after_id: Optional[int]):
+        query = select(*columns).order_by(User.id).offset(skip).limit(limit)
+        if after_id is not None:
+            query = query.where(User.id > after_id)
+        return query
+    
+    @staticmethod
+    async def get_page_rows(
+        db: AsyncSession,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> Tuple[List[RowMapping], Optional[int]]:
+        """
+        Obtener una página de filas por keyset (id > after_id)
+        Retorna (filas, último_id) donde último_id es None si no hay más páginas
+        """
+        rows = await UserService.get_rows(db, limit=limit + 1, after_id=after_id)
+        return _split_page(rows, limit)
+    
+    @staticmethod
+    async def get_page_versions(
+        db: AsyncSession,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> Tuple[List[RowMapping], Optional[int]]:
+        """Como `get_page_rows`, pero solo con las columnas de versión"""
+        rows = await UserService.get_rows_versions(db, limit=limit + 1, after_id=after_id)
+        return _split_page(rows, limit)
+    
+    @staticmethod
+    async def stream_rows(
+        db: AsyncSession,
+        is_active: Optional[bool] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        """
+        Recorrer usuarios con un cursor de servidor
+        Solo se mantiene en memoria un lote de `batch_size` filas a la vez
+        """
+        query = select(*PUBLIC_COLUMNS).order_by(User.id)
+        if is_active is not None:
+            query = query.where(User.is_active == is_active)
+        if created_from is not None:
+            query = query.where(User.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(User.created_at < created_to)
+        
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for row in result.mappings():
+            yield row
     
     @staticmethod
     async def create(db: AsyncSession, user_data: UserCreate) -> User:
-        """Crear nuevo usuario"""
-        # Verificar si el email ya existe
-        existing_user = await UserService.get_by_email(db, user_data.email)
-        if existing_user:
-            raise ConflictException("El email ya está registrado")
-        
-        # Verificar si el username ya existe
-        existing_username = await UserService.get_by_username(db, user_data.username)
-        if existing_username:
-            raise ConflictException("El username ya está en uso")
-        
-        # Crear usuario
-        hashed_password = get_password_hash(user_data.password)
-        
-        db_user = User(
-            email=user_data.email,
-            username=user_data.username,
-            full_name=user_data.full_name,
-            hashed_password=hashed_password,
+        """
+        Crear nuevo usuario
+        Un único INSERT ... RETURNING: los duplicados se detectan por las
+        restricciones UNIQUE de email y username
+        """
+        hashed_password = await get_password_hash_async(user_data.password)
+        
+        query = (
+            insert(User)
+            .values(
+                email=user_data.email,
+                username=user_data.username,
+                full_name=user_data.full_name,
+                hashed_password=hashed_password,
+            )
+            .returning(User)
         )
         
-        db.add(db_user)
-        await db.commit()
-        await db.refresh(db_user)
+        try:
+            result = await db.execute(query)
+            db_user = result.scalar_one()
+            await db.commit()
+        except IntegrityError as exc:
+            await db.rollback()
+            raise _conflict_from_integrity_error(exc)
+        
+        # Después del commit y sin esperar: el registro no depende de la tarea
+        enqueue("users.send_welcome_email", db_user.id, db_user.email, db_user.full_name)
         
         return db_user
     
     @staticmethod
     async def update(db: AsyncSession, user_id: int, user_data: UserUpdate) -> User:
-        """Actualizar usuario"""
-        db_user = await UserService.get_by_id(db, user_id)
-        if not db_user:
-            raise NotFoundException("Usuario no encontrado")
-        
-        # Actualizar campos si se proporcionan
+        """Actualizar usuario (UPDATE ... RETURNING)"""
         update_data = user_data.model_dump(exclude_unset=True)
         
+        if not update_data:
+            db_user = await UserService._fetch_by_id(db, user_id)
+            if not db_user:
+                raise NotFoundException("Usuario no encontrado")
+            return db_user
+        
         # Si se actualiza el password, hashearlo
         if "password" in update_data:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+            update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
         
-        # Verificar email único
-        if "email" in update_data and update_data["email"] != db_user.email:
-            existing = await UserService.get_by_email(db, update_data["email"])
-            if existing:
-                raise ConflictException("El email ya está registrado")
+        query = update(User).where(User.id == user_id).values(**update_data).returning(User)
         
-        # Verificar username único
-        if "username" in update_data and update_data["username"] != db_user.username:
-            existing = await UserService.get_by_username(db, update_data["username"])
-            if existing:
-                raise ConflictException("El username ya está en uso")
+        try:
+            result = await db.execute(query)
+            db_user = result.scalar_one_or_none()
+            if not db_user:
+                raise NotFoundException("Usuario no encontrado")
+            await db.commit()
+        except IntegrityError as exc:
+            await db.rollback()
+            raise _conflict_from_integrity_error(exc)
         
-        for field, value in update_data.items():
-            setattr(db_user, field, value)
-        
-        await db.commit()
-        await db.refresh(db_user)
+        # El índice email -> id se valida al leer; el email actual se olvida
+        # para que sus lecturas no se unan a una carga previa a la escritura
+        await invalidate_user(user_id, db_user.email)
         
         return db_user
     
     @staticmethod
     async def delete(db: AsyncSession, user_id: int) -> bool:
-        """Eliminar usuario"""
-        db_user = await UserService.get_by_id(db, user_id)
-        if not db_user:
+        """Eliminar usuario (DELETE ... RETURNING)"""
+        result = await db.execute(delete(User).where(User.id == user_id).returning(User.email))
+        email = result.scalar_one_or_none()
+        if email is None:
             raise NotFoundException("Usuario no encontrado")
         
-        await db.delete(db_user)
         await db.commit()
+        await invalidate_user(user_id, email)
         
         return True
     
     @staticmethod
-    async def authenticate(db: AsyncSession, email: str, password: str) -> Optional[User]:
-        """Autenticar usuario"""
-        user = await UserService.get_by_email(db, email)
+    async def authenticate(
+        db: AsyncSession,
+        email: str,
+        password: str,
+        client_ip: Optional[str] = None
+    ) -> Optional[User]:
+        """
+        Autenticar usuario
+        Lanza TooManyRequestsException si la cuenta o la IP están bloqueadas
+        por intentos fallidos (antes de consultar la base de datos y de bcrypt)
+        """
+        await login_guard.check(email, client_ip)
+        
+        # Sin caché: se necesita el hash de la contraseña. Del primario, para
+        # no depender del retraso de las réplicas justo después del registro
+        use_primary(db)
+        user = await UserService._fetch_by_email(db, email)
         
+        # Los emails inexistentes también cuentan: el bloqueo no revela si la cuenta existe
         if not user:
+            await login_guard.record_failure(email, client_ip)
             return None
         
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+        if not valid:
+            await login_guard.record_failure(email, client_ip)
             return None
         
+        # Una cuenta desactivada no limpia los fallos aunque la contraseña sea correcta
         if not user.is_active:
             return None
         
+        await login_guard.record_success(email)
+        
+        # Hash con otro esquema o costo: se reemplaza sin retrasar la respuesta,
+        # en una tarea de este proceso con su propia sesión (la del request se
+        # cierra al responder y el hash nunca va a un broker)
+        if new_hash is not None and settings.PASSWORD_REHASH_ON_LOGIN:
+            task = asyncio.create_task(UserService._rehash(user.id, user.hashed_password, new_hash))
+            _rehash_tasks.add(task)
+            task.add_done_callback(_rehash_tasks.discard)
+        
         return user
+    
+    @staticmethod
+    async def _rehash(user_id: int, old_hash: str, new_hash: str) -> None:
+        """Reemplazar el hash tras el login; un fallo solo se registra (se reintenta en el próximo)"""
+        try:
+            async with get_session_factory()() as db:
+                await UserService._replace_password_hash(db, user_id, old_hash, new_hash)
+        except Exception as exc:
+            logger.warning(f"Rehash de la contraseña del usuario {user_id} no completado: {exc}")
+    
+    @staticmethod
+    async def _replace_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+        """
+        Reemplazar un hash desactualizado solo si no cambió entretanto
+        updated_at se conserva: la versión pública del usuario (su ETag) no cambia
+        """
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash, updated_at=User.updated_at)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def drain_rehashes(timeout: Optional[float] = None) -> None:
+    """Esperar los rehashes pendientes (tests y shutdown)"""
+    if _rehash_tasks:
+        await asyncio.wait(set(_rehash_tasks), timeout=timeout)
@@ -0,0 +1,7 @@
+"""
+Tareas en segundo plano
+"""
+from app.tasks.base import TASKS, enqueue, task, task_queue
+from app.tasks import users  # noqa: F401  (registra las tareas)
+
+__all__ = ["TASKS", "enqueue", "task", "task_queue"]
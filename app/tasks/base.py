@@ -0,0 +1,169 @@
+"""
+Tareas en segundo plano
+
+Las tareas se registran con `@task` y se encolan con `enqueue`, que nunca
+bloquea el request: el envío al broker (o la ejecución local) ocurre en un
+pool de hilos aparte.
+
+Modos (TASKS_MODE):
+- "celery": se publican en CELERY_BROKER_URL y las ejecuta un worker
+  (`celery -A app.tasks.worker worker`).
+- "eager": se ejecutan en este proceso, en el pool de hilos (tests y
+  desarrollo local, sin broker).
+
+En ambos modos se reintentan con backoff exponencial y se miden la espera
+en cola y la duración de cada tarea.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Set
+from app.config.settings import settings
+from app.core.metrics import TASK_DURATION, TASK_QUEUE_LATENCY, TASK_RUNS
+
+logger = logging.getLogger(__name__)
+
+TASK_MODES = ("celery", "eager")
+
+# Clave con la hora de encolado dentro de los kwargs del mensaje
+ENQUEUED_AT = "_enqueued_at"
+
+
+@dataclass
+class TaskDefinition:
+    name: str
+    func: Callable[..., Any]
+    max_retries: int
+    retry_backoff: float
+
+
+TASKS: Dict[str, TaskDefinition] = {}
+
+
+def task(name: str, max_retries: Optional[int] = None, retry_backoff: Optional[float] = None):
+    """Registrar una función como tarea (síncrona: se ejecuta fuera del event loop)"""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        TASKS[name] = TaskDefinition(
+            name=name,
+            func=func,
+            max_retries=settings.TASKS_MAX_RETRIES if max_retries is None else max_retries,
+            retry_backoff=settings.TASKS_RETRY_BACKOFF if retry_backoff is None else retry_backoff,
+        )
+        return func
+    return decorator
+
+
+def retry_delay(definition: TaskDefinition, attempt: int) -> float:
+    """Espera antes del reintento `attempt` (1, 2, ...): backoff exponencial acotado"""
+    return min(definition.retry_backoff * 2 ** (attempt - 1), settings.TASKS_RETRY_BACKOFF_MAX)
+
+
+def run_task(definition: TaskDefinition, args: tuple, kwargs: dict, attempt: int = 0) -> Any:
+    """
+    Ejecutar un intento de la tarea registrando las métricas
+    Las excepciones se propagan: quien llama decide si reintentar
+    """
+    enqueued_at = kwargs.pop(ENQUEUED_AT, None)
+    if enqueued_at is not None and attempt == 0:
+        TASK_QUEUE_LATENCY.labels(definition.name).observe(max(time.time() - enqueued_at, 0.0))
+
+    start = time.perf_counter()
+    try:
+        result = definition.func(*args, **kwargs)
+    except Exception:
+        status = "retry" if attempt < definition.max_retries else "failure"
+        TASK_RUNS.labels(definition.name, status).inc()
+        raise
+    finally:
+        TASK_DURATION.labels(definition.name).observe(time.perf_counter() - start)
+
+    TASK_RUNS.labels(definition.name, "success").inc()
+    return result
+
+
+def run_with_retries(definition: TaskDefinition, args: tuple, kwargs: dict) -> Any:
+    """Modo eager: reintentar en el mismo hilo esperando el backoff"""
+    attempt = 0
+    while True:
+        try:
+            return run_task(definition, args, dict(kwargs), attempt)
+        except Exception as exc:
+            attempt += 1
+            if attempt > definition.max_retries:
+                raise
+            delay = retry_delay(definition, attempt)
+            logger.warning(f"Tarea {definition.name} falló ({exc}), reintento {attempt} en {delay:.1f}s")
+            time.sleep(delay)
+
+
+class TaskQueue:
+    """Encola tareas sin bloquear el event loop"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Futures de concurrent.futures: no dependen del event loop que encoló
+        self._pending: Set[concurrent.futures.Future] = set()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.TASKS_EAGER_WORKERS,
+                thread_name_prefix="tasks"
+            )
+        return self._executor
+
+    def enqueue(self, name: str, *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+        """
+        Encolar una tarea y retornar sin esperarla
+        Llamar después del commit: la tarea puede empezar de inmediato
+        """
+        if settings.TASKS_MODE not in TASK_MODES:
+            raise ValueError(f"TASKS_MODE debe ser uno de {', '.join(TASK_MODES)}")
+        definition = TASKS[name]
+        kwargs[ENQUEUED_AT] = time.time()
+
+        if settings.TASKS_MODE == "celery":
+            call = (self._publish, name, args, kwargs)
+        else:
+            call = (run_with_retries, definition, args, kwargs)
+
+        future = self._get_executor().submit(*call)
+        self._pending.add(future)
+        future.add_done_callback(self._done(name))
+        return future
+
+    @staticmethod
+    def _publish(name: str, args: tuple, kwargs: dict) -> None:
+        from app.tasks.celery_app import get_celery_app
+        get_celery_app().send_task(name, args=args, kwargs=kwargs)
+
+    def _done(self, name: str) -> Callable[[concurrent.futures.Future], None]:
+        def callback(future: concurrent.futures.Future) -> None:
+            self._pending.discard(future)
+            if not future.cancelled() and future.exception() is not None:
+                logger.error(f"Tarea {name} no completada: {future.exception()}")
+        return callback
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Esperar las tareas pendientes de este proceso (tests y shutdown)"""
+        pending = [asyncio.wrap_future(future) for future in set(self._pending)]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending)}
+
+
+task_queue = TaskQueue()
+
+
+def enqueue(name: str, *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+    return task_queue.enqueue(name, *args, **kwargs)
@@ -0,0 +1,52 @@
+"""
+App de Celery (se crea al primer uso: importar celery cuesta ~150 ms)
+"""
+from typing import Optional
+from app.config.settings import settings
+from app.tasks.base import TASKS, TaskDefinition, retry_delay, run_task
+
+_celery_app = None
+
+
+def _register(app, definition: TaskDefinition) -> None:
+    @app.task(name=definition.name, bind=True, max_retries=definition.max_retries)
+    def celery_task(self, *args, **kwargs):
+        try:
+            return run_task(definition, args, kwargs, attempt=self.request.retries)
+        except Exception as exc:
+            if self.request.retries >= definition.max_retries:
+                raise
+            # La hora de encolado ya se registró en el primer intento
+            raise self.retry(exc=exc, countdown=retry_delay(definition, self.request.retries + 1))
+
+
+def create_celery_app(always_eager: Optional[bool] = None):
+    """Crear la app de Celery con la configuración y las tareas registradas"""
+    from celery import Celery
+
+    app = Celery(
+        "backend",
+        broker=settings.CELERY_BROKER_URL,
+        backend=settings.CELERY_RESULT_BACKEND or None,
+    )
+    app.conf.update(
+        task_serializer="json",
+        accept_content=["json"],
+        # Las tareas no devuelven nada que haya que consultar
+        task_ignore_result=True,
+        # Reconocer el mensaje al terminar: si el worker muere la tarea se reintenta
+        task_acks_late=True,
+        worker_prefetch_multiplier=1,
+        broker_connection_retry_on_startup=True,
+        task_always_eager=bool(always_eager),
+    )
+    for definition in TASKS.values():
+        _register(app, definition)
+    return app
+
+
+def get_celery_app():
+    global _celery_app
+    if _celery_app is None:
+        _celery_app = create_celery_app()
+    return _celery_app
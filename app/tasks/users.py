@@ -0,0 +1,59 @@
+"""
+Tareas de usuarios (registro y login)
+"""
+import logging
+import smtplib
+from email.message import EmailMessage
+from typing import Optional
+from app.config.settings import settings
+from app.tasks.base import task
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger("audit")
+
+
+def send_email(to: str, subject: str, body: str) -> bool:
+    """Enviar un email por SMTP; retorna False si SMTP no está configurado"""
+    if not settings.SMTP_HOST:
+        logger.debug(f"SMTP no configurado, email a {to} omitido")
+        return False
+
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_FROM or settings.SMTP_USER
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+
+    # 465 usa TLS implícito; en el resto se sube a TLS si el servidor lo ofrece
+    implicit_tls = settings.SMTP_SSL or settings.SMTP_PORT == 465
+    smtp_class = smtplib.SMTP_SSL if implicit_tls else smtplib.SMTP
+    with smtp_class(settings.SMTP_HOST, settings.SMTP_PORT, timeout=10) as smtp:
+        if not implicit_tls:
+            smtp.ehlo()
+            if smtp.has_extn("starttls"):
+                smtp.starttls()
+                smtp.ehlo()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        smtp.send_message(message)
+    return True
+
+
+@task("users.send_welcome_email")
+def send_welcome_email(user_id: int, email: str, full_name: Optional[str] = None) -> bool:
+    """Email de bienvenida tras el registro"""
+    return send_email(
+        email,
+        f"Bienvenido a {settings.APP_NAME}",
+        f"Hola {full_name or email},\n\nTu cuenta se creó correctamente.\n"
+    )
+
+
+@task("users.record_login")
+def record_login(user_id: int, ip: Optional[str] = None, user_agent: Optional[str] = None) -> None:
+    """Registro de auditoría de un login correcto"""
+    audit_logger.info(
+        "login",
+        extra={"event": "login", "user_id": user_id, "ip": ip, "user_agent": user_agent}
+    )
+
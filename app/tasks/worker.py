@@ -0,0 +1,10 @@
+"""
+Punto de entrada del worker de Celery
+
+Uso:
+    celery -A app.tasks.worker worker --loglevel=INFO
+"""
+from app.tasks import TASKS  # noqa: F401  (registra las tareas)
+from app.tasks.celery_app import get_celery_app
+
+celery = get_celery_app()
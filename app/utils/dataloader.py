@@ -0,0 +1,81 @@
+"""
+DataLoader: agrupar cargas por clave en una sola consulta
+
+Las llamadas a `load` hechas en la misma vuelta del event loop (p. ej. desde
+un `asyncio.gather`) se resuelven con una única llamada a `batch_load` con
+todas las claves (o varias, una tras otra, si superan `max_batch_size`).
+Los resultados se memorizan en el loader, que vive lo que dura un request.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Mapping, Optional, Set, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    `batch_load(claves)` retorna un mapping clave -> valor; las claves que
+    falten se resuelven como None
+    """
+
+    def __init__(self, batch_load: Callable[[List[K]], Awaitable[Mapping[K, V]]], max_batch_size: int = 500):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._futures: Dict[K, asyncio.Future] = {}
+        # Cada clave con su future: `clear` durante la carga no la deja sin resolver
+        self._queue: List[Tuple[K, asyncio.Future]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+
+    async def load(self, key: K) -> Optional[V]:
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            self._queue.append((key, future))
+            if len(self._queue) == 1:
+                # Después de los callbacks ya listos: el resto del gather encola antes
+                loop.call_soon(self._dispatch)
+        # Cancelar a quien espera no debe cancelar el resultado compartido
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        """Valores en el orden de `keys` (None si no existe)"""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        pending, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._run_batches(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batches(self, pending: List[Tuple[K, asyncio.Future]]) -> None:
+        # En serie: `batch_load` suele usar la sesión del request, que no
+        # admite consultas concurrentes
+        for start in range(0, len(pending), self.max_batch_size):
+            await self._run(pending[start:start + self.max_batch_size])
+
+    async def _run(self, pending: List[Tuple[K, asyncio.Future]]) -> None:
+        self.batches += 1
+        # Una clave olvidada y vuelta a pedir aparece dos veces, con futures distintos
+        keys = list(dict.fromkeys(key for key, _ in pending))
+        try:
+            values = await self.batch_load(keys)
+        except Exception as exc:
+            for key, future in pending:
+                # Sin memorizar el error: una carga posterior lo reintenta
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+                if not future.done():
+                    future.set_exception(exc)
+                    # Ya propagado a quienes esperaban; evita el aviso si nadie espera
+                    future.exception()
+            return
+        for key, future in pending:
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def clear(self, key: K) -> None:
+        """Olvidar el valor memorizado (p. ej. tras modificarlo en el mismo request)"""
+        self._futures.pop(key, None)
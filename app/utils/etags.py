@@ -0,0 +1,62 @@
+"""
+ETags débiles y peticiones condicionales (If-None-Match)
+
+La versión de un usuario es `updated_at` (o `created_at` si nunca se
+modificó), así que el ETag se calcula sin serializar la respuesta y, para
+responder 304, basta con consultar esas columnas.
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Iterable, Mapping, Optional
+from fastapi import Response
+
+# Las respuestas dependen del token: solo cachés privadas, revalidando siempre
+CACHE_CONTROL = "private, no-cache"
+
+
+def version_of(updated_at: Optional[datetime], created_at: datetime) -> int:
+    """Versión de una fila en microsegundos desde epoch (UTC)"""
+    value = updated_at or created_at
+    if value.tzinfo is None:
+        # SQLite devuelve fechas sin zona horaria (guardadas en UTC)
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1_000_000)
+
+
+def user_etag(user_id: int, updated_at: Optional[datetime], created_at: datetime) -> str:
+    return f'W/"u{user_id}-{version_of(updated_at, created_at)}"'
+
+
+def collection_etag(rows: Iterable[Mapping[str, Any]], next_id: Optional[int] = None) -> str:
+    """
+    ETag de una página de usuarios
+    Cambia si se crea, borra o modifica cualquier fila de la página
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    for row in rows:
+        digest.update(f"{row['id']}:{version_of(row['updated_at'], row['created_at'])};".encode())
+    digest.update(f"next:{next_id}".encode())
+    return f'W/"c{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110, sección 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
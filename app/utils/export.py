@@ -0,0 +1,75 @@
+"""
+Utilidades de exportación de usuarios (NDJSON / CSV)
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Mapping
+
+# Columnas exportadas (nunca se exporta hashed_password)
+EXPORT_FIELDS = [
+    "id",
+    "email",
+    "username",
+    "full_name",
+    "is_active",
+    "is_superuser",
+    "created_at",
+    "updated_at",
+]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Tamaño aproximado de cada bloque enviado al cliente
+CHUNK_SIZE = 64 * 1024
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_ndjson(rows: AsyncIterator[Mapping[str, Any]]) -> AsyncIterator[bytes]:
+    """Serializar filas como NDJSON en bloques de ~CHUNK_SIZE bytes"""
+    buffer = []
+    size = 0
+    async for row in rows:
+        line = json.dumps(
+            {field: _to_jsonable(row[field]) for field in EXPORT_FIELDS},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode()
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+async def iter_csv(rows: AsyncIterator[Mapping[str, Any]]) -> AsyncIterator[bytes]:
+    """Serializar filas como CSV (con cabecera) en bloques de ~CHUNK_SIZE bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    async for row in rows:
+        writer.writerow([_to_jsonable(row[field]) for field in EXPORT_FIELDS])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+EXPORT_ENCODERS = {
+    "ndjson": iter_ndjson,
+    "csv": iter_csv,
+}
@@ -0,0 +1,41 @@
+"""
+Utilidades de importación de usuarios (NDJSON / CSV)
+"""
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, Tuple, Union
+
+# (número de línea, datos de la fila o mensaje de error de formato)
+ParsedRow = Tuple[int, Union[Dict[str, Any], str]]
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+def iter_ndjson_rows(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    """Un objeto JSON por línea; las líneas vacías se ignoran"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, f"JSON inválido: {exc.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, "Se esperaba un objeto JSON"
+            continue
+        yield line_number, data
+
+
+def iter_csv_rows(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    """CSV con cabecera; las celdas vacías se tratan como ausentes"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        data = {key: value for key, value in row.items() if key and value not in (None, "")}
+        yield reader.line_num, data
+
+
+IMPORT_PARSERS = {
+    "ndjson": iter_ndjson_rows,
+    "csv": iter_csv_rows,
+}
@@ -1,33 +1,104 @@
 """
 Utilidades de logging
+
+Los loggers escriben en una cola (QueueHandler) y un hilo aparte
+(QueueListener) formatea y escribe en stdout, de modo que el event loop
+nunca se bloquea en la E/S de los logs.
 """
+import atexit
+import json
 import logging
+import os
 import sys
-from pathlib import Path
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Optional, TextIO
+
+# Atributos estándar de LogRecord: el resto se considera contexto estructurado
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatear registros como una línea JSON"""
 
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
 
-def setup_logging(log_level: str = "INFO") -> None:
+
+def setup_logging(log_level: str = "INFO", json_format: bool = True, stream: TextIO = sys.stdout) -> None:
     """
     Configurar sistema de logging
     """
-    # Configurar formato simple
-    log_format = "%(asctime)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-    
-    # Configurar logging solo a consola
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format=log_format,
-        datefmt=date_format,
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
-    
+    global _listener
+    shutdown_logging()
+
+    # Handler final (solo lo usa el hilo del listener)
+    stream_handler = logging.StreamHandler(stream)
+    if json_format:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        ))
+
+    queue = SimpleQueue()
+    _listener = QueueListener(queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(queue)]
+    root.setLevel(getattr(logging, log_level.upper()))
+
     # Reducir verbosidad de algunos loggers
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     logging.getLogger("watchfiles.main").setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """Vaciar la cola de logs y detener el hilo del listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_after_fork() -> None:
+    """
+    Los hilos no sobreviven a fork(): el proceso hijo (p. ej. los workers de
+    scripts/serve.py) necesita su propio listener y su propia cola
+    """
+    global _listener
+    if _listener is None:
+        return
+    queue = SimpleQueue()
+    _listener = QueueListener(queue, *_listener.handlers, respect_handler_level=True)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue = queue
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
 def get_logger(name: str) -> logging.Logger:
     """Obtener logger por nombre"""
     return logging.getLogger(name)
@@ -0,0 +1,34 @@
+"""
+Utilidades de paginación por cursor
+"""
+import base64
+import json
+from typing import Optional
+from app.core.exceptions import BadRequestException
+
+
+def encode_cursor(last_id: int) -> str:
+    """Codificar el último ID de una página como cursor opaco"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[int]:
+    """
+    Decodificar un cursor opaco
+    Un cursor vacío indica la primera página
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = data["id"]
+    except (ValueError, KeyError, TypeError):
+        raise BadRequestException("Cursor inválido")
+
+    if not isinstance(last_id, int):
+        raise BadRequestException("Cursor inválido")
+
+    return last_id
@@ -1,18 +1,47 @@
 """
 Utilidades de respuesta
 """
+from collections.abc import Mapping
 from typing import Any, Optional
+import orjson
 from fastapi.responses import JSONResponse
 from fastapi import status
+from pydantic import BaseModel
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Tipos que orjson no serializa por sí mismo"""
+    if isinstance(obj, Mapping):
+        # p. ej. RowMapping de SQLAlchemy
+        return dict(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson
+    
+    datetime, date y UUID se serializan de forma nativa (UTC como "Z", igual
+    que Pydantic); filas de SQLAlchemy y modelos Pydantic también se aceptan.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+        )
 
 
 def success_response(
     data: Any = None,
     message: str = "Operación exitosa",
     status_code: int = status.HTTP_200_OK
-) -> JSONResponse:
+) -> ORJSONResponse:
     """Crear respuesta exitosa"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={
             "success": True,
@@ -26,7 +55,7 @@ def error_response(
     message: str,
     detail: Optional[Any] = None,
     status_code: int = status.HTTP_400_BAD_REQUEST
-) -> JSONResponse:
+) -> ORJSONResponse:
     """Crear respuesta de error"""
     content = {
         "success": False,
@@ -36,7 +65,7 @@ def error_response(
     if detail is not None:
         content["detail"] = detail
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content=content
     )
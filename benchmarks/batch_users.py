@@ -0,0 +1,120 @@
+"""
+Benchmark de resolución de una página de 50 IDs de usuario
+
+Compara, sobre un SQLite temporal y sin red (ASGITransport), sin la caché de
+usuarios para medir la base de datos:
+- 50 requests GET /users/{id} (uno tras otro y concurrentes)
+- 1 request GET /users?ids=... (una consulta IN)
+- en el servicio: 50 `get_by_id` frente al DataLoader
+
+Reporta la latencia mediana por página y las consultas SQL por página.
+
+Uso:
+    python -m benchmarks.batch_users --pages 200 --ids 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from app.api.v1.endpoints import users as users_endpoints
+from app.config import database
+from app.config.settings import settings
+from app.core.security import get_current_user_id
+from app.middleware.rate_limit import limiter
+from app.models.user import User
+from app.services.user_service import UserService
+from app.utils.responses import ORJSONResponse
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, *args) -> None:
+        self.count += 1
+
+
+async def measure(name: str, resolve, pages: int, counter: QueryCounter) -> None:
+    for _ in range(5):
+        await resolve()
+    timings = []
+    queries_before = counter.count
+    for _ in range(pages):
+        start = time.perf_counter()
+        await resolve()
+        timings.append(time.perf_counter() - start)
+    queries = (counter.count - queries_before) / pages
+    print(f"{name:<34} {statistics.median(timings) * 1000:8.2f} ms/página  {queries:6.1f} consultas/página")
+
+
+async def main(pages: int, ids: int) -> None:
+    settings.USER_CACHE_ENABLED = False
+    # GET /users tiene límite por minuto: no es lo que se mide
+    limiter.enabled = False
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASE_URL = f"sqlite+aiosqlite:///{directory}/bench.db"
+        await database.init_db()
+        async with database.get_session_factory()() as session:
+            session.add_all(
+                User(email=f"bench{i}@example.com", username=f"bench{i}", hashed_password="x")
+                for i in range(ids * 4)
+            )
+            await session.commit()
+        counter = QueryCounter(database.engine)
+        user_ids = list(range(ids * 4, 0, -4))
+
+        app = FastAPI(default_response_class=ORJSONResponse)
+        app.include_router(users_endpoints.router, prefix="/api/v1")
+        app.dependency_overrides[get_current_user_id] = lambda: 1
+        batch_url = "/api/v1/users?ids=" + ",".join(map(str, user_ids))
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def sequential():
+                for user_id in user_ids:
+                    assert (await client.get(f"/api/v1/users/{user_id}")).status_code == 200
+
+            async def concurrent():
+                await asyncio.gather(*(client.get(f"/api/v1/users/{user_id}") for user_id in user_ids))
+
+            async def batch():
+                response = await client.get(batch_url)
+                assert len(response.json()) == len(user_ids)
+
+            print(f"Página de {len(user_ids)} IDs, mediana de {pages} páginas")
+            await measure("GET /users/{id} x N secuencial", sequential, pages, counter)
+            await measure("GET /users/{id} x N concurrente", concurrent, pages, counter)
+            await measure("GET /users?ids= (IN)", batch, pages, counter)
+
+        session_factory = database.get_session_factory()
+
+        async def get_by_id():
+            # Una sesión no admite consultas concurrentes: sin loader van en serie
+            async with session_factory() as db:
+                for user_id in user_ids:
+                    await UserService.get_by_id(db, user_id)
+
+        async def loader():
+            async with session_factory() as db:
+                await UserService.loader(db).load_many(user_ids)
+
+        await measure("servicio: get_by_id x N", get_by_id, pages, counter)
+        await measure("servicio: DataLoader", loader, pages, counter)
+        await database.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--ids", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.ids))
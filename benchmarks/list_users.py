@@ -0,0 +1,114 @@
+"""
+Benchmark del listado de usuarios (GET /users?limit=100)
+
+Compara la implementación anterior (objetos ORM + validación de
+`response_model` + JSONResponse con json de la stdlib) con la actual (filas
+de columnas públicas serializadas directamente con orjson), sobre SQLite en
+memoria y sin red (ASGITransport).
+
+Uso:
+    python -m benchmarks.list_users --requests 2000 --users 500
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.api.v1.endpoints import users as users_endpoints
+from app.config.database import Base, get_db, get_read_db
+from app.core.security import get_current_user_id
+from app.middleware.rate_limit import limiter
+from app.models.user import User
+from app.schemas.user import UserResponse
+from app.utils.responses import ORJSONResponse
+
+
+def build_legacy_app() -> FastAPI:
+    """Endpoint anterior, reproducido para comparar"""
+    app = FastAPI()
+
+    @app.get("/api/v1/users", response_model=List[UserResponse])
+    async def get_users(
+        skip: int = 0,
+        limit: int = 100,
+        db: AsyncSession = Depends(get_db)
+    ):
+        result = await db.execute(select(User).order_by(User.id).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    return app
+
+
+def build_current_app() -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(users_endpoints.router, prefix="/api/v1")
+    return app
+
+
+async def seed(session_factory, count: int) -> None:
+    async with session_factory() as session:
+        session.add_all(
+            User(
+                email=f"bench{i}@example.com",
+                username=f"bench{i}",
+                full_name=f"Usuario {i}",
+                hashed_password="not-a-real-hash",
+            )
+            for i in range(count)
+        )
+        await session.commit()
+
+
+async def measure(app: FastAPI, session_factory, requests: int) -> float:
+    """Retorna requests por segundo"""
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_current_user_id] = lambda: 1
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/api/v1/users?limit=100")
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/api/v1/users?limit=100")
+            assert response.status_code == 200
+        return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, users: int) -> None:
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await seed(session_factory, users)
+    limiter.enabled = False
+
+    legacy = await measure(build_legacy_app(), session_factory, requests)
+    current = await measure(build_current_app(), session_factory, requests)
+    await engine.dispose()
+
+    print(f"ORM + response_model + json (antes): {legacy:8.1f} req/s")
+    print(f"Filas + orjson (ahora):              {current:8.1f} req/s ({current / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.users))
@@ -0,0 +1,358 @@
+"""
+Prueba de carga end-to-end con percentiles de latencia y control de regresiones
+
+`run` arranca la app con uvicorn contra una base de datos local (SQLite por
+defecto, o Postgres con --database-url), crea N usuarios y lanza clientes
+asíncronos concurrentes con una mezcla de operaciones. El resultado
+(throughput y p50/p95/p99 por endpoint) se guarda en JSON.
+
+`compare` contrasta un resultado con un baseline guardado y termina con
+código 1 si algún endpoint empeora más que el umbral.
+
+Uso:
+    python -m benchmarks.load_test run --scenario read-heavy --users 1000 \\
+        --concurrency 50 --duration 30 --output results.json
+    python -m benchmarks.load_test compare benchmarks/baselines/read-heavy.json results.json \\
+        --threshold 0.15
+    python -m benchmarks.load_test run --scenario login-heavy --baseline base.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+os.environ.setdefault("SECRET_KEY", "load-test-secret")
+
+PASSWORD = "loadtest-password"
+
+# Operación -> peso relativo dentro de cada escenario
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "login-heavy": {"login": 8, "me": 2},
+    "read-heavy": {"me": 19, "login": 1},
+    "register-burst": {"register": 1},
+    "mixed": {"me": 14, "login": 4, "register": 1, "list": 1},
+}
+
+ENDPOINTS = {
+    "login": "POST /api/v1/auth/login",
+    "me": "GET /api/v1/users/me",
+    "register": "POST /api/v1/auth/register",
+    "list": "GET /api/v1/users",
+}
+
+# Métricas comparadas: (clave, True si más alto es mejor)
+COMPARED_METRICS = [("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+# Preparación de la base de datos y del servidor
+
+async def seed_database(database_url: str, users: int) -> None:
+    """Recrear las tablas e insertar `users` usuarios con la misma contraseña"""
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.config.database import Base
+    from app.core.security import get_password_hash
+    from app.models.user import User
+
+    hashed_password = get_password_hash(PASSWORD)
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, users, 1000):
+            await conn.execute(insert(User), [
+                {
+                    "email": f"load{i}@example.com",
+                    "username": f"load{i}",
+                    "full_name": f"Usuario {i}",
+                    "hashed_password": hashed_password,
+                }
+                for i in range(start, min(start + 1000, users))
+            ])
+    await engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": args.database_url,
+        "REDIS_URL": args.redis_url,
+        "SECRET_KEY": env.get("SECRET_KEY", "load-test-secret"),
+        "RATE_LIMIT_ENABLED": "false",
+        "DEBUG": "false",
+        "ACCESS_LOG_SAMPLE_RATE": "0",
+    })
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    output = None if args.server_output else subprocess.DEVNULL
+    return subprocess.Popen(command, env=env, stdout=output, stderr=output)
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("El servidor terminó antes de estar listo")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a /health a tiempo")
+
+
+# Carga
+
+class LoadRun:
+    """Clientes concurrentes que ejecutan la mezcla del escenario hasta el deadline"""
+
+    def __init__(self, client: httpx.AsyncClient, scenario: str, users: int):
+        self.client = client
+        self.operations, self.weights = zip(*SCENARIOS[scenario].items())
+        self.burst = scenario == "register-burst"
+        self.users = users
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def credentials(self) -> dict:
+        i = random.randrange(self.users)
+        return {"email": f"load{i}@example.com", "password": PASSWORD}
+
+    async def login(self) -> Optional[str]:
+        response = await self.client.post("/api/v1/auth/login", json=self.credentials())
+        return response.json()["access_token"] if response.status_code == 200 else None
+
+    async def request(self, operation: str, token: Optional[str]) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        if operation == "login":
+            return await self.client.post("/api/v1/auth/login", json=self.credentials())
+        if operation == "me":
+            return await self.client.get("/api/v1/users/me", headers=headers)
+        if operation == "list":
+            return await self.client.get("/api/v1/users?limit=50", headers=headers)
+        suffix = uuid.uuid4().hex[:12]
+        return await self.client.post("/api/v1/auth/register", json={
+            "email": f"new-{suffix}@example.com",
+            "username": f"new-{suffix}",
+            "password": PASSWORD,
+        })
+
+    async def worker(self, token: Optional[str], deadline: float, start_gate: asyncio.Event) -> None:
+        while time.monotonic() < deadline:
+            if self.burst:
+                # Todos los clientes registran a la vez y esperan la siguiente ráfaga
+                await start_gate.wait()
+                if time.monotonic() >= deadline:
+                    break
+            operation = random.choices(self.operations, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await self.request(operation, token)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if ok:
+                self.latencies[ENDPOINTS[operation]].append(elapsed)
+            else:
+                self.errors[ENDPOINTS[operation]] += 1
+
+    async def run(self, concurrency: int, duration: float, burst_interval: float) -> float:
+        # Login inicial de cada cliente (no se mide)
+        tokens = await asyncio.gather(*(self.login() for _ in range(concurrency)))
+
+        start_gate = asyncio.Event()
+        if not self.burst:
+            start_gate.set()
+        start = time.monotonic()
+        deadline = start + duration
+        workers = [
+            asyncio.create_task(self.worker(token, deadline, start_gate))
+            for token in tokens
+        ]
+        if self.burst:
+            while time.monotonic() < deadline:
+                start_gate.set()
+                await asyncio.sleep(0)
+                start_gate.clear()
+                await asyncio.sleep(burst_interval)
+            start_gate.set()
+        await asyncio.gather(*workers)
+        return time.monotonic() - start
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.seed:
+        await seed_database(args.database_url, args.users)
+
+    port = args.port or free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_server(args, port)
+    try:
+        await wait_until_ready(base_url, process)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            load = LoadRun(client, args.scenario, args.users)
+            elapsed = await load.run(args.concurrency, args.duration, args.burst_interval)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    all_latencies = [value for values in load.latencies.values() for value in values]
+    return {
+        "meta": {
+            "scenario": args.scenario,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 2),
+            "workers": args.workers,
+            "database": args.database_url.split("://", 1)[0],
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        "endpoints": {
+            endpoint: summarize(load.latencies[endpoint], load.errors[endpoint], elapsed)
+            for endpoint in sorted(set(load.latencies) | set(load.errors))
+        },
+        "total": summarize(all_latencies, sum(load.errors.values()), elapsed),
+    }
+
+
+# Comparación
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[Tuple[str, str, float, float, float]]:
+    """Retorna (endpoint, métrica, baseline, actual, cambio relativo) de cada regresión"""
+    regressions = []
+    for endpoint, base_stats in baseline["endpoints"].items():
+        stats = current["endpoints"].get(endpoint)
+        if stats is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            before, after = base_stats[metric], stats[metric]
+            if before <= 0:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append((endpoint, metric, before, after, change))
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    meta = results["meta"]
+    print(
+        f"Escenario {meta['scenario']}: {meta['concurrency']} clientes, "
+        f"{meta['duration_s']}s, {meta['database']}, {meta['workers']} worker(s)"
+    )
+    print(f"{'endpoint':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for endpoint, stats in [*results["endpoints"].items(), ("TOTAL", results["total"])]:
+        print(
+            f"{endpoint:<28} {stats['rps']:>9} {stats['p50_ms']:>9} "
+            f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['errors']:>8}"
+        )
+
+
+def report_regressions(baseline: dict, current: dict, threshold: float) -> int:
+    regressions = compare(baseline, current, threshold)
+    if not regressions:
+        print(f"✅ Sin regresiones por encima del {threshold:.0%}")
+        return 0
+    print(f"❌ Regresiones por encima del {threshold:.0%}:")
+    for endpoint, metric, before, after, change in regressions:
+        print(f"  {endpoint} {metric}: {before} -> {after} ({change:+.1%})")
+    return 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Prueba de carga end-to-end")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Ejecutar un escenario")
+    run_parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    run_parser.add_argument("--database-url", default="sqlite+aiosqlite:///./loadtest.db")
+    run_parser.add_argument("--redis-url", default="", help="Vacío = sin Redis")
+    run_parser.add_argument("--users", type=int, default=1000, help="Usuarios a crear")
+    run_parser.add_argument("--no-seed", dest="seed", action="store_false", help="Reusar la base existente")
+    run_parser.add_argument("--concurrency", type=int, default=50)
+    run_parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga")
+    run_parser.add_argument("--burst-interval", type=float, default=1.0, help="Segundos entre ráfagas (register-burst)")
+    run_parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    run_parser.add_argument("--port", type=int, default=0)
+    run_parser.add_argument("--server-output", action="store_true", help="Mostrar la salida del servidor")
+    run_parser.add_argument("--output", default="load_test_results.json")
+    run_parser.add_argument("--baseline", help="Comparar con este resultado al terminar")
+    run_parser.add_argument("--threshold", type=float, default=0.10)
+
+    compare_parser = commands.add_parser("compare", help="Comparar un resultado con un baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Cambio relativo tolerado")
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as baseline, open(args.current) as current:
+            return report_regressions(json.load(baseline), json.load(current), args.threshold)
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print_results(results)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            return report_regressions(json.load(baseline), results, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
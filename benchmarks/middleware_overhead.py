@@ -0,0 +1,89 @@
+"""
+Benchmark del middleware de logging sobre /health
+
+Compara el middleware anterior (BaseHTTPMiddleware + dos logs síncronos a
+stdout) con el middleware ASGI puro + pipeline QueueHandler/QueueListener.
+
+Uso:
+    python -m benchmarks.middleware_overhead --requests 5000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from fastapi import FastAPI, Request
+from httpx import AsyncClient, ASGITransport
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.middleware.logging import LoggingMiddleware
+from app.utils.logger import setup_logging, shutdown_logging
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """Implementación anterior, reproducida para comparar"""
+
+    async def dispatch(self, request: Request, call_next):
+        logger = logging.getLogger("legacy")
+        start_time = time.time()
+        logger.info(f"Request: {request.method} {request.url.path}")
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        logger.info(
+            f"Response: {request.method} {request.url.path} "
+            f"Status: {response.status_code} Time: {process_time:.3f}s"
+        )
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+
+def build_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    """Retorna microsegundos por request"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(200):
+            await client.get("/health")
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/health")
+        return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def configure_legacy_logging(devnull) -> None:
+    shutdown_logging()
+    root = logging.getLogger()
+    root.handlers = [logging.StreamHandler(devnull)]
+    root.setLevel(logging.INFO)
+
+
+async def main(requests: int) -> None:
+    with open(os.devnull, "w") as devnull:
+        configure_legacy_logging(devnull)
+        baseline = await measure(build_app(None), requests)
+        legacy = await measure(build_app(LegacyLoggingMiddleware), requests)
+
+        setup_logging("INFO", json_format=True, stream=devnull)
+        current = await measure(build_app(LoggingMiddleware), requests)
+        shutdown_logging()
+
+    print(f"Sin middleware:            {baseline:8.1f} µs/request")
+    print(f"BaseHTTPMiddleware (antes): {legacy:8.1f} µs/request (+{legacy - baseline:.1f})")
+    print(f"ASGI + QueueHandler (ahora): {current:8.1f} µs/request (+{current - baseline:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
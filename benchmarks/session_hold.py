@@ -0,0 +1,81 @@
+"""
+Benchmark del tiempo de retención de conexiones en lecturas (GET /users/me)
+
+Compara la sesión transaccional de `get_db` (commit al final del request)
+con la de solo lectura de `get_read_db`, usando el histograma
+`db_pool_connection_hold_seconds` del pool de la app sobre un SQLite
+temporal y sin red (ASGITransport).
+
+Uso:
+    python -m benchmarks.session_hold --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+from app.api.v1.endpoints import users as users_endpoints
+from app.config import database
+from app.config.settings import settings
+from app.core.security import get_current_user_id
+from app.models.user import User
+from app.utils.responses import ORJSONResponse
+
+
+def hold_totals() -> tuple:
+    return (
+        REGISTRY.get_sample_value("db_pool_connection_hold_seconds_sum") or 0.0,
+        REGISTRY.get_sample_value("db_pool_connection_hold_seconds_count") or 0.0,
+    )
+
+
+async def measure(app: FastAPI, requests: int) -> tuple:
+    """Retorna (requests por segundo, retención media por request en ms)"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/api/v1/users/me")
+        hold_sum, _ = hold_totals()
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/api/v1/users/me")
+            assert response.status_code == 200
+        elapsed = time.perf_counter() - start
+        held = hold_totals()[0] - hold_sum
+    return requests / elapsed, held / requests * 1000
+
+
+async def main(requests: int) -> None:
+    settings.USER_CACHE_ENABLED = False
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASE_URL = f"sqlite+aiosqlite:///{directory}/bench.db"
+        await database.init_db()
+        async with database.get_session_factory()() as session:
+            session.add(User(email="bench@example.com", username="bench", hashed_password="x"))
+            await session.commit()
+
+        app = FastAPI(default_response_class=ORJSONResponse)
+        app.include_router(users_endpoints.router, prefix="/api/v1")
+        app.dependency_overrides[get_current_user_id] = lambda: 1
+
+        app.dependency_overrides[database.get_read_db] = database.get_db
+        before = await measure(app, requests)
+        del app.dependency_overrides[database.get_read_db]
+        after = await measure(app, requests)
+        await database.close_db()
+
+    print(f"get_db (antes):      {before[0]:8.1f} req/s, conexión retenida {before[1]:.3f} ms/request")
+    print(f"get_read_db (ahora): {after[0]:8.1f} req/s, conexión retenida {after[1]:.3f} ms/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
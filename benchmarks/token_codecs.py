@@ -0,0 +1,114 @@
+"""
+Benchmark de firma y verificación JWT por backend y algoritmo
+
+Compara los backends de app.core.tokens (jose, cryptography) y, si está
+instalado, PyJWT como referencia externa. Las claves son efímeras.
+
+Uso:
+    python -m benchmarks.token_codecs --iterations 5000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from app.core.tokens import TOKEN_CODECS, KeySet, SigningKey
+
+
+def build_keys() -> dict:
+    return {
+        "HS256": SigningKey("bench-hs", "HS256", b"benchmark-secret-key-with-32-bytes!"),
+        "ES256": SigningKey("bench-es", "ES256", ec.generate_private_key(ec.SECP256R1())),
+        "EdDSA": SigningKey("bench-ed", "EdDSA", ed25519.Ed25519PrivateKey.generate()),
+    }
+
+
+def claims() -> dict:
+    now = datetime.utcnow()
+    return {
+        "sub": 1,
+        "email": "bench@example.com",
+        "type": "access",
+        "iat": now,
+        "exp": now + timedelta(minutes=30),
+    }
+
+
+def measure(func, iterations: int) -> float:
+    """Operaciones por segundo"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def pyjwt_functions(key: SigningKey):
+    """(sign, verify) con PyJWT, o None si no está instalado"""
+    try:
+        import jwt as pyjwt
+    except ImportError:
+        return None
+
+    public_key = key.key if key.algorithm == "HS256" else key.key.public_key()
+    payload = claims()
+
+    def sign():
+        return pyjwt.encode(payload, key.key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    token = sign()
+
+    def verify():
+        return pyjwt.decode(
+            token, public_key, algorithms=[key.algorithm], options={"verify_sub": False}
+        )
+
+    return sign, verify
+
+
+def run(iterations: int) -> list:
+    results = []
+    for algorithm, key in build_keys().items():
+        candidates = {}
+        for backend, codec_class in TOKEN_CODECS.items():
+            if algorithm not in codec_class.algorithms:
+                continue
+            codec = codec_class(KeySet([key], key.kid))
+            payload = claims()
+            token = codec.encode(payload)
+            candidates[backend] = (lambda c=codec, p=payload: c.encode(p), lambda c=codec, t=token: c.decode(t))
+
+        functions = pyjwt_functions(key)
+        if functions is not None:
+            candidates["pyjwt"] = functions
+
+        for library, (sign, verify) in candidates.items():
+            results.append({
+                "algorithm": algorithm,
+                "library": library,
+                "sign_per_second": round(measure(sign, iterations)),
+                "verify_per_second": round(measure(verify, iterations)),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'algoritmo':<8} {'librería':<14} {'firma/s':>10} {'verificación/s':>16}")
+    for row in results:
+        print(
+            f"{row['algorithm']:<8} {row['library']:<14} "
+            f"{row['sign_per_second']:>10} {row['verify_per_second']:>16}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,31 @@
 FastAPI Backend Template
 Aplicación principal con FastAPI
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 import logging
 
 from app.config.settings import settings
-from app.config.database import init_db, close_db
+from app.config.database import create_engine, init_db, close_db
+from app.config.redis import close_redis
+from app.core.hashing import password_executor
+from app.services.user_cache import user_cache
+from app.services.user_service import drain_rehashes
 from app.api.v1.router import api_router
 from app.middleware.cors import setup_cors
 from app.middleware.rate_limit import setup_rate_limiting
 from app.middleware.error_handler import setup_exception_handlers
 from app.middleware.logging import LoggingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.core.metrics import render_metrics
+from app.core.security import get_token_codec
+from app.core.revocation import revocation_store
+from app.tasks import task_queue
 from app.utils.logger import setup_logging
+from app.utils.responses import ORJSONResponse
 
 # Configurar logging
-setup_logging("INFO" if not settings.DEBUG else "DEBUG")
+setup_logging("INFO" if not settings.DEBUG else "DEBUG", json_format=settings.LOG_JSON)
 logger = logging.getLogger(__name__)
 
 
@@ -30,8 +40,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"📝 Entorno: {settings.ENVIRONMENT}")
     logger.info(f"🔐 DEBUG: {settings.DEBUG}")
     
-    # Inicializar base de datos (si está configurada)
+    # Crear engine e inicializar base de datos (si está configurada)
     if settings.DATABASE_URL:
+        create_engine()
         try:
             await init_db()
             logger.info("✅ Base de datos inicializada")
@@ -40,11 +51,22 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("⚠️  Base de datos no configurada - Define DATABASE_URL en .env")
     
+    if settings.USER_CACHE_ENABLED:
+        await user_cache.start_listener()
+    await revocation_store.start_listener()
+    
     yield
     
     # Shutdown
     logger.info("👋 Cerrando aplicación...")
+    await user_cache.stop_listener()
+    await revocation_store.stop_listener()
+    await task_queue.drain(timeout=settings.TASKS_SHUTDOWN_TIMEOUT)
+    task_queue.shutdown()
+    await drain_rehashes(timeout=settings.TASKS_SHUTDOWN_TIMEOUT)
     await close_db()
+    await close_redis()
+    password_executor.shutdown()
     logger.info("✅ Conexiones cerradas")
 
 
@@ -56,6 +78,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -64,6 +87,8 @@ setup_cors(app)
 setup_rate_limiting(app)
 setup_exception_handlers(app)
 app.add_middleware(LoggingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Incluir routers
 app.include_router(api_router, prefix=settings.API_PREFIX)
@@ -90,7 +115,26 @@ async def health_check():
     }
 
 
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks():
+    """Claves públicas para verificar los tokens (vacío con HS256)"""
+    return Response(
+        content=get_token_codec().key_set.jwks(),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE}"}
+    )
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Métricas en formato Prometheus"""
+        content, media_type = render_metrics()
+        return Response(content=content, media_type=media_type)
+
+
 if __name__ == "__main__":
+    # Desarrollo (un proceso, reload con DEBUG). En producción: python -m scripts.serve
     import uvicorn
     
     uvicorn.run(
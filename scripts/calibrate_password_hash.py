@@ -0,0 +1,114 @@
+"""
+Script para elegir el costo de hashing de contraseñas en este hardware
+
+Mide la verificación de un hash con costos crecientes (bcrypt: rounds,
+argon2: time_cost con la memoria y el paralelismo indicados) y elige el
+mayor cuya mediana no supera el objetivo. Imprime las variables para .env.
+
+Ejecutarlo en el mismo tipo de máquina que producción: la latencia medida es
+la de un núcleo, que es la que ve cada login mientras haya un proceso del
+pool de hashing (PASSWORD_HASH_WORKERS) por núcleo.
+
+Uso:
+    python -m scripts.calibrate_password_hash --target-ms 250
+    python -m scripts.calibrate_password_hash --scheme argon2 --memory-cost 65536 --parallelism 4
+"""
+import argparse
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+from app.config.settings import settings
+from app.core.security import PASSWORD_SCHEMES, build_password_context
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SETTING_NAMES = {
+    "bcrypt__rounds": "PASSWORD_BCRYPT_ROUNDS",
+    "argon2__time_cost": "PASSWORD_ARGON2_TIME_COST",
+    "argon2__memory_cost": "PASSWORD_ARGON2_MEMORY_COST",
+    "argon2__parallelism": "PASSWORD_ARGON2_PARALLELISM",
+}
+
+# Mínimos razonables: por debajo no se propone aunque el hardware sea lento
+BCRYPT_ROUNDS = range(10, 17)
+ARGON2_TIME_COSTS = range(1, 11)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Calibrar el costo del hashing de contraseñas")
+    parser.add_argument("--scheme", choices=PASSWORD_SCHEMES, default=settings.PASSWORD_SCHEMES[0])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Latencia máxima de una verificación")
+    parser.add_argument("--samples", type=int, default=5, help="Verificaciones por costo (se usa la mediana)")
+    parser.add_argument("--memory-cost", type=int, default=settings.PASSWORD_ARGON2_MEMORY_COST, help="argon2, KiB")
+    parser.add_argument("--parallelism", type=int, default=settings.PASSWORD_ARGON2_PARALLELISM, help="argon2")
+    return parser.parse_args()
+
+
+def candidate_costs(scheme: str, memory_cost: int, parallelism: int) -> List[Dict[str, int]]:
+    """Costos a probar, de menor a mayor"""
+    if scheme == "bcrypt":
+        return [{"bcrypt__rounds": rounds} for rounds in BCRYPT_ROUNDS]
+    return [
+        {"argon2__time_cost": time_cost, "argon2__memory_cost": memory_cost, "argon2__parallelism": parallelism}
+        for time_cost in ARGON2_TIME_COSTS
+    ]
+
+
+def measure_verify(scheme: str, costs: Dict[str, int], samples: int) -> float:
+    """Mediana en ms de verificar un hash con estos costos"""
+    context = build_password_context([scheme], **costs)
+    hashed = context.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def calibrate(
+    scheme: str,
+    target_ms: float,
+    samples: int = 5,
+    memory_cost: int = 65536,
+    parallelism: int = 4,
+    measure: Callable[[str, Dict[str, int], int], float] = measure_verify,
+) -> Tuple[Dict[str, int], float]:
+    """Mayor costo cuya verificación no supera `target_ms` (o el mínimo si ninguno)"""
+    best: Tuple[Dict[str, int], float] = ({}, 0.0)
+    for costs in candidate_costs(scheme, memory_cost, parallelism):
+        elapsed = measure(scheme, costs, samples)
+        logger.info(f"   {costs}: {elapsed:.1f} ms")
+        if elapsed > target_ms and best[0]:
+            break
+        best = (costs, elapsed)
+        if elapsed > target_ms:
+            break
+    return best
+
+
+def env_lines(scheme: str, costs: Dict[str, int]) -> List[str]:
+    """Variables de .env con el esquema elegido primero"""
+    schemes = [scheme] + [other for other in PASSWORD_SCHEMES if other != scheme]
+    lines = [f"PASSWORD_SCHEMES={schemes}".replace("'", '"')]
+    lines += [f"{SETTING_NAMES[key]}={value}" for key, value in costs.items()]
+    return lines
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logger.info(f"Calibrando {args.scheme} para verificar en {args.target_ms:.0f} ms o menos...")
+    costs, elapsed = calibrate(
+        args.scheme,
+        args.target_ms,
+        samples=args.samples,
+        memory_cost=args.memory_cost,
+        parallelism=args.parallelism,
+    )
+    if elapsed > args.target_ms:
+        logger.warning(f"⚠️  Ni el costo mínimo cumple el objetivo ({elapsed:.1f} ms)")
+    logger.info(f"✅ {args.scheme}: {elapsed:.1f} ms por verificación. Agregar a .env:")
+    for line in env_lines(args.scheme, costs):
+        print(line)
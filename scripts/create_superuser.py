@@ -3,9 +3,10 @@ Script para crear un usuario administrador
 """
 import asyncio
 import logging
-from app.config.database import AsyncSessionLocal
+from app.config.database import get_session_factory
 from app.schemas.user import UserCreate
 from app.services.user_service import UserService
+from app.tasks import task_queue
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,7 +14,8 @@ logger = logging.getLogger(__name__)
 
 async def create_superuser():
     """Crear usuario administrador"""
-    async with AsyncSessionLocal() as db:
+    session_factory = get_session_factory()
+    async with session_factory() as db:
         try:
             # Datos del superusuario
             user_data = UserCreate(
@@ -50,6 +52,10 @@ async def create_superuser():
         except Exception as e:
             logger.error(f"❌ Error al crear superusuario: {e}")
             raise
+        finally:
+            # Email de bienvenida encolado por UserService.create
+            await task_queue.drain()
+            task_queue.shutdown()
 
 
 if __name__ == "__main__":
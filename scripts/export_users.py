@@ -0,0 +1,59 @@
+"""
+Script para exportar usuarios en NDJSON o CSV
+
+Uso:
+    python -m scripts.export_users --format csv --output users.csv --active --since 2024-01-01
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from app.config.database import get_session_factory
+from app.services.user_service import UserService
+from app.utils.export import EXPORT_ENCODERS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Exportar usuarios")
+    parser.add_argument("--format", choices=sorted(EXPORT_ENCODERS), default="ndjson")
+    parser.add_argument("--output", help="Archivo de salida (por defecto stdout)")
+    active = parser.add_mutually_exclusive_group()
+    active.add_argument("--active", dest="is_active", action="store_true", default=None)
+    active.add_argument("--inactive", dest="is_active", action="store_false")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="created_at >= fecha ISO")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="created_at < fecha ISO")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args()
+
+
+async def export_users(args: argparse.Namespace):
+    """Exportar usuarios al archivo indicado"""
+    session_factory = get_session_factory()
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        async with session_factory() as db:
+            rows = UserService.stream_rows(
+                db,
+                is_active=args.is_active,
+                created_from=args.since,
+                created_to=args.until,
+                batch_size=args.batch_size
+            )
+            async for chunk in EXPORT_ENCODERS[args.format](rows):
+                output.write(chunk)
+                written += len(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+    logger.info(f"✅ Exportación completada ({written} bytes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(export_users(parse_args()))
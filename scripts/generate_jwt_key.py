@@ -0,0 +1,73 @@
+"""
+Script para generar y retirar claves de firma JWT (ES256 / EdDSA)
+
+Rotación:
+    1. python -m scripts.generate_jwt_key --algorithm EdDSA --keys-dir keys
+       (la clave nueva pasa a ser la activa al reiniciar)
+    2. python -m scripts.generate_jwt_key --keys-dir keys --retire <kid anterior>
+       (deja solo la clave pública: verifica los tokens emitidos, ya no firma)
+    3. Eliminar el archivo retirado cuando sus tokens hayan expirado
+       (REFRESH_TOKEN_EXPIRE_DAYS)
+"""
+import argparse
+import logging
+import os
+from datetime import datetime
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from app.core.tokens import load_pem_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gestionar claves de firma JWT")
+    parser.add_argument("--keys-dir", required=True, help="Directorio JWT_KEYS_DIR")
+    parser.add_argument("--algorithm", choices=["ES256", "EdDSA"], default="EdDSA")
+    parser.add_argument("--retire", metavar="KID", help="Reemplazar la clave privada por su clave pública")
+    return parser.parse_args()
+
+
+def generate_key(keys_dir: str, algorithm: str) -> str:
+    """Crear una clave privada nueva; retorna su kid"""
+    if algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+
+    kid = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{algorithm.lower()}"
+    path = os.path.join(keys_dir, f"{kid}.pem")
+    os.makedirs(keys_dir, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as pem:
+        pem.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+    return kid
+
+
+def retire_key(keys_dir: str, kid: str) -> None:
+    """Dejar solo la clave pública de `kid`"""
+    path = os.path.join(keys_dir, f"{kid}.pem")
+    with open(path, "rb") as pem:
+        key = load_pem_key(pem.read())
+    if hasattr(key, "public_key"):
+        key = key.public_key()
+    with open(path, "wb") as pem:
+        pem.write(key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.retire:
+        retire_key(args.keys_dir, args.retire)
+        logger.info(f"✅ Clave {args.retire} retirada (solo verificación)")
+    else:
+        kid = generate_key(args.keys_dir, args.algorithm)
+        logger.info(f"✅ Clave {args.algorithm} creada: {kid}")
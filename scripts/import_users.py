@@ -0,0 +1,63 @@
+"""
+Script para importar usuarios desde NDJSON o CSV
+
+Uso:
+    python -m scripts.import_users users.csv --batch-size 1000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from app.config.database import get_session_factory
+from app.core.hashing import password_executor
+from app.services.import_service import UserImportService
+from app.utils.imports import IMPORT_FORMATS, IMPORT_PARSERS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Importar usuarios")
+    parser.add_argument("input", help="Archivo .ndjson/.jsonl o .csv")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Por defecto según la extensión")
+    parser.add_argument("--batch-size", type=int, help="Filas por INSERT (IMPORT_BATCH_SIZE)")
+    parser.add_argument("--report", help="Guardar el reporte completo en JSON")
+    return parser.parse_args()
+
+
+async def import_users(args: argparse.Namespace):
+    """Importar usuarios desde el archivo indicado"""
+    session_factory = get_session_factory()
+
+    import_format = args.format
+    if import_format is None:
+        extension = os.path.splitext(args.input)[1].lower()
+        import_format = "csv" if extension == ".csv" else "ndjson"
+
+    try:
+        with open(args.input, encoding="utf-8-sig", newline="") as lines:
+            async with session_factory() as db:
+                report = await UserImportService(db, batch_size=args.batch_size).run(
+                    IMPORT_PARSERS[import_format](lines)
+                )
+    finally:
+        password_executor.shutdown()
+
+    for error in report.errors:
+        logger.warning(f"Línea {error.line} ({error.email or '-'}): {error.detail}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as output:
+            json.dump(report.model_dump(), output, ensure_ascii=False, indent=2)
+
+    logger.info(
+        f"✅ Importación completada: {report.created} creados, {report.conflicts} duplicados, "
+        f"{report.invalid} inválidos de {report.total} filas "
+        f"({report.elapsed_seconds}s, {report.rows_per_second} filas/s)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(import_users(parse_args()))
@@ -0,0 +1,217 @@
+"""
+Servidor de producción: varios workers de uvicorn sobre un socket compartido
+
+- El proceso principal abre el socket, importa la app (WEB_PRELOAD) y
+  congela el heap con gc.freeze() antes de hacer fork: los workers
+  comparten esa memoria copy-on-write.
+- Cada worker es un uvicorn con uvloop/httptools si están instalados.
+- Un worker que atiende WEB_MAX_REQUESTS requests termina los que tiene en
+  curso y sale; el proceso principal lo reemplaza. Lo mismo si muere.
+- SIGTERM/SIGINT: se detienen los workers de forma ordenada y, pasado
+  WEB_GRACEFUL_TIMEOUT, se matan.
+
+Toda la configuración sale de Settings (ver .env.example).
+
+Uso:
+    python -m scripts.serve
+    WEB_WORKERS=4 WEB_MAX_REQUESTS=10000 python -m scripts.serve
+"""
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+from app.config.settings import settings
+from app.utils.logger import shutdown_logging
+
+logger = logging.getLogger("scripts.serve")
+
+# Un worker que muere antes de este tiempo probablemente no puede arrancar:
+# se espera antes de reemplazarlo para no entrar en un bucle de forks
+MIN_WORKER_LIFETIME = 1.0
+
+
+def resolve_workers(workers: int) -> int:
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def resolve_loop(loop: str) -> str:
+    if loop != "auto":
+        return loop
+    try:
+        import uvloop  # noqa: F401
+        return "uvloop"
+    except ImportError:
+        return "asyncio"
+
+
+def resolve_http(http: str) -> str:
+    if http != "auto":
+        return http
+    try:
+        import httptools  # noqa: F401
+        return "httptools"
+    except ImportError:
+        return "h11"
+
+
+def create_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Proceso principal: crea, vigila y reemplaza los workers"""
+
+    def __init__(self, sock: socket.socket, app, workers: int):
+        self.sock = sock
+        # Objeto ASGI ya importado (preload) o "main:app" para importarlo en cada worker
+        self.app = app
+        self.workers = workers
+        self.children: Dict[int, float] = {}
+        self.should_exit = False
+
+    # Proceso principal
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGALRM, self._handle_timeout)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            self._worker_exited(pid)
+            if self.should_exit:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0:
+                logger.info(f"Worker {pid} reciclado, reemplazando")
+            else:
+                logger.warning(f"Worker {pid} terminó con código {code}, reemplazando")
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn()
+
+        signal.alarm(0)
+        logger.info("✅ Servidor detenido")
+        return 0
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = self.run_worker()
+            except BaseException:
+                logger.exception("Error en el worker")
+            finally:
+                shutdown_logging()
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Worker {pid} iniciado")
+
+    def _handle_exit(self, signum, frame) -> None:
+        if self.should_exit:
+            return
+        self.should_exit = True
+        logger.info(f"Deteniendo {len(self.children)} workers...")
+        for pid in list(self.children):
+            self._kill(pid, signal.SIGTERM)
+        signal.alarm(settings.WEB_GRACEFUL_TIMEOUT + 5)
+
+    def _handle_timeout(self, signum, frame) -> None:
+        for pid in list(self.children):
+            logger.warning(f"Worker {pid} no terminó a tiempo, forzando")
+            self._kill(pid, signal.SIGKILL)
+
+    @staticmethod
+    def _kill(pid: int, sig: int) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _worker_exited(pid: int) -> None:
+        if settings.METRICS_ENABLED:
+            from app.core.metrics import mark_worker_dead
+            mark_worker_dead(pid)
+
+    # Worker
+
+    def run_worker(self) -> int:
+        import uvicorn
+
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+            signal.signal(sig, signal.SIG_DFL)
+        gc.enable()
+
+        max_requests: Optional[int] = None
+        if settings.WEB_MAX_REQUESTS > 0:
+            max_requests = settings.WEB_MAX_REQUESTS + random.randint(0, settings.WEB_MAX_REQUESTS_JITTER)
+
+        config = uvicorn.Config(
+            self.app,
+            loop=resolve_loop(settings.WEB_LOOP),
+            http=resolve_http(settings.WEB_HTTP),
+            lifespan="on",
+            # Logging y access log los configura la app (LoggingMiddleware)
+            log_config=None,
+            access_log=False,
+            proxy_headers=settings.WEB_PROXY_HEADERS,
+            forwarded_allow_ips=settings.WEB_FORWARDED_ALLOW_IPS,
+            timeout_keep_alive=settings.WEB_KEEPALIVE_TIMEOUT,
+            timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT,
+            limit_max_requests=max_requests,
+        )
+        server = uvicorn.Server(config)
+        server.run(sockets=[self.sock])
+        return 0 if server.started else 1
+
+
+def main() -> int:
+    workers = resolve_workers(settings.WEB_WORKERS)
+    sock = create_socket(settings.HOST, settings.PORT, settings.WEB_BACKLOG)
+
+    app = "main:app"
+    if settings.WEB_PRELOAD:
+        # Sin recolecciones mientras se importa: los objetos quedan en el heap
+        # compartido y gc.freeze() evita que el GC de los workers los toque
+        gc.disable()
+        from main import app
+        gc.freeze()
+    else:
+        logging.basicConfig(level=logging.INFO)
+
+    if workers > 1 and settings.METRICS_ENABLED and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        logger.warning("⚠️  Varios workers sin PROMETHEUS_MULTIPROC_DIR: /metrics solo verá un worker por request")
+
+    logger.info(
+        f"🚀 Escuchando en {settings.HOST}:{sock.getsockname()[1]} con {workers} workers "
+        f"({resolve_loop(settings.WEB_LOOP)}/{resolve_http(settings.WEB_HTTP)}, "
+        f"preload={'sí' if settings.WEB_PRELOAD else 'no'})"
+    )
+    return Supervisor(sock, app, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
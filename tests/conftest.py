@@ -1,15 +1,26 @@
 """
 Configuración de pytest
 """
+import os
 import pytest
 import asyncio
 from typing import AsyncGenerator
+import fakeredis
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
 from main import app
-from app.config.database import Base, get_db
+from app.config.database import Base, get_db, get_read_db
+from app.config.replicas import ReadOnlySession, read_only_bind
 from app.config.settings import settings
+from app.config.redis import set_redis
+from app.services.user_cache import user_cache
+from app.middleware.rate_limit import limiter
+from app.core.revocation import revocation_store
+from app.core.login_guard import login_guard
+from app.tasks import task_queue
 
 # URL de base de datos de prueba
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -27,6 +38,16 @@ TestSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Sesiones de solo lectura como las de get_read_db en producción
+TestReadSessionLocal = async_sessionmaker(
+    read_only_bind(test_engine),
+    class_=AsyncSession,
+    sync_session_class=ReadOnlySession,
+    expire_on_commit=False,
+    autoflush=False,
+    info={"read_only": True}
+)
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -36,8 +57,35 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+async def background_tasks():
+    """Esperar las tareas encoladas durante el test (TASKS_MODE=eager)"""
+    yield task_queue
+    await task_queue.drain()
+
+
 @pytest.fixture(scope="function")
-async def db_session() -> AsyncGenerator[AsyncSession, None]:
+async def redis_client():
+    """
+    Redis en memoria (fakeredis) compartido por la app durante el test
+    """
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    set_redis(client)
+    user_cache.clear_local()
+    revocation_store.clear_local()
+    limiter.reset()
+    login_guard.reset()
+    yield client
+    await client.flushall()
+    set_redis(None)
+    user_cache.clear_local()
+    revocation_store.clear_local()
+    limiter.reset()
+    login_guard.reset()
+
+
+@pytest.fixture(scope="function")
+async def db_session(redis_client) -> AsyncGenerator[AsyncSession, None]:
     """
     Crear sesión de base de datos para tests
     """
@@ -59,7 +107,12 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     async def override_get_db():
         yield db_session
     
+    async def override_get_read_db():
+        async with TestReadSessionLocal() as session:
+            yield session
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
     
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -1,13 +1,16 @@
 """
 Tests de autenticación
 """
+import time
 import pytest
+from fastapi import HTTPException
 from app.core.security import (
     get_password_hash,
     verify_password,
     create_access_token,
     create_refresh_token,
-    verify_token
+    verify_token,
+    token_cache
 )
 
 
@@ -52,3 +55,35 @@ def test_verify_token():
     assert payload.get("sub") == 1
     assert payload.get("email") == "test@example.com"
     assert payload.get("type") == "access"
+
+
+def test_verify_token_cache():
+    """Las verificaciones repetidas se sirven desde la caché"""
+    token_cache.clear()
+    token = create_access_token({"sub": 2, "email": "cache@example.com"})
+    
+    verify_token(token, "access")
+    hits = token_cache.hits
+    payload = verify_token(token, "access")
+    
+    assert token_cache.hits == hits + 1
+    assert payload.get("sub") == 2
+    
+    # El tipo de token se sigue validando en aciertos de caché
+    with pytest.raises(HTTPException):
+        verify_token(token, "refresh")
+    
+    assert token_cache.purge(token) is True
+    assert token_cache.get(token) is None
+
+
+def test_token_cache_never_returns_expired_payload():
+    """Una entrada vencida no se devuelve aunque siga en la caché"""
+    token_cache.clear()
+    token = create_access_token({"sub": 3})
+    payload = verify_token(token, "access")
+    
+    token_cache._entries[token_cache._key(token)] = (payload, time.time() - 1)
+    
+    assert token_cache.get(token) is None
+    assert token_cache.stats()["size"] == 0
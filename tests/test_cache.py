@@ -0,0 +1,121 @@
+"""
+Tests de la caché de usuarios
+"""
+import asyncio
+import pytest
+from app.core.cache import TwoTierCache
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services.user_cache import user_cache
+from app.services.user_service import UserService
+
+
+async def create_user(db_session, email: str = "cache@example.com") -> User:
+    user = User(email=email, username=email.split("@")[0], hashed_password="not-a-real-hash")
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+
+async def test_get_by_id_read_through(db_session):
+    """La segunda lectura se sirve desde la caché"""
+    user = await create_user(db_session)
+
+    first = await UserService.get_by_id(db_session, user.id)
+    hits = user_cache.hits
+    second = await UserService.get_by_id(db_session, user.id)
+
+    assert user_cache.hits == hits + 1
+    assert second.email == first.email == "cache@example.com"
+    assert second.hashed_password is None
+
+
+async def test_no_stale_read_after_update(db_session, redis_client):
+    """Tras actualizar, las lecturas devuelven el dato nuevo en ambos niveles"""
+    user = await create_user(db_session)
+    await UserService.get_by_id(db_session, user.id)
+    await UserService.get_by_email(db_session, user.email)
+
+    await UserService.update(db_session, user.id, UserUpdate(full_name="Nuevo Nombre", email="nuevo@example.com"))
+
+    assert (await UserService.get_by_id(db_session, user.id)).full_name == "Nuevo Nombre"
+    assert await UserService.get_by_email(db_session, "cache@example.com") is None
+    assert (await UserService.get_by_email(db_session, "nuevo@example.com")).id == user.id
+
+    # Otro worker (sin nivel local) tampoco ve el dato anterior en Redis
+    other_worker = TwoTierCache("user", redis_getter=lambda: redis_client)
+    cached = await other_worker.get(f"id:{user.id}")
+    assert cached is None or cached["full_name"] == "Nuevo Nombre"
+
+
+async def test_no_stale_read_after_delete(db_session):
+    """Un usuario eliminado deja de resolverse desde la caché"""
+    user = await create_user(db_session)
+    await UserService.get_by_id(db_session, user.id)
+
+    await UserService.delete(db_session, user.id)
+
+    assert await UserService.get_by_id(db_session, user.id) is None
+
+
+async def test_invalidation_reaches_other_workers(redis_client):
+    """Las invalidaciones se publican y expulsan el nivel local de otros workers"""
+    worker_a = TwoTierCache("test", redis_getter=lambda: redis_client)
+    worker_b = TwoTierCache("test", redis_getter=lambda: redis_client)
+    await worker_b.start_listener()
+    try:
+        await worker_b.set("k", {"v": 1})
+        await asyncio.sleep(0.05)
+
+        await worker_a.delete("k")
+        for _ in range(50):
+            if worker_b.local.get("k") is None:
+                break
+            await asyncio.sleep(0.05)
+
+        assert await worker_b.get("k") is None
+    finally:
+        await worker_b.stop_listener()
+
+
+async def test_load_racing_with_invalidation_is_not_cached(redis_client):
+    """Un valor leído antes de una invalidación no repuebla la caché"""
+    cache = TwoTierCache("test", redis_getter=lambda: redis_client)
+
+    async def slow_loader():
+        await asyncio.sleep(0.05)
+        return {"v": "old"}
+
+    load = asyncio.create_task(cache.get_or_load("k", slow_loader))
+    await asyncio.sleep(0.01)
+    await cache.delete("k")
+
+    assert await load == {"v": "old"}
+    assert await cache.get("k") is None
+
+
+async def test_redis_failure_fails_open():
+    """Si Redis falla, la caché responde como un fallo y no lanza excepciones"""
+    class BrokenRedis:
+        async def get(self, *args, **kwargs):
+            raise ConnectionError("redis caído")
+
+        async def set(self, *args, **kwargs):
+            raise ConnectionError("redis caído")
+
+    cache = TwoTierCache("test", redis_getter=BrokenRedis)
+
+    assert await cache.get_or_load("k", lambda: asyncio.sleep(0, result={"v": 1})) == {"v": 1}
+    assert await cache.get("k") == {"v": 1}
+
+
+async def test_fill_rejected_by_redis_is_not_kept_locally(redis_client):
+    """Si Redis tiene la marca de invalidación, el valor no se guarda en el nivel local"""
+    writer = TwoTierCache("test", redis_getter=lambda: redis_client)
+    reader = TwoTierCache("test", redis_getter=lambda: redis_client)
+    await writer.delete("k")
+
+    assert await reader.get("k") is None
+    assert reader.recently_invalidated("k")
+    await reader.set("k", {"v": "réplica"})
+    assert reader.local.get("k") is None
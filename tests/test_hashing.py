@@ -0,0 +1,161 @@
+"""
+Tests del ejecutor de hashing de contraseñas
+"""
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from app.core.hashing import PasswordHashExecutor
+from app.core.security import build_password_context, get_password_hash, verify_password
+from app.services import user_service
+from app.services.user_service import UserService
+from app.models.user import User
+from scripts.calibrate_password_hash import calibrate, env_lines
+from tests.conftest import TestSessionLocal
+
+
+async def test_executor_hash_and_verify():
+    """El hash calculado en el pool es verificable"""
+    executor = PasswordHashExecutor(workers=2, max_queue=10)
+    try:
+        hashed = await executor.run(get_password_hash, "test_password123")
+        assert await executor.run(verify_password, "test_password123", hashed) is True
+        assert await executor.run(verify_password, "wrong_password", hashed) is False
+
+        stats = executor.stats()
+        assert stats["completed"] == 3
+        assert stats["queue_depth"] == 0
+        assert stats["in_flight"] == 0
+    finally:
+        executor.shutdown()
+
+
+async def test_executor_rejects_when_queue_full():
+    """Se rechazan operaciones cuando la cola está llena"""
+    executor = PasswordHashExecutor(workers=1, max_queue=1)
+    try:
+        first = asyncio.create_task(executor.run(time.sleep, 0.3))
+        second = asyncio.create_task(executor.run(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+
+        assert executor.stats()["queue_depth"] == 1
+        with pytest.raises(HTTPException) as exc_info:
+            await executor.run(time.sleep, 0.3)
+        assert exc_info.value.status_code == 503
+
+        await asyncio.gather(first, second)
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["wait_seconds_max"] > 0
+    finally:
+        executor.shutdown()
+
+
+async def test_event_loop_stays_responsive_under_hashing():
+    """El event loop no se bloquea mientras se hashean contraseñas"""
+    executor = PasswordHashExecutor(workers=2, max_queue=100)
+    try:
+        # Calentar el pool para no medir el arranque de procesos
+        await executor.run(get_password_hash, "warmup")
+
+        hashes = asyncio.gather(*(executor.run(get_password_hash, f"pw-{i}") for i in range(8)))
+
+        max_lag = 0.0
+        while not hashes.done():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+        await hashes
+
+        assert max_lag < 0.1
+    finally:
+        executor.shutdown()
+
+
+def test_outdated_hashes_need_update():
+    """Un hash con otro costo u otro esquema se rehashea con el configurado"""
+    old = build_password_context(["bcrypt"], bcrypt__rounds=4).hash("secreta")
+    context = build_password_context(["bcrypt"], bcrypt__rounds=5)
+
+    valid, new_hash = context.verify_and_update("secreta", old)
+    assert valid is True
+    assert new_hash.startswith("$2b$05$")
+    assert context.verify_and_update("secreta", new_hash) == (True, None)
+    assert context.verify_and_update("otra", old) == (False, None)
+
+    pytest.importorskip("argon2")
+    argon2 = build_password_context(
+        ["argon2", "bcrypt"], argon2__time_cost=1, argon2__memory_cost=1024, argon2__parallelism=1
+    )
+    valid, new_hash = argon2.verify_and_update("secreta", old)
+    assert valid is True
+    assert new_hash.startswith("$argon2id$v=19$m=1024,t=1,p=1$")
+
+    with pytest.raises(ValueError):
+        build_password_context(["md5_crypt"])
+
+
+async def test_login_rehashes_outdated_hash_after_response(client, db_session, monkeypatch):
+    """El login responde con el hash viejo y lo reemplaza después, sin cambiar la versión del usuario"""
+    monkeypatch.setattr(user_service, "get_session_factory", lambda: TestSessionLocal)
+    old_hash = build_password_context(["bcrypt"], bcrypt__rounds=4).hash("correcta123")
+    user = User(email="rehash@example.com", username="rehash", hashed_password=old_hash)
+    db_session.add(user)
+    await db_session.commit()
+    user_id = user.id
+    updated_at = (await db_session.execute(select(User.updated_at).where(User.id == user_id))).scalar_one()
+
+    release = asyncio.Event()
+    replace = UserService._replace_password_hash
+
+    async def gated_replace(db, *args):
+        await release.wait()
+        return await replace(db, *args)
+
+    monkeypatch.setattr(UserService, "_replace_password_hash", staticmethod(gated_replace))
+
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "rehash@example.com", "password": "correcta123"}
+    )
+    assert response.status_code == 200
+    stored = select(User.hashed_password, User.updated_at).where(User.id == user_id)
+    assert (await db_session.execute(stored)).one().hashed_password == old_hash
+
+    release.set()
+    await user_service.drain_rehashes(timeout=5)
+    db_session.expire_all()
+    row = (await db_session.execute(stored)).one()
+    assert row.hashed_password != old_hash
+    assert verify_password("correcta123", row.hashed_password)
+    assert row.updated_at == updated_at
+
+    # Si la contraseña cambió entretanto, el hash nuevo no la pisa
+    assert await replace(db_session, user_id, old_hash, "otro") is False
+
+
+async def test_rehash_failure_is_logged(monkeypatch, caplog):
+    """Un rehash fallido no se propaga: queda el hash viejo hasta el próximo login"""
+    def unavailable():
+        raise RuntimeError("Database no configurada")
+
+    monkeypatch.setattr(user_service, "get_session_factory", unavailable)
+    await UserService._rehash(1, "viejo", "nuevo")
+    assert "Rehash de la contraseña del usuario 1 no completado" in caplog.text
+
+
+def test_calibrate_picks_highest_cost_under_target():
+    """Se elige el mayor costo que verifica dentro del objetivo"""
+    latencies = {10: 60.0, 11: 120.0, 12: 240.0, 13: 480.0}
+    measured = []
+
+    def fake_measure(scheme, costs, samples):
+        measured.append(costs["bcrypt__rounds"])
+        return latencies[costs["bcrypt__rounds"]]
+
+    costs, elapsed = calibrate("bcrypt", 250.0, measure=fake_measure)
+    assert costs == {"bcrypt__rounds": 12}
+    assert elapsed == 240.0
+    assert measured == [10, 11, 12, 13]
+    assert env_lines("bcrypt", costs) == ['PASSWORD_SCHEMES=["bcrypt", "argon2"]', "PASSWORD_BCRYPT_ROUNDS=12"]
@@ -0,0 +1,93 @@
+"""
+Tests de importación masiva de usuarios
+"""
+import json
+import threading
+from sqlalchemy import func, select
+from app.core.security import create_access_token
+from app.models.user import User
+from app.services.import_service import UserImportService
+from app.utils.imports import iter_csv_rows, iter_ndjson_rows
+
+
+def ndjson_lines(*rows) -> list:
+    return [json.dumps(row) + "\n" for row in rows]
+
+
+def user_row(i: int, **overrides) -> dict:
+    row = {"email": f"import{i}@example.com", "username": f"import{i}", "password": "password123"}
+    row.update(overrides)
+    return row
+
+
+def test_csv_rows_use_line_numbers():
+    """El parser CSV reporta el número de línea y omite celdas vacías"""
+    lines = ["email,username,password,full_name\n", "a@example.com,aaa,password123,\n"]
+
+    assert list(iter_csv_rows(lines)) == [
+        (2, {"email": "a@example.com", "username": "aaa", "password": "password123"})
+    ]
+
+
+async def test_import_reports_conflicts_without_aborting_batch(db_session):
+    """Duplicados e inválidos se reportan por línea; el resto del lote se inserta"""
+    db_session.add(User(email="import1@example.com", username="taken", hashed_password="x"))
+    await db_session.commit()
+
+    lines = ndjson_lines(
+        user_row(0),
+        user_row(1),                                   # email ya existente
+        user_row(2),
+        user_row(3, username="import2"),               # username repetido en el archivo
+        user_row(4, password="corta"),                 # inválido
+    ) + ["{no es json\n"]
+
+    report = await UserImportService(db_session, batch_size=3).run(iter_ndjson_rows(lines))
+
+    assert (report.total, report.created, report.conflicts, report.invalid) == (6, 2, 2, 2)
+    errors = {error.line: error.detail for error in report.errors}
+    assert errors[2] == "El email ya está registrado"
+    assert errors[4] == "El username ya está en uso"
+    assert errors[5].startswith("password")
+    assert errors[6].startswith("JSON inválido")
+    assert report.rows_per_second > 0
+
+    count = await db_session.scalar(select(func.count()).select_from(User))
+    assert count == 3
+
+
+async def test_import_reads_rows_off_the_event_loop(db_session):
+    """El archivo se lee en el threadpool, no en el hilo del event loop"""
+    threads = set()
+
+    def lines():
+        for line in ndjson_lines(user_row(0), user_row(1), user_row(2)):
+            threads.add(threading.current_thread())
+            yield line
+
+    report = await UserImportService(db_session, batch_size=2).run(iter_ndjson_rows(lines()))
+
+    assert report.created == 3
+    assert threading.main_thread() not in threads
+
+
+async def test_import_endpoint_requires_superuser(client, db_session):
+    """Solo un superusuario puede importar; la respuesta es el reporte"""
+    admin = User(email="admin@example.com", username="admin", hashed_password="x", is_superuser=True)
+    regular = User(email="regular@example.com", username="regular", hashed_password="x")
+    db_session.add_all([admin, regular])
+    await db_session.commit()
+
+    csv_body = "email,username,password\nnew@example.com,newuser,password123\n"
+    files = {"file": ("users.csv", csv_body, "text/csv")}
+
+    def auth(user):
+        return {"Authorization": f"Bearer {create_access_token({'sub': user.id})}"}
+
+    response = await client.post("/api/v1/users/import?format=csv", files=files, headers=auth(regular))
+    assert response.status_code == 403
+
+    response = await client.post("/api/v1/users/import?format=csv", files=files, headers=auth(admin))
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert response.json()["errors"] == []
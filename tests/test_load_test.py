@@ -0,0 +1,33 @@
+"""
+Tests del arnés de pruebas de carga (sin levantar el servidor)
+"""
+from benchmarks.load_test import compare, percentile, summarize
+
+
+def results(rps: float, p95_ms: float) -> dict:
+    stats = {"rps": rps, "p50_ms": 5.0, "p95_ms": p95_ms, "p99_ms": 50.0}
+    return {"endpoints": {"GET /api/v1/users/me": stats}}
+
+
+def test_percentiles_and_summary():
+    """Percentiles por rango más cercano y throughput por segundo"""
+    latencies = [i / 1000 for i in range(1, 101)]
+
+    assert percentile(sorted(latencies), 50) == 0.05
+    assert percentile(sorted(latencies), 99) == 0.099
+    stats = summarize(latencies, errors=2, elapsed=10)
+    assert stats["rps"] == 10
+    assert stats["p95_ms"] == 95.0
+    assert stats["errors"] == 2
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Solo se marcan empeoramientos mayores al umbral (menos rps o más latencia)"""
+    baseline = results(rps=100, p95_ms=20)
+
+    assert compare(baseline, results(rps=95, p95_ms=21), threshold=0.10) == []
+    regressions = compare(baseline, results(rps=80, p95_ms=30), threshold=0.10)
+    assert {(endpoint, metric) for endpoint, metric, *_ in regressions} == {
+        ("GET /api/v1/users/me", "rps"),
+        ("GET /api/v1/users/me", "p95_ms"),
+    }
@@ -0,0 +1,140 @@
+"""
+Tests de la protección contra fuerza bruta en el login
+"""
+import time
+import pytest
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+from app.config.settings import settings
+from app.core import login_guard as login_guard_module
+from app.core.login_guard import LoginGuard
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.services import user_service
+
+
+@pytest.fixture
+def guard_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_GUARD_ACCOUNT_MAX_FAILURES", 3)
+    monkeypatch.setattr(settings, "LOGIN_GUARD_IP_MAX_FAILURES", 10)
+    monkeypatch.setattr(settings, "LOGIN_GUARD_LOCKOUT_BASE", 60)
+    monkeypatch.setattr(settings, "LOGIN_GUARD_LOCKOUT_MAX", 3600)
+
+
+async def assert_locked(guard: LoginGuard, email: str, ip: str = "10.0.0.1") -> int:
+    with pytest.raises(HTTPException) as exc_info:
+        await guard.check(email, ip)
+    assert exc_info.value.status_code == 429
+    return int(exc_info.value.headers["Retry-After"])
+
+
+async def test_lockout_is_shared_across_workers(redis_client, guard_settings):
+    """Los fallos se suman entre workers y el bloqueo se ve desde todos"""
+    workers = [LoginGuard(redis_getter=lambda: redis_client) for _ in range(2)]
+
+    for i in range(3):
+        await workers[i % 2].check("victima@example.com", f"10.0.0.{i}")
+        await workers[i % 2].record_failure("victima@example.com", f"10.0.0.{i}")
+
+    for worker in workers:
+        assert 55 <= await assert_locked(worker, "Victima@example.com") <= 60
+    await workers[0].check("otra@example.com", "10.0.0.1")
+
+
+async def test_lockout_grows_exponentially(monkeypatch, guard_settings):
+    """Cada bloqueo de la misma clave dura el doble que el anterior (sin Redis)"""
+    guard = LoginGuard(redis_getter=lambda: None)
+    now = [1_000_000.0]
+    monkeypatch.setattr(login_guard_module.time, "time", lambda: now[0])
+
+    durations = []
+    for _ in range(3):
+        for _ in range(3):
+            await guard.record_failure("victima@example.com")
+        durations.append(await assert_locked(guard, "victima@example.com"))
+        now[0] += durations[-1]
+        await guard.check("victima@example.com")
+
+    assert durations == [60, 120, 240]
+
+
+async def test_ip_lockout_covers_every_account(redis_client, guard_settings):
+    """Una IP que prueba muchas cuentas queda bloqueada para todas"""
+    guard = LoginGuard(redis_getter=lambda: redis_client)
+    before = REGISTRY.get_sample_value("login_guard_lockouts_total", {"scope": "ip"}) or 0.0
+
+    for i in range(10):
+        await guard.record_failure(f"usuario{i}@example.com", "10.0.0.9")
+
+    await assert_locked(guard, "nueva@example.com", "10.0.0.9")
+    await guard.check("nueva@example.com", "10.0.0.10")
+    assert REGISTRY.get_sample_value("login_guard_lockouts_total", {"scope": "ip"}) - before == 1
+
+
+async def test_locked_login_skips_password_verification(client, db_session, guard_settings, monkeypatch):
+    """Con la cuenta bloqueada el login responde 429 sin ejecutar bcrypt"""
+    db_session.add(User(
+        email="bruta@example.com",
+        username="bruta",
+        hashed_password=get_password_hash("correcta123")
+    ))
+    await db_session.commit()
+
+    verifications = []
+    verify = user_service.verify_and_update_password_async
+
+    async def counting_verify(password, hashed_password):
+        verifications.append(time.perf_counter())
+        return await verify(password, hashed_password)
+
+    monkeypatch.setattr(user_service, "verify_and_update_password_async", counting_verify)
+
+    statuses = []
+    for password in ["mala"] * 3 + ["correcta123"]:
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"email": "bruta@example.com", "password": password}
+        )
+        statuses.append(response.status_code)
+
+    assert statuses == [401, 401, 401, 429]
+    assert "Retry-After" in response.headers
+    assert len(verifications) == 3
+
+
+async def test_successful_login_resets_account_failures(client, db_session, guard_settings):
+    """Un login correcto olvida los fallos previos de la cuenta"""
+    db_session.add(User(
+        email="olvido@example.com",
+        username="olvido",
+        hashed_password=get_password_hash("correcta123")
+    ))
+    await db_session.commit()
+
+    for password in ["mala", "mala", "correcta123", "mala", "mala"]:
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"email": "olvido@example.com", "password": password}
+        )
+        assert response.status_code == (200 if password == "correcta123" else 401)
+
+
+async def test_inactive_account_does_not_reset_failures(client, db_session, guard_settings):
+    """La contraseña correcta de una cuenta desactivada no borra sus fallos"""
+    db_session.add(User(
+        email="inactiva@example.com",
+        username="inactiva",
+        hashed_password=get_password_hash("correcta123"),
+        is_active=False
+    ))
+    await db_session.commit()
+
+    statuses = []
+    for password in ["mala", "mala", "correcta123", "mala", "mala"]:
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"email": "inactiva@example.com", "password": password}
+        )
+        statuses.append(response.status_code)
+
+    assert statuses == [401, 401, 401, 401, 429]
@@ -0,0 +1,40 @@
+"""
+Tests de métricas
+"""
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from app.core.metrics import render_metrics
+from app.middleware.metrics import MetricsMiddleware
+
+
+async def test_metrics_use_route_template():
+    """Las series se etiquetan con la plantilla de la ruta, no con el path real"""
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/no-existe")
+
+    content, media_type = render_metrics()
+    text = content.decode()
+
+    assert media_type.startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"}' in text
+    assert 'route="unmatched",status="404"' in text
+    assert "/items/1" not in text
+
+
+async def test_metrics_endpoint(client):
+    """/metrics expone el formato de texto Prometheus"""
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "db_pool_checkout_wait_seconds" in response.text
+    assert "password_hash_operations_total" in response.text
@@ -0,0 +1,51 @@
+"""
+Tests de middleware
+"""
+import logging
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from app.middleware.logging import LoggingMiddleware
+
+
+def build_app(sample_rate: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return {"status": "ok"}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(LoggingMiddleware, sample_rate=sample_rate)
+    return app
+
+
+async def test_logging_middleware_sets_process_time(caplog):
+    """Se agrega X-Process-Time y se registra un log estructurado"""
+    app = build_app(sample_rate=1.0)
+    caplog.set_level(logging.INFO, logger="app.access")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/ok")
+
+    assert response.status_code == 200
+    assert float(response.headers["X-Process-Time"]) >= 0
+    record = next(r for r in caplog.records if r.name == "app.access")
+    assert record.path == "/ok"
+    assert record.status_code == 200
+
+
+async def test_logging_middleware_sampling_keeps_errors(caplog):
+    """Con muestreo 0 solo se registran los errores 5xx"""
+    app = build_app(sample_rate=0.0)
+    caplog.set_level(logging.INFO, logger="app.access")
+
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/ok")
+        await client.get("/boom")
+
+    paths = [r.path for r in caplog.records if r.name == "app.access"]
+    assert paths == ["/boom"]
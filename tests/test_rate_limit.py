@@ -0,0 +1,101 @@
+"""
+Tests de rate limiting
+"""
+import pytest
+from fastapi import HTTPException, Request
+from prometheus_client import REGISTRY
+from app.core.rate_limiter import RateLimiter, parse_limit
+
+
+def make_request(ip: str = "10.0.0.1") -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "client": (ip, 1234)})
+
+
+def decisions(source: str) -> float:
+    return REGISTRY.get_sample_value("rate_limit_decisions_total", {"source": source}) or 0.0
+
+
+async def count_allowed(limiters, hits: int, limit: str, ip: str = "10.0.0.1") -> int:
+    """Repartir `hits` entre varios workers y contar cuántos se permiten"""
+    item = parse_limit(limit)
+    allowed = 0
+    for i in range(hits):
+        try:
+            await limiters[i % len(limiters)].hit(make_request(ip), item, "test")
+            allowed += 1
+        except HTTPException as exc:
+            assert exc.status_code == 429
+            assert "Retry-After" in exc.headers
+    return allowed
+
+
+async def test_limit_is_shared_across_workers(redis_client):
+    """Con varios workers el límite es global, no por proceso"""
+    workers = [RateLimiter(redis_getter=lambda: redis_client) for _ in range(3)]
+
+    assert await count_allowed(workers, 10, "5/minute") == 5
+
+
+async def test_local_fast_path_avoids_redis_round_trips(redis_client):
+    """Lejos del límite, los hits se sirven con tokens concedidos localmente"""
+    limiter = RateLimiter(redis_getter=lambda: redis_client, lease_ratio=0.1)
+    redis_before, local_before = decisions("redis"), decisions("local")
+
+    assert await count_allowed([limiter], 20, "100/minute") == 20
+
+    assert decisions("redis") - redis_before == 2
+    assert decisions("local") - local_before == 18
+
+
+async def test_leases_never_exceed_global_limit(redis_client):
+    """Los tokens reservados por cada worker cuentan contra el límite global"""
+    workers = [RateLimiter(redis_getter=lambda: redis_client, lease_ratio=0.1) for _ in range(3)]
+
+    allowed = await count_allowed(workers, 150, "100/minute")
+
+    assert 100 - 3 * 10 <= allowed <= 100
+
+
+async def test_fail_open_when_redis_is_down():
+    """Si Redis no responde se permite el request y se cuenta en la métrica"""
+    class BrokenRedis:
+        def register_script(self, script):
+            async def call(*args, **kwargs):
+                raise ConnectionError("redis caído")
+            return call
+
+    limiter = RateLimiter(redis_getter=BrokenRedis)
+    before = decisions("fail_open")
+
+    assert await count_allowed([limiter], 3, "1/minute") == 3
+    assert decisions("fail_open") - before == 3
+
+
+async def test_in_memory_limit_without_redis():
+    """Sin Redis configurado se limita por proceso en memoria"""
+    limiter = RateLimiter(redis_getter=lambda: None)
+
+    assert await count_allowed([limiter], 4, "2/minute") == 2
+
+
+def test_parse_limit():
+    """Notación de límites compatible con la de `limits`"""
+    assert parse_limit("10/minute").get_expiry() == 60
+    assert parse_limit("100 per 2 hours") == (100, 2, "hour")
+    with pytest.raises(ValueError):
+        parse_limit("muchos/minuto")
+
+
+async def test_login_endpoint_is_rate_limited(client):
+    """El endpoint de login responde 429 al superar 10/minute"""
+    statuses = []
+    # Un email distinto por intento: el bloqueo por cuenta no interviene
+    for i in range(11):
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"email": f"nadie{i}@example.com", "password": "incorrecta"}
+        )
+        statuses.append(response.status_code)
+
+    assert statuses[:10] == [401] * 10
+    assert statuses[10] == 429
@@ -0,0 +1,120 @@
+"""
+Tests de réplicas de lectura
+"""
+import pytest
+from sqlalchemy import inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config import database
+from app.config.settings import settings
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services.user_service import UserService
+from tests.conftest import TestReadSessionLocal
+
+
+async def create_database(url: str, full_name: str) -> None:
+    """Base SQLite con un usuario cuyo nombre identifica la copia"""
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    async with engine.begin() as conn:
+        await conn.execute(User.__table__.insert().values(
+            id=1, email="replica@example.com", username="replica", full_name=full_name, hashed_password="x"
+        ))
+    await engine.dispose()
+
+
+@pytest.fixture
+async def replicated(monkeypatch, tmp_path, redis_client):
+    """Primario y dos réplicas SQLite, cada una con datos distinguibles"""
+    urls = {name: f"sqlite+aiosqlite:///{tmp_path / name}.db" for name in ("primary", "a", "b")}
+    for name, url in urls.items():
+        await create_database(url, name)
+
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "DATABASE_URL", urls["primary"])
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", [urls["a"], urls["b"]])
+    monkeypatch.setattr(database, "engine", None)
+    monkeypatch.setattr(database, "AsyncSessionLocal", None)
+    yield database.get_session_factory()
+    await database.close_db()
+
+
+async def read_name(session_factory) -> str:
+    async with session_factory() as db:
+        return (await UserService.get_by_id(db, 1)).full_name
+
+
+async def test_reads_round_robin_and_writes_go_to_primary(replicated):
+    """Las lecturas se reparten y tras escribir la sesión lee del primario"""
+    assert [await read_name(replicated) for _ in range(4)] == ["a", "b", "a", "b"]
+
+    async with replicated() as db:
+        await UserService.update(db, 1, UserUpdate(full_name="actualizado"))
+        assert (await UserService.get_by_id(db, 1)).full_name == "actualizado"
+
+    async with replicated() as db:
+        assert (await UserService.authenticate(db, "nadie@example.com", "x")) is None
+        assert db.info["primary"] is True
+
+
+async def test_least_connections_avoids_busy_replica(replicated, monkeypatch):
+    """Con least_connections se elige la réplica con menos conexiones en uso"""
+    router = database.replica_router
+    monkeypatch.setattr(router, "strategy", "least_connections")
+    busy = router.replicas[0]
+
+    async with busy.engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert {await read_name(replicated) for _ in range(3)} == {"b"}
+
+
+async def test_failed_replica_is_ejected_and_retried_later(replicated, tmp_path):
+    """Una réplica que no conecta se expulsa sin hacer fallar la lectura"""
+    router = database.replica_router
+    broken = router.replicas[0]
+    broken.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'no-existe' / 'a.db'}")
+    router._watch(broken)
+
+    assert await read_name(replicated) == "b"
+    assert not broken.available
+    assert broken.failures == 1
+    assert {await read_name(replicated) for _ in range(3)} == {"b"}
+
+    # Pasado el tiempo de expulsión vuelve a recibir lecturas
+    await broken.engine.dispose()
+    broken.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'a.db'}")
+    router._watch(broken)
+    broken.ejected_until = 0.0
+    assert {await read_name(replicated) for _ in range(2)} == {"a", "b"}
+    assert broken.failures == 0
+
+
+async def test_cache_fill_after_write_reads_primary(replicated, monkeypatch):
+    """Justo después de una escritura la caché se rellena desde el primario, no desde una réplica atrasada"""
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", True)
+    async with replicated() as db:
+        assert (await UserService.get_by_id(db, 1)).full_name == "a"
+    async with replicated() as db:
+        await UserService.update(db, 1, UserUpdate(full_name="actualizado"))
+
+    # Las réplicas de prueba nunca reciben la escritura: simulan el retraso
+    for _ in range(2):
+        async with replicated() as db:
+            assert (await UserService.get_by_id(db, 1)).full_name == "actualizado"
+            assert (await UserService.get_by_ids(db, [1]))[1].full_name == "actualizado"
+
+
+async def test_read_session_returns_loaded_detached_entities(db_session):
+    """Los objetos leídos llegan construidos y desasociados tras cerrar la sesión"""
+    db_session.add(User(email="leido@example.com", username="leido", full_name="Leído", hashed_password="x"))
+    await db_session.commit()
+
+    async with TestReadSessionLocal() as session:
+        user = (await session.execute(select(User))).scalar_one()
+        # También desde la API síncrona, que no prebufferiza por su cuenta
+        users = await session.run_sync(lambda sync: sync.execute(select(User)).scalars().all())
+
+    for entity in (user, *users):
+        assert inspect(entity).detached
+        assert entity.full_name == "Leído"
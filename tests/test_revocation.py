@@ -0,0 +1,130 @@
+"""
+Tests de revocación de tokens
+"""
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from app.core.revocation import RevocationStore
+from app.core.security import create_tokens, get_password_hash, verify_token
+from app.models.user import User
+
+
+async def create_user(db_session) -> User:
+    user = User(email="logout@example.com", username="logout", hashed_password="x")
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_logout_revokes_access_and_refresh_tokens(client, db_session, redis_client):
+    """Tras el logout ambos tokens dejan de ser válidos, también en Redis"""
+    user = await create_user(db_session)
+    tokens = create_tokens(user.id, user.email)
+
+    response = await client.post(
+        "/api/v1/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers=bearer(tokens["access_token"])
+    )
+    assert response.status_code == 200
+
+    response = await client.get("/api/v1/users/me", headers=bearer(tokens["access_token"]))
+    assert response.status_code == 401
+    response = await client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+    jti_keys = await redis_client.keys("revoke:jti:*")
+    assert len(jti_keys) == 2
+    for key in jti_keys:
+        ttl = await redis_client.ttl(key)
+        assert 0 < ttl <= 7 * 24 * 3600 + 1
+
+
+async def test_logout_all_invalidates_previous_tokens(client, db_session):
+    """Revocar todas las sesiones invalida los tokens anteriores, no los nuevos"""
+    user = await create_user(db_session)
+    first = create_tokens(user.id, user.email)
+    second = create_tokens(user.id, user.email)
+
+    response = await client.post("/api/v1/auth/logout-all", headers=bearer(first["access_token"]))
+    assert response.status_code == 200
+
+    for token, token_type in ((second["access_token"], "access"), (second["refresh_token"], "refresh")):
+        with pytest.raises(HTTPException):
+            verify_token(token, token_type)
+
+    fresh = create_tokens(user.id, user.email)
+    assert verify_token(fresh["access_token"], "access")["sub"] == user.id
+
+
+async def test_revocations_reach_other_workers(redis_client):
+    """Un worker recibe por pub/sub las revocaciones hechas en otro"""
+    worker_a = RevocationStore(redis_getter=lambda: redis_client)
+    worker_b = RevocationStore(redis_getter=lambda: redis_client)
+    exp = time.time() + 60
+
+    await worker_a.revoke("antes", exp)
+    await worker_b.start_listener()
+    try:
+        await worker_a.revoke("despues", exp)
+        await worker_a.revoke_all(42)
+
+        for _ in range(50):
+            if worker_b.is_revoked({"jti": "despues"}) and worker_b.generation(42) == 1:
+                break
+            await asyncio.sleep(0.02)
+
+        # "antes" llega por la carga inicial, el resto por pub/sub
+        assert worker_b.is_revoked({"jti": "antes"})
+        assert worker_b.is_revoked({"jti": "despues"})
+        assert worker_b.is_revoked({"sub": 42, "gen": 0})
+        assert not worker_b.is_revoked({"sub": 42, "gen": 1})
+    finally:
+        await worker_b.stop_listener()
+
+
+async def test_new_tokens_use_generation_from_redis(client, db_session, redis_client):
+    """Un worker con el espejo sin cargar emite tokens con la generación vigente"""
+    user = User(email="gen@example.com", username="gen", hashed_password=get_password_hash("correcta123"))
+    db_session.add(user)
+    await db_session.commit()
+    other_worker = RevocationStore(redis_getter=lambda: redis_client)
+    await other_worker.revoke_all(user.id)
+
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "gen@example.com", "password": "correcta123"}
+    )
+    assert response.status_code == 200
+    access_token = response.json()["access_token"]
+    assert verify_token(access_token, "access")["gen"] == 1
+    # El worker que ya conocía la generación acepta el token
+    assert not other_worker.is_revoked(verify_token(access_token, "access"))
+
+
+async def test_start_listener_waits_for_initial_load(redis_client):
+    """Al arrancar, el espejo está cargado antes de atender requests"""
+    await RevocationStore(redis_getter=lambda: redis_client).revoke_all(42)
+    worker = RevocationStore(redis_getter=lambda: redis_client)
+
+    await worker.start_listener()
+    try:
+        assert worker.generation(42) == 1
+    finally:
+        await worker.stop_listener()
+
+
+async def test_revocation_without_redis_is_local():
+    """Sin Redis la revocación se aplica en el proceso actual"""
+    store = RevocationStore(redis_getter=lambda: None)
+
+    await store.revoke("abc", time.time() + 60)
+    await store.revoke("vencido", time.time() - 1)
+
+    assert store.is_revoked({"jti": "abc"})
+    assert not store.is_revoked({"jti": "vencido"})
@@ -0,0 +1,80 @@
+"""
+Tests del servidor de producción (scripts/serve.py)
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import httpx
+import pytest
+from scripts.serve import resolve_http, resolve_loop, resolve_workers
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="El servidor usa fork")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_resolve_defaults():
+    """0 workers = CPUs; "auto" elige uvloop/httptools si están instalados"""
+    assert resolve_workers(0) == os.cpu_count()
+    assert resolve_workers(3) == 3
+    assert resolve_loop("asyncio") == "asyncio"
+    assert resolve_loop("auto") in ("uvloop", "asyncio")
+    assert resolve_http("auto") in ("httptools", "h11")
+
+
+def test_workers_are_recycled_and_stop_gracefully(tmp_path):
+    """Los workers se reemplazan tras WEB_MAX_REQUESTS y SIGTERM detiene todo"""
+    port = free_port()
+    env = {
+        **os.environ,
+        "SECRET_KEY": "test-secret-key",
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WEB_WORKERS": "2",
+        "WEB_MAX_REQUESTS": "2",
+        "WEB_GRACEFUL_TIMEOUT": "5",
+        "DATABASE_URL": "",
+        "REDIS_URL": "",
+        "LOG_JSON": "false",
+    }
+    log_path = tmp_path / "serve.log"
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "scripts.serve"], env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(url, timeout=1)
+                break
+            except httpx.TransportError:
+                assert time.monotonic() < deadline, log_path.read_text()
+                time.sleep(0.2)
+
+        statuses = []
+        for _ in range(10):
+            try:
+                statuses.append(httpx.get(url, timeout=5).status_code)
+            except httpx.TransportError:
+                # Conexión aceptada por un worker que justo se estaba reciclando
+                time.sleep(0.2)
+        assert statuses.count(200) >= 8
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=20) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+    output = log_path.read_text()
+    assert "reciclado, reemplazando" in output
+    assert "Servidor detenido" in output
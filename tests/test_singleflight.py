@@ -0,0 +1,138 @@
+"""
+Tests de singleflight en las lecturas de usuario
+"""
+import asyncio
+import pytest
+from prometheus_client import REGISTRY
+from app.config.settings import settings
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services.user_cache import user_flights
+from app.services.user_service import UserService
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+async def gated_fetches(db_session, monkeypatch):
+    """
+    Sin caché y con las consultas retenidas hasta abrir `gate`: así las
+    lecturas concurrentes coinciden en el tiempo
+    """
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", False)
+    db_session.add(User(email="popular@example.com", username="popular", hashed_password="x"))
+    await db_session.commit()
+
+    gate = asyncio.Event()
+    calls = []
+
+    def gated(fetch):
+        async def wrapper(db, value):
+            calls.append(value)
+            await gate.wait()
+            return await fetch(db, value)
+        return staticmethod(wrapper)
+
+    monkeypatch.setattr(UserService, "_fetch_by_id", gated(UserService._fetch_by_id))
+    monkeypatch.setattr(UserService, "_fetch_by_email", gated(UserService._fetch_by_email))
+    yield gate, calls
+    gate.set()
+
+
+async def read(method, value):
+    """Lectura con su propia sesión, como un request"""
+    async with TestSessionLocal() as db:
+        return await method(db, value)
+
+
+async def test_concurrent_reads_share_one_query(gated_fetches):
+    """Cien lecturas del mismo usuario ejecutan una sola consulta"""
+    gate, calls = gated_fetches
+    leaders = REGISTRY.get_sample_value("singleflight_calls_total", {"group": "user", "role": "leader"}) or 0.0
+
+    readers = [asyncio.ensure_future(read(UserService.get_by_id, 1)) for _ in range(100)]
+    await asyncio.sleep(0.01)
+    assert calls == [1]
+    assert user_flights.stats()["waiters"] == {"id:1": 100}
+
+    gate.set()
+    users = await asyncio.gather(*readers)
+
+    assert {user.email for user in users} == {"popular@example.com"}
+    assert len({id(user) for user in users}) == 100
+    assert user_flights.stats()["in_flight"] == 0
+    assert REGISTRY.get_sample_value("singleflight_calls_total", {"group": "user", "role": "leader"}) - leaders == 1
+
+
+async def test_reads_after_an_update_do_not_join_older_flight(gated_fetches, db_session):
+    """Una lectura que empieza tras una escritura no recibe el resultado de una consulta anterior"""
+    gate, calls = gated_fetches
+
+    before = [asyncio.ensure_future(read(UserService.get_by_id, 1)) for _ in range(10)]
+    await asyncio.sleep(0.01)
+    # La carga en curso empezó antes de la escritura: las lecturas nuevas no se unen a ella
+    await UserService.update(db_session, 1, UserUpdate(full_name="Actualizado"))
+    after = [asyncio.ensure_future(read(UserService.get_by_id, 1)) for _ in range(10)]
+    await asyncio.sleep(0.01)
+    assert calls == [1, 1]
+
+    gate.set()
+    await asyncio.gather(*before)
+    assert {user.full_name for user in await asyncio.gather(*after)} == {"Actualizado"}
+
+
+async def test_invalidation_keeps_other_users_flights(gated_fetches, db_session):
+    """Invalidar un usuario no separa las lecturas en curso de otros"""
+    gate, calls = gated_fetches
+    db_session.add(User(email="otro@example.com", username="otro", hashed_password="x"))
+    await db_session.commit()
+
+    other = asyncio.ensure_future(read(UserService.get_by_id, 2))
+    by_email = asyncio.ensure_future(read(UserService.get_by_email, "popular@example.com"))
+    await asyncio.sleep(0.01)
+    await UserService.update(db_session, 1, UserUpdate(full_name="Actualizado"))
+    other_after = asyncio.ensure_future(read(UserService.get_by_id, 2))
+    email_after = asyncio.ensure_future(read(UserService.get_by_email, "popular@example.com"))
+    await asyncio.sleep(0.01)
+    # El usuario 2 sigue en una sola consulta; el email del 1 empieza otra
+    assert calls == [2, "popular@example.com", "popular@example.com"]
+
+    gate.set()
+    await asyncio.gather(other, by_email)
+    assert (await other_after).username == "otro"
+    assert (await email_after).full_name == "Actualizado"
+
+
+async def test_cancellation_does_not_break_other_readers(gated_fetches):
+    """Cancelar al líder o a un seguidor no afecta a los demás"""
+    gate, calls = gated_fetches
+
+    leader = asyncio.ensure_future(read(UserService.get_by_email, "popular@example.com"))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.ensure_future(read(UserService.get_by_email, "popular@example.com")) for _ in range(5)]
+    await asyncio.sleep(0.01)
+
+    leader.cancel()
+    followers[0].cancel()
+    await asyncio.sleep(0.01)
+    # Un seguidor pasó a ser el líder de una consulta nueva
+    assert len(calls) == 2
+    gate.set()
+
+    users = await asyncio.gather(*followers[1:])
+    assert {user.username for user in users} == {"popular"}
+    assert leader.cancelled() and followers[0].cancelled()
+    assert user_flights.stats()["in_flight"] == 0
+
+
+async def test_singleflight_can_be_disabled_per_method(gated_fetches, monkeypatch):
+    """USER_SINGLEFLIGHT_BY_EMAIL=False: una consulta por lectura por email"""
+    gate, calls = gated_fetches
+    monkeypatch.setattr(settings, "USER_SINGLEFLIGHT_BY_EMAIL", False)
+
+    readers = [asyncio.ensure_future(read(UserService.get_by_email, "popular@example.com")) for _ in range(3)]
+    readers += [asyncio.ensure_future(read(UserService.get_by_id, 1)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    gate.set()
+    await asyncio.gather(*readers)
+
+    assert calls == ["popular@example.com"] * 3 + [1]
@@ -0,0 +1,52 @@
+"""
+Tests de tiempo de arranque
+"""
+import os
+import subprocess
+import sys
+from app.config.settings import settings
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_main_ms() -> float:
+    """Tiempo acumulado de `import main` según `python -X importtime`"""
+    env = dict(os.environ, SECRET_KEY=os.environ.get("SECRET_KEY", "test-secret-key"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == "main":
+            return int(fields[1]) / 1000
+    raise AssertionError("`main` no aparece en la salida de -X importtime")
+
+
+def test_import_main_within_budget():
+    """Importar `main` no supera IMPORT_TIME_BUDGET_MS (mejor de 3 intentos)"""
+    elapsed_ms = min(import_main_ms() for _ in range(3))
+
+    assert elapsed_ms <= settings.IMPORT_TIME_BUDGET_MS, (
+        f"import main tardó {elapsed_ms:.0f} ms (presupuesto {settings.IMPORT_TIME_BUDGET_MS} ms)"
+    )
+
+
+def test_optional_integrations_are_not_imported():
+    """Las integraciones opcionales se cargan en el primer uso, no al importar"""
+    env = dict(os.environ, SECRET_KEY=os.environ.get("SECRET_KEY", "test-secret-key"))
+    code = (
+        "import sys, main; "
+        "print('LOADED=' + ','.join(m for m in ('redis', 'jose', 'celery', 'cloudinary') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    loaded = next(line for line in result.stdout.splitlines() if line.startswith("LOADED="))
+    assert loaded == "LOADED="
@@ -0,0 +1,167 @@
+"""
+Tests de tareas en segundo plano
+"""
+import asyncio
+import threading
+import smtplib
+import pytest
+from prometheus_client import REGISTRY
+from app.config.settings import settings
+from app.tasks import TASKS, task, task_queue
+from app.tasks.celery_app import create_celery_app
+from app.tasks.users import send_email
+
+
+@pytest.fixture
+def flaky_task():
+    """Tarea que falla dos veces antes de completar"""
+    calls = []
+
+    @task("tests.flaky", max_retries=2, retry_backoff=0)
+    def flaky(value):
+        calls.append(value)
+        if len(calls) < 3:
+            raise ConnectionError("SMTP no disponible")
+        return value * 2
+
+    yield calls
+    TASKS.pop("tests.flaky")
+
+
+def task_runs(status: str) -> float:
+    return REGISTRY.get_sample_value("tasks_total", {"task": "tests.flaky", "status": status}) or 0.0
+
+
+async def test_register_does_not_wait_for_tasks(client, monkeypatch):
+    """El registro responde mientras el email de bienvenida sigue en curso"""
+    release = threading.Event()
+    sent = []
+
+    def slow_welcome(user_id, email, full_name=None):
+        release.wait(timeout=5)
+        sent.append(email)
+
+    monkeypatch.setattr(TASKS["users.send_welcome_email"], "func", slow_welcome)
+
+    response = await client.post("/api/v1/auth/register", json={
+        "email": "tasks@example.com",
+        "username": "tasks",
+        "password": "Password123!"
+    })
+    assert response.status_code == 201
+    assert sent == []
+
+    release.set()
+    await task_queue.drain()
+    assert sent == ["tasks@example.com"]
+
+
+async def test_login_records_audit_task(client, monkeypatch):
+    """El login correcto encola el registro de auditoría con la IP"""
+    logins = []
+    monkeypatch.setattr(
+        TASKS["users.record_login"], "func", lambda user_id, ip=None, user_agent=None: logins.append((user_id, ip))
+    )
+    credentials = {"email": "audit@example.com", "password": "Password123!"}
+    await client.post("/api/v1/auth/register", json={**credentials, "username": "audit"})
+
+    response = await client.post("/api/v1/auth/login", json=credentials)
+    assert response.status_code == 200
+    await task_queue.drain()
+    assert logins == [(1, "127.0.0.1")]
+
+
+async def test_eager_retries_with_backoff(flaky_task):
+    """En modo eager los fallos se reintentan hasta max_retries"""
+    retries, successes = task_runs("retry"), task_runs("success")
+
+    assert await asyncio.wrap_future(task_queue.enqueue("tests.flaky", 21)) == 42
+    assert flaky_task == [21, 21, 21]
+    assert task_runs("retry") - retries == 2
+    assert task_runs("success") - successes == 1
+    assert REGISTRY.get_sample_value("task_queue_latency_seconds_count", {"task": "tests.flaky"}) >= 1
+
+
+async def test_celery_mode_publishes_to_broker(monkeypatch):
+    """Con TASKS_MODE=celery la tarea se publica por nombre, fuera del event loop"""
+    published = []
+
+    class FakeCelery:
+        def send_task(self, name, args, kwargs):
+            published.append((name, args, sorted(kwargs), threading.current_thread().name))
+
+    monkeypatch.setattr(settings, "TASKS_MODE", "celery")
+    monkeypatch.setattr("app.tasks.celery_app.get_celery_app", lambda: FakeCelery())
+
+    await asyncio.wrap_future(task_queue.enqueue("users.record_login", 7, ip="10.0.0.1"))
+
+    name, args, kwargs, thread = published[0]
+    assert (name, args, kwargs) == ("users.record_login", (7,), ["_enqueued_at", "ip"])
+    assert thread.startswith("tasks")
+
+
+def test_celery_app_registers_tasks_with_retries(flaky_task):
+    """La app de Celery registra las tareas y reintenta con la misma política"""
+    app = create_celery_app(always_eager=True)
+
+    assert "users.send_welcome_email" in app.tasks
+    result = app.tasks["tests.flaky"].apply_async(args=(5,))
+    assert result.get() == 10
+    assert flaky_task == [5, 5, 5]
+
+
+sessions = []
+
+
+class FakeSMTP:
+    """Servidor SMTP falso que anota las llamadas"""
+    extensions = ()
+
+    def __init__(self, host, port, timeout=None):
+        self.calls = [type(self).__name__]
+        sessions.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def ehlo(self):
+        pass
+
+    def has_extn(self, name):
+        return name in self.extensions
+
+    def starttls(self):
+        self.calls.append("starttls")
+
+    def login(self, user, password):
+        self.calls.append("login")
+
+    def send_message(self, message):
+        self.calls.append("send")
+
+
+class FakeSMTPWithTLS(FakeSMTP):
+    extensions = ("starttls",)
+
+
+@pytest.mark.parametrize("port, ssl, smtp_class, expected", [
+    (465, False, FakeSMTP, ["FakeSMTP_SSL", "send"]),
+    (2465, True, FakeSMTP, ["FakeSMTP_SSL", "send"]),
+    (587, False, FakeSMTPWithTLS, ["FakeSMTPWithTLS", "starttls", "send"]),
+    (25, False, FakeSMTP, ["FakeSMTP", "send"]),
+])
+def test_send_email_tls_mode(monkeypatch, port, ssl, smtp_class, expected):
+    """TLS implícito en 465 o con SMTP_SSL; STARTTLS solo si el servidor lo anuncia"""
+    sessions.clear()
+    monkeypatch.setattr(smtplib, "SMTP", smtp_class)
+    monkeypatch.setattr(smtplib, "SMTP_SSL", type("FakeSMTP_SSL", (FakeSMTP,), {}))
+    monkeypatch.setattr(settings, "SMTP_HOST", "smtp.example.com")
+    monkeypatch.setattr(settings, "SMTP_PORT", port)
+    monkeypatch.setattr(settings, "SMTP_SSL", ssl)
+    monkeypatch.setattr(settings, "SMTP_USER", "")
+
+    assert send_email("a@example.com", "Asunto", "Cuerpo")
+    assert [session.calls for session in sessions] == [expected]
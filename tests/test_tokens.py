@@ -0,0 +1,212 @@
+"""
+Tests del codec de tokens JWT
+"""
+import time
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose import jwt as jose_jwt
+from app.core.security import (
+    create_access_token,
+    create_tokens,
+    get_token_codec,
+    set_token_codec,
+    verify_token,
+)
+from app.core.tokens import (
+    TOKEN_CODECS,
+    CryptographyTokenCodec,
+    KeySet,
+    SigningKey,
+    TokenCodec,
+    TokenError,
+    b64url_decode,
+    b64url_encode,
+)
+from app.models.user import User
+
+# Ejemplos de RFC 7515 (apéndices A.1 y A.3) y RFC 8037 (apéndice A.4)
+RFC_PAYLOAD = b"eyJpc3MiOiJqb2UiLA0KICJleHAiOjEzMDA4MTkzODAsDQogImh0dHA6Ly9leGFtcGxlLmNvbS9pc19yb290Ijp0cnVlfQ"
+RFC_VECTORS = {
+    "HS256": (
+        b"eyJ0eXAiOiJKV1QiLA0KICJhbGciOiJIUzI1NiJ9." + RFC_PAYLOAD,
+        "dBjftJeZ4CVP-mB92K27uhbUJU1p1r_wW1gFWFOEjXk",
+    ),
+    "ES256": (
+        b"eyJhbGciOiJFUzI1NiJ9." + RFC_PAYLOAD,
+        "DtEhU3ljbEg8L38VWAfUAqOyKAM6-Xx-F4GawxaepmXFCgfTjDxw5djxLa8ISlSApmWQxfKTUJqPP3-Kg6NU1Q",
+    ),
+    "EdDSA": (
+        b"eyJhbGciOiJFZERTQSJ9.RXhhbXBsZSBvZiBFZDI1NTE5IHNpZ25pbmc",
+        "hgyY0il_MGCjP0JzlnLWG1PPOt7-09PGcvMg3AIbQR6dWbhijcNR4ki4iylGjg5BhVsPt9g7sVvpAr_MuM0KAg",
+    ),
+}
+
+
+def rfc_key(algorithm: str) -> SigningKey:
+    """Claves de los ejemplos de los RFC (JWK en base64url; ES256 solo la pública)"""
+    def number(value: str) -> int:
+        return int.from_bytes(b64url_decode(value.encode()), "big")
+
+    if algorithm == "HS256":
+        key = b64url_decode(
+            b"AyM1SysPpbyDfgZld3umj1qzKObwVMkoqQ-EstJQLr_T-1qS0gZH75aKtMN3Yj0iPS4hcgUuTwjAzZr1Z9CAow"
+        )
+    elif algorithm == "ES256":
+        key = ec.EllipticCurvePublicNumbers(
+            number("f83OJ3D2xF1Bg8vub9tLe1gHMzV76e8Tus9uPHvRVEU"),
+            number("x_FEzRu9m36HLN_tue659LNpXW6pCyStikYjKIWI5a0"),
+            ec.SECP256R1(),
+        ).public_key()
+    else:
+        key = ed25519.Ed25519PrivateKey.from_private_bytes(
+            b64url_decode(b"nWGxne_9WmC6hEr0kuwsxERJxWl7MmkZcDusAxyuf2A")
+        )
+    return SigningKey("rfc", algorithm, key)
+
+
+KEYS = {
+    "HS256": SigningKey("hs", "HS256", b"a-test-secret-that-is-long-enough"),
+    "ES256": SigningKey("es", "ES256", ec.generate_private_key(ec.SECP256R1())),
+    "EdDSA": SigningKey("ed", "EdDSA", ed25519.Ed25519PrivateKey.generate()),
+}
+
+
+def claims(**overrides) -> dict:
+    data = {"sub": 1, "type": "access", "exp": int(time.time()) + 60}
+    data.update(overrides)
+    return data
+
+
+@pytest.fixture
+def asymmetric_codec():
+    """Codec EdDSA activo durante el test"""
+    codec = CryptographyTokenCodec(KeySet([KEYS["EdDSA"]], "ed"))
+    set_token_codec(codec)
+    yield codec
+    set_token_codec(None)
+
+
+@pytest.mark.parametrize("backend,algorithm", [
+    (backend, algorithm)
+    for backend, codec_class in TOKEN_CODECS.items()
+    for algorithm in codec_class.algorithms
+])
+def test_roundtrip_between_backends(backend, algorithm):
+    """Cada backend verifica lo que firma cualquier otro con el mismo algoritmo"""
+    key_set = KeySet([KEYS[algorithm]], KEYS[algorithm].kid)
+    codec = TOKEN_CODECS[backend](key_set)
+
+    for other_class in TOKEN_CODECS.values():
+        if algorithm in other_class.algorithms:
+            token = other_class(key_set).encode(claims())
+            assert codec.decode(token)["sub"] == 1
+
+
+@pytest.mark.parametrize("algorithm", sorted(RFC_VECTORS))
+def test_cryptography_backend_matches_rfc_vectors(algorithm):
+    """El backend propio verifica las firmas de los RFC y reproduce las deterministas"""
+    signing_input, signature = RFC_VECTORS[algorithm]
+    key = rfc_key(algorithm)
+    signature = b64url_decode(signature.encode())
+
+    CryptographyTokenCodec._verify(signing_input, signature, key)
+    # ECDSA no es determinista: de ES256 solo se comprueba la verificación
+    if algorithm != "ES256":
+        assert CryptographyTokenCodec._sign(signing_input, key) == signature
+
+    tampered = bytes([signature[0] ^ 1]) + signature[1:]
+    with pytest.raises(TokenError):
+        CryptographyTokenCodec._verify(signing_input, tampered, key)
+
+
+def test_token_codec_is_abstract():
+    """Un backend debe implementar _encode y _decode"""
+    class Incomplete(TokenCodec):
+        name = "incompleto"
+        algorithms = ("HS256",)
+
+    with pytest.raises(TypeError):
+        Incomplete(KeySet([KEYS["HS256"]], "hs"))
+
+
+def test_rotation_keeps_old_tokens_valid():
+    """Tras rotar, los tokens de la clave anterior siguen verificando"""
+    old = SigningKey("old", "EdDSA", ed25519.Ed25519PrivateKey.generate())
+    new = SigningKey("new", "EdDSA", ed25519.Ed25519PrivateKey.generate())
+    old_token = CryptographyTokenCodec(KeySet([old], "old")).encode(claims())
+
+    retired = SigningKey("old", "EdDSA", old.key.public_key())
+    codec = CryptographyTokenCodec(KeySet([retired, new], "new"))
+
+    assert codec.decode(old_token)["sub"] == 1
+    assert '"kid":"new"' in str(codec.key_set.jwks())
+
+    with pytest.raises(TokenError):
+        CryptographyTokenCodec(KeySet([new], "new")).decode(old_token)
+
+
+def test_algorithm_is_fixed_by_key():
+    """Un token HS256 firmado con la clave pública no pasa por EdDSA"""
+    codec = CryptographyTokenCodec(KeySet([KEYS["EdDSA"]], "ed"))
+    token = jose_jwt.encode(claims(), "anything", algorithm="HS256", headers={"kid": "ed"})
+
+    with pytest.raises(TokenError):
+        codec.decode(token)
+
+
+def test_expired_and_missing_exp_are_rejected():
+    """`exp` es obligatorio y se valida en todos los backends"""
+    for codec_class in TOKEN_CODECS.values():
+        codec = codec_class(KeySet([KEYS["HS256"]], "hs"))
+        for payload in (claims(exp=int(time.time()) - 1), {"sub": 1, "type": "access"}):
+            with pytest.raises(TokenError):
+                codec.decode(codec.encode(payload))
+
+
+def test_tokens_without_kid_use_active_key():
+    """Tokens emitidos antes de añadir `kid` siguen siendo válidos"""
+    codec = CryptographyTokenCodec(KeySet([KEYS["HS256"]], "hs"))
+    legacy = jose_jwt.encode(claims(), KEYS["HS256"].key.decode(), algorithm="HS256")
+
+    assert codec.decode(legacy)["sub"] == 1
+
+
+def test_tampered_signature_is_rejected():
+    """Una firma alterada se rechaza"""
+    codec = CryptographyTokenCodec(KeySet([KEYS["ES256"]], "es"))
+    header, payload, _ = codec.encode(claims()).split(".")
+
+    with pytest.raises(TokenError):
+        codec.decode(f"{header}.{payload}.{b64url_encode(b'x' * 64).decode()}")
+
+
+async def test_jwks_endpoint(client, asymmetric_codec):
+    """/.well-known/jwks.json publica la clave pública con caché HTTP"""
+    response = await client.get("/.well-known/jwks.json")
+
+    assert response.status_code == 200
+    assert "max-age" in response.headers["cache-control"]
+    (jwk,) = response.json()["keys"]
+    assert jwk["kid"] == "ed" and jwk["kty"] == "OKP" and "d" not in jwk
+
+    payload = verify_token(create_access_token({"sub": 7}), "access")
+    assert payload["sub"] == 7
+
+
+async def test_refresh_signs_a_single_token(client, db_session, monkeypatch):
+    """/auth/refresh firma solo el access token nuevo"""
+    user = User(email="refresh@example.com", username="refresh", hashed_password="x")
+    db_session.add(user)
+    await db_session.commit()
+    refresh_token = create_tokens(user.id, user.email)["refresh_token"]
+
+    codec = get_token_codec()
+    signed = []
+    original_encode = codec.encode
+    monkeypatch.setattr(codec, "encode", lambda data: signed.append(data) or original_encode(data))
+
+    response = await client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+
+    assert response.status_code == 200
+    assert [data["type"] for data in signed] == ["access"]
+    assert verify_token(response.json()["access_token"], "access")["sub"] == user.id
@@ -0,0 +1,350 @@
+"""
+Tests de usuarios
+"""
+import asyncio
+import json
+import pytest
+from contextlib import contextmanager
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from app.config.settings import settings
+from app.models.user import User
+from app.core.security import create_access_token
+from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.services.user_service import UserService, _conflict_from_integrity_error
+from app.utils.dataloader import DataLoader
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.export import EXPORT_FIELDS, iter_ndjson, iter_csv
+
+
+async def create_users(db_session, count: int):
+    """Insertar usuarios de prueba directamente en la base de datos"""
+    for i in range(count):
+        db_session.add(User(
+            email=f"user{i}@example.com",
+            username=f"user{i}",
+            hashed_password="not-a-real-hash",
+        ))
+    await db_session.commit()
+
+
+@contextmanager
+def count_statements(db_session):
+    """Contar las sentencias SQL emitidas dentro del bloque"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_cursor_roundtrip():
+    """El cursor codifica y decodifica el último ID"""
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor("") is None
+
+
+def test_invalid_cursor():
+    """Un cursor manipulado se rechaza con 400"""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("no-es-un-cursor")
+    assert exc_info.value.status_code == 400
+
+
+async def test_keyset_pagination(db_session):
+    """La paginación por keyset recorre todos los usuarios sin repetir"""
+    await create_users(db_session, 5)
+
+    seen = []
+    after_id = None
+    while True:
+        rows, last_id = await UserService.get_page_rows(db_session, limit=2, after_id=after_id)
+        seen.extend(row["id"] for row in rows)
+        if last_id is None:
+            break
+        after_id = last_id
+
+    assert seen == sorted(seen)
+    assert len(seen) == 5
+
+
+async def test_list_endpoint_matches_response_model(client, db_session):
+    """La lista sin validación Pydantic produce el mismo JSON que UserResponse"""
+    await create_users(db_session, 3)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 1})}"}
+
+    response = await client.get("/api/v1/users?limit=2", headers=headers)
+    page = await client.get("/api/v1/users?limit=2&cursor=", headers=headers)
+
+    users = (await db_session.execute(select(User).order_by(User.id).limit(2))).scalars().all()
+    expected = [UserResponse.model_validate(user).model_dump(mode="json") for user in users]
+    assert response.json() == expected
+    assert page.json()["items"] == expected
+    assert page.json()["next_cursor"] == encode_cursor(users[-1].id)
+    assert "hashed_password" not in response.text
+
+
+async def test_user_etag_and_conditional_get(client, db_session):
+    """If-None-Match con el ETag vigente da 304 leyendo solo la versión"""
+    await create_users(db_session, 2)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 1})}"}
+
+    response = await client.get("/api/v1/users/me", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"u1-')
+    assert (await client.get("/api/v1/users/1", headers=headers)).headers["ETag"] == etag
+
+    with count_statements(db_session) as statements:
+        response = await client.get("/api/v1/users/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert all("hashed_password" not in statement for statement in statements)
+
+    await client.put("/api/v1/users/me", json={"full_name": "Nuevo"}, headers=headers)
+    response = await client.get("/api/v1/users/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["full_name"] == "Nuevo"
+
+
+async def test_list_collection_etag(client, db_session):
+    """El ETag de la lista cambia cuando cambia alguna fila de la página"""
+    await create_users(db_session, 3)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 1})}"}
+
+    for url in ("/api/v1/users?limit=2", "/api/v1/users?limit=2&cursor="):
+        etag = (await client.get(url, headers=headers)).headers["ETag"]
+        response = await client.get(url, headers={**headers, "If-None-Match": f'"otro", {etag}'})
+        assert response.status_code == 304
+
+    etag = (await client.get("/api/v1/users?limit=2", headers=headers)).headers["ETag"]
+    await UserService.update(db_session, 2, UserUpdate(full_name="Cambio"))
+    response = await client.get("/api/v1/users?limit=2", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_batch_lookup_is_one_query_in_requested_order(client, db_session):
+    """GET /users?ids= resuelve todos los IDs con una consulta IN, en orden"""
+    await create_users(db_session, 5)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 1})}"}
+
+    with count_statements(db_session) as statements:
+        response = await client.get("/api/v1/users?ids=4,1,99,2,4", headers=headers)
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()] == [4, 1, 2]
+    assert len([statement for statement in statements if "FROM users" in statement]) == 1
+    assert "hashed_password" not in response.text
+
+    etag = response.headers["ETag"]
+    response = await client.get("/api/v1/users?ids=4,1,99,2,4", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    for ids in ("uno,dos", "", ",".join(["1"] * (settings.PAGINATION_MAX_LIMIT + 1))):
+        assert (await client.get(f"/api/v1/users?ids={ids}", headers=headers)).status_code == 400
+
+
+async def test_loader_coalesces_loads_of_the_same_tick(db_session, monkeypatch):
+    """Los get_by_id concurrentes de un request se agrupan en una consulta"""
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", False)
+    await create_users(db_session, 3)
+    loader = UserService.loader(db_session)
+
+    with count_statements(db_session) as statements:
+        users = await asyncio.gather(*(loader.load(user_id) for user_id in (3, 1, 42, 3)))
+        again = await loader.load(1)
+    assert [user.id if user else None for user in users] == [3, 1, None, 3]
+    assert again is users[1]
+    assert len(statements) == 1
+    assert loader.batches == 1
+
+
+async def test_loader_runs_oversized_batches_one_after_another(db_session, monkeypatch):
+    """Más claves que max_batch_size: varias consultas en serie (la sesión no admite concurrencia)"""
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "PAGINATION_MAX_LIMIT", 2)
+    await create_users(db_session, 5)
+
+    running = []
+    get_by_ids = UserService.get_by_ids
+
+    async def tracked_get_by_ids(db, user_ids):
+        running.append(user_ids)
+        try:
+            # Si otro lote empezara mientras tanto, se vería aquí
+            await asyncio.sleep(0.01)
+            assert running == [user_ids]
+            return await get_by_ids(db, user_ids)
+        finally:
+            running.remove(user_ids)
+
+    monkeypatch.setattr(UserService, "get_by_ids", staticmethod(tracked_get_by_ids))
+    loader = UserService.loader(db_session)
+
+    users = await loader.load_many([5, 4, 3, 2, 1])
+
+    assert [user.id for user in users] == [5, 4, 3, 2, 1]
+    assert loader.batches == 3
+
+
+async def test_loader_survives_cancelled_waiter(db_session):
+    """Cancelar a uno de los que esperan no cancela la carga de los demás"""
+    await create_users(db_session, 1)
+    loader = UserService.loader(db_session)
+
+    first = asyncio.ensure_future(loader.load(1))
+    second = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await second).email == "user0@example.com"
+    assert first.cancelled()
+
+
+async def test_loader_clear_during_batch_resolves_waiters():
+    """`clear` con la carga en curso no deja a nadie esperando"""
+    gate = asyncio.Event()
+    calls = []
+
+    async def batch_load(keys):
+        calls.append(keys)
+        await gate.wait()
+        return {key: key * 10 for key in keys}
+
+    loader = DataLoader(batch_load)
+    # Olvidada antes de despachar y vuelta a pedir: dos futures para la misma clave
+    first = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0)
+    loader.clear(1)
+    second = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0.01)
+    # Olvidada con la carga en curso
+    loader.clear(1)
+    gate.set()
+
+    assert await asyncio.wait_for(asyncio.gather(first, second), 1) == [10, 10]
+    loaded = len(calls)
+    # Lo olvidado se vuelve a cargar
+    assert await loader.load(1) == 10
+    assert len(calls) == loaded + 1
+
+
+async def test_stream_rows_filters(db_session):
+    """El streaming aplica filtros y no expone el hash de contraseña"""
+    await create_users(db_session, 3)
+    user = await UserService.get_by_email(db_session, "user1@example.com")
+    user.is_active = False
+    await db_session.commit()
+
+    rows = [row async for row in UserService.stream_rows(db_session, is_active=True, batch_size=1)]
+
+    assert [row["username"] for row in rows] == ["user0", "user2"]
+    assert "hashed_password" not in rows[0]
+
+
+async def test_export_encoders(db_session):
+    """Los encoders NDJSON y CSV generan una línea por usuario"""
+    await create_users(db_session, 3)
+
+    ndjson = b"".join([chunk async for chunk in iter_ndjson(UserService.stream_rows(db_session))])
+    lines = ndjson.decode().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0])["email"] == "user0@example.com"
+
+    csv_data = b"".join([chunk async for chunk in iter_csv(UserService.stream_rows(db_session))])
+    csv_lines = csv_data.decode().splitlines()
+    assert csv_lines[0].split(",") == EXPORT_FIELDS
+    assert len(csv_lines) == 4
+
+
+async def test_create_is_single_statement(db_session):
+    """Crear un usuario emite un único INSERT ... RETURNING"""
+    user_data = UserCreate(email="nuevo@example.com", username="nuevo", password="password123")
+    
+    with count_statements(db_session) as statements:
+        user = await UserService.create(db_session, user_data)
+    
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("INSERT")
+    assert user.id is not None
+    assert user.created_at is not None
+    assert user.is_active is True
+
+
+async def test_create_conflicts_map_to_messages(db_session):
+    """Las violaciones de UNIQUE conservan los mensajes de conflicto"""
+    await create_users(db_session, 1)
+    
+    with pytest.raises(HTTPException) as exc_info:
+        await UserService.create(
+            db_session,
+            UserCreate(email="user0@example.com", username="otro", password="password123")
+        )
+    assert exc_info.value.status_code == 409
+    assert exc_info.value.detail == "El email ya está registrado"
+    
+    with pytest.raises(HTTPException) as exc_info:
+        await UserService.create(
+            db_session,
+            UserCreate(email="otro@example.com", username="user0", password="password123")
+        )
+    assert exc_info.value.detail == "El username ya está en uso"
+
+
+async def test_conflict_is_classified_by_constraint(db_session):
+    """Un username duplicado que contiene "email" no se informa como email repetido"""
+    db_session.add(User(email="a@example.com", username="myemail", hashed_password="x"))
+    await db_session.commit()
+    
+    with pytest.raises(HTTPException) as exc_info:
+        await UserService.create(
+            db_session,
+            UserCreate(email="b@example.com", username="myemail", password="password123")
+        )
+    assert exc_info.value.detail == "El username ya está en uso"
+    
+    # Postgres (asyncpg): el DETAIL incluye el valor; cuenta la restricción
+    class UniqueViolationError(Exception):
+        constraint_name = "ix_users_username"
+    
+    orig = Exception(
+        'duplicate key value violates unique constraint "ix_users_username"\n'
+        "DETAIL:  Key (username)=(myemail) already exists."
+    )
+    orig.__cause__ = UniqueViolationError()
+    conflict = _conflict_from_integrity_error(IntegrityError("INSERT INTO users ...", {}, orig))
+    assert conflict.detail == "El username ya está en uso"
+
+
+async def test_update_and_delete_single_statement(db_session):
+    """update y delete no cargan la fila antes de modificarla"""
+    await create_users(db_session, 2)
+    
+    with count_statements(db_session) as statements:
+        user = await UserService.update(db_session, 1, UserUpdate(full_name="Nombre"))
+    assert len(statements) == 1
+    assert user.full_name == "Nombre"
+    assert user.updated_at is not None
+    
+    with pytest.raises(HTTPException) as exc_info:
+        await UserService.update(db_session, 1, UserUpdate(username="user1"))
+    assert exc_info.value.detail == "El username ya está en uso"
+    
+    with count_statements(db_session) as statements:
+        assert await UserService.delete(db_session, 2) is True
+    assert len(statements) == 1
+    
+    for operation in (
+        UserService.update(db_session, 2, UserUpdate(full_name="x")),
+        UserService.delete(db_session, 2),
+    ):
+        with pytest.raises(HTTPException) as exc_info:
+            await operation
+        assert exc_info.value.status_code == 404